@@ -1,71 +1,141 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, Config
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
-from flask_migrate import Migrate
 from flask_caching import Cache
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from celery import Celery
-from flasgger import Swagger
 from dotenv import load_dotenv
+import click
+import importlib
 import os
+import threading
 
 from config.config import config
+from .models.models import db
 
 # Load environment variables
 load_dotenv()
 
 # Initialize extensions
-db = SQLAlchemy()
 jwt = JWTManager()
-migrate = Migrate()
 cache = Cache()
 limiter = Limiter(key_func=get_remote_address)
-celery = Celery()
 
-def create_app(config_name='development'):
+# Celery is created on first use (a task being queued, or a worker importing
+# app.tasks), so web workers that never queue a job don't import it at boot
+_celery = None
+_celery_settings = {}
+_celery_lock = threading.Lock()
+
+def __getattr__(name):
+    global _celery
+    if name != 'celery':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _celery is None:
+        with _celery_lock:
+            if _celery is None:
+                from celery import Celery
+                celery = Celery()
+                celery.conf.update(_celery_settings)
+                _celery = celery
+    return _celery
+
+def configure_celery(settings):
+    _celery_settings.update(settings)
+    _celery_settings.update(
+        broker_url=settings['CELERY_BROKER_URL'],
+        result_backend=settings['CELERY_RESULT_BACKEND'],
+        task_always_eager=settings.get('CELERY_TASK_ALWAYS_EAGER', False),
+        beat_schedule={
+            'dispatch-reminders': {
+                'task': 'reminders.dispatch',
+                'schedule': settings['REMINDER_POLL_INTERVAL']
+            },
+            'reap-uploads': {
+                'task': 'uploads.reap',
+                'schedule': settings['UPLOAD_REAP_INTERVAL']
+            }
+        }
+    )
+    if _celery is not None:
+        _celery.conf.update(_celery_settings)
+
+def ensure_celery_configured(config_name=None):
+    # celery -A app.tasks worker/beat imports the tasks without running
+    # create_app; load the same config so they use the web app's broker,
+    # result backend and beat schedule
+    if _celery_settings:
+        return
+    settings = Config(os.path.dirname(__file__))
+    settings.from_object(config[config_name or os.getenv('FLASK_ENV', 'development')])
+    configure_celery(settings)
+
+# (module under app.routes, blueprint, URL prefix)
+BLUEPRINTS = [
+    ('auth', 'auth_bp', '/api/auth'),
+    ('patient', 'patient_bp', '/api/patients'),
+    ('doctor', 'doctor_bp', '/api/doctors'),
+    ('admin', 'admin_bp', '/api/admin'),
+    ('appointment', 'appointment_bp', '/api/appointments'),
+    ('upload', 'upload_bp', '/api/uploads')
+]
+
+def api_blueprints():
+    for module_name, attribute, url_prefix in BLUEPRINTS:
+        module = importlib.import_module(f'{__name__}.routes.{module_name}')
+        yield getattr(module, attribute), url_prefix
+
+def create_app(config_name='development', **overrides):
     app = Flask(__name__)
     
-    # Database configuration
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-123')
+    # Load settings (database, cache, uploads, ...) for the selected environment;
+    # overrides are for tests, benchmarks and one-off scripts
+    app.config.from_object(config[config_name])
+    app.config.update(overrides)
+    
+    # jsonify through orjson when it is installed
+    from .utils.serializers import FastJSONProvider
+    app.json = FastJSONProvider(app)
     
-    # Initialize extensions with app
+    # Initialize extensions with app; read replicas become extra engine binds
+    from .utils.replicas import init_replicas
+    init_replicas(app)
     db.init_app(app)
     jwt.init_app(app)
     CORS(app)
-    migrate.init_app(app, db)
     cache.init_app(app)
     limiter.init_app(app)
     
+    # Only the flask CLI (flask db ...) needs Flask-Migrate and Alembic
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    
     # Configure Celery
-    celery.conf.update(app.config)
+    configure_celery(app.config)
     
-    # Configure Swagger
-    Swagger(app)
+    # Configure Swagger where the API docs are served
+    if app.config.get('SWAGGER_ENABLED', True):
+        from flasgger import Swagger
+        Swagger(app)
     
     # Register blueprints
-    from .routes.auth import auth_bp
-    from .routes.patient import patient_bp
-    from .routes.doctor import doctor_bp
-    from .routes.admin import admin_bp
-    from .routes.appointment import appointment_bp
-    from .routes.medical_report import medical_report_bp
-    from .routes.prescription import prescription_bp
-    from .routes.payment import payment_bp
-    from .routes.feedback import feedback_bp
+    for blueprint, url_prefix in api_blueprints():
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+    
+    # Session listeners that keep the daily_stats rollup and credential table current
+    from .utils import daily_stats, credentials  # noqa: F401
+    
+    # Pre-built OpenAPI spec; polled by docs tooling, so not rate limited
+    from .utils.openapi import openapi_view
+    app.add_url_rule('/api/openapi.json', 'openapi_spec', openapi_view)
+    limiter.exempt(openapi_view)
     
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(patient_bp, url_prefix='/api/patients')
-    app.register_blueprint(doctor_bp, url_prefix='/api/doctors')
-    app.register_blueprint(admin_bp, url_prefix='/api/admin')
-    app.register_blueprint(appointment_bp, url_prefix='/api/appointments')
-    app.register_blueprint(medical_report_bp, url_prefix='/api/medical-reports')
-    app.register_blueprint(prescription_bp, url_prefix='/api/prescriptions')
-    app.register_blueprint(payment_bp, url_prefix='/api/payments')
-    app.register_blueprint(feedback_bp, url_prefix='/api/feedback')
+    # Request timings, query counts and slow-query log; /metrics is scraped
+    # often enough that it must not count against the rate limit
+    from .utils.metrics import init_metrics, metrics_view
+    init_metrics(app)
+    limiter.exempt(metrics_view)
     
     # Create upload directory
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
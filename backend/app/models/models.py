@@ -1,8 +1,10 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from ..utils.passwords import hash_password, verify_password
+from ..utils.replicas import RoutingSession
 
-db = SQLAlchemy()
+# The app's single db handle; sessions route @read_only reads to replicas
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Patient(db.Model):
     __tablename__ = 'patient'
@@ -29,10 +31,10 @@ class Patient(db.Model):
     feedback = db.relationship('Feedback', backref='patient', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
 class Doctor(db.Model):
     __tablename__ = 'doctor'
@@ -40,7 +42,7 @@ class Doctor(db.Model):
     doctor_id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
-    specialization = db.Column(db.String(100), nullable=False)
+    specialization = db.Column(db.String(100), nullable=False, index=True)
     experience_years = db.Column(db.Integer)
     contact_number = db.Column(db.String(15), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
@@ -56,12 +58,30 @@ class Doctor(db.Model):
     medical_reports = db.relationship('MedicalReport', backref='doctor', lazy=True)
     prescriptions = db.relationship('Prescription', backref='doctor', lazy=True)
     feedback = db.relationship('Feedback', backref='doctor', lazy=True)
+    schedules = db.relationship('DoctorSchedule', backref='doctor', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+class DoctorSchedule(db.Model):
+    __tablename__ = 'doctor_schedule'
+    
+    schedule_id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.doctor_id'), nullable=False, index=True)
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = Monday
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    slot_minutes = db.Column(db.Integer, nullable=False, default=30)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.CheckConstraint('weekday >= 0 AND weekday <= 6', name='check_weekday_range'),
+        db.CheckConstraint('slot_minutes > 0', name='check_slot_minutes_positive'),
+    )
 
 class Appointment(db.Model):
     __tablename__ = 'appointment'
@@ -74,6 +94,10 @@ class Appointment(db.Model):
     status = db.Column(db.String(20), default='Scheduled')
     mode = db.Column(db.String(20), nullable=False)
     payment_status = db.Column(db.String(20), default='Pending')
+    # True while the appointment holds its slot, NULL once cancelled so the
+    # unique slot constraint no longer applies to it
+    slot_active = db.Column(db.Boolean, default=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -81,18 +105,30 @@ class Appointment(db.Model):
     prescriptions = db.relationship('Prescription', backref='appointment', lazy=True)
     payments = db.relationship('Payment', backref='appointment', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_appointment_patient_status', 'patient_id', 'status'),
+        db.UniqueConstraint('doctor_id', 'date', 'time', 'slot_active', name='uq_appointment_doctor_slot'),
+        db.Index('ix_appointment_date_status_payment', 'date', 'status', 'payment_status'),
+    )
+    __mapper_args__ = {'version_id_col': version}
+
 class MedicalReport(db.Model):
     __tablename__ = 'medical_report'
     
     report_id = db.Column(db.Integer, primary_key=True)
     appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.appointment_id'), nullable=False)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.patient_id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.patient_id'), nullable=False, index=True)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.doctor_id'), nullable=False)
     diagnosis = db.Column(db.String(255), nullable=False)
     symptoms = db.Column(db.Text)
     test_recommended = db.Column(db.Text)
     test_results = db.Column(db.Text)
     uploaded_report_file = db.Column(db.String(255))
+    # Filled in by the media processing task: pending, processing, ready or failed
+    file_status = db.Column(db.String(20))
+    file_mime_type = db.Column(db.String(100))
+    file_thumbnail = db.Column(db.String(255))
+    file_preview = db.Column(db.String(255))
     date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -101,7 +137,7 @@ class Prescription(db.Model):
     __tablename__ = 'prescription'
     
     prescription_id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.patient_id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.patient_id'), nullable=False, index=True)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.doctor_id'), nullable=False)
     appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.appointment_id'), nullable=False)
     medicine_name = db.Column(db.String(100), nullable=False)
@@ -138,24 +174,66 @@ class Admin(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+class Credential(db.Model):
+    __tablename__ = 'credential'
+    
+    # One row per login identity across patient/doctor/admin, kept in step by
+    # the session listeners in utils/credentials
+    credential_id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(100), nullable=False, index=True)
+    role = db.Column(db.String(10), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('email', 'role', name='uq_credential_email_role'),
+    )
+
+class ReminderLog(db.Model):
+    __tablename__ = 'reminder_log'
+    
+    # One row per appointment reminder that has been claimed or handled, so
+    # restarts and concurrent schedulers never send the same reminder twice.
+    # Rescheduling an appointment deletes its rows
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.appointment_id'), primary_key=True)
+    offset_minutes = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False)  # claimed, sent, skipped or failed
+    attempts = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Feedback(db.Model):
     __tablename__ = 'feedback'
     
     feedback_id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.patient_id'), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.doctor_id'), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.doctor_id'), nullable=False, index=True)
     rating = db.Column(db.Integer, nullable=False)
     comments = db.Column(db.Text)
     date = db.Column(db.Date, nullable=False)
     video_file = db.Column(db.String(255))
+    video_status = db.Column(db.String(20))
+    video_mime_type = db.Column(db.String(100))
+    video_thumbnail = db.Column(db.String(255))
+    video_preview = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     __table_args__ = (
         db.CheckConstraint('rating >= 1 AND rating <= 5', name='check_rating_range'),
-    ) 
\ No newline at end of file
+    ) 
+
+class DailyStats(db.Model):
+    __tablename__ = 'daily_stats'
+    
+    date = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    specialization = db.Column(db.String(100), primary_key=True)
+    appointment_count = db.Column(db.Integer, nullable=False, default=0)
+    paid_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
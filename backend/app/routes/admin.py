@@ -1,16 +1,28 @@
-from flask import Blueprint, request, jsonify
+import os
+from uuid import uuid4
+from flask import Blueprint, request, jsonify, current_app, send_from_directory, send_file, Response, stream_with_context
 from flask_jwt_extended import jwt_required
-from ..models.models import db, Admin, Doctor, Patient, Appointment, MedicalReport, Prescription, Feedback
+from ..models.models import db, Admin, Doctor, Patient, Appointment, MedicalReport, Prescription, Feedback, DailyStats
 from ..utils.auth import admin_required
-from flasgger import swag_from
-from sqlalchemy import func
+from ..utils.pagination import paginated_response, PAGINATION_PARAMETERS
+from ..utils.query_counter import query_budget
+from ..utils.replicas import read_only
+from ..utils.serializers import DOCTOR, PATIENT, ADMIN_APPOINTMENT, FEEDBACK_ROW
+from ..utils.reports import (
+    REPORT_TYPES, EXPORT_MIMETYPES, ReportError, check_export_format, iter_report_rows, report_records,
+    export_chunks, export_filename, create_export_job, get_export_job, export_path
+)
+from ..utils.bulk_import import BulkImporter, iter_records, IMPORT_MODELS, IMPORT_FORMATS, DEFAULT_CHUNK_SIZE
+from ..utils.swagger import swag_from
+from sqlalchemy import func, case
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
 
 admin_bp = Blueprint('admin', __name__)
 
 @admin_bp.route('/doctors', methods=['GET'])
 @jwt_required()
-@admin_required
+@admin_required()
 @swag_from({
     'tags': ['Admin'],
     'description': 'Get all doctors with optional filters',
@@ -27,8 +39,9 @@ admin_bp = Blueprint('admin', __name__)
             'type': 'string',
             'required': False
         }
-    ]
+    ] + PAGINATION_PARAMETERS
 })
+@read_only
 def get_doctors():
     specialization = request.args.get('specialization')
     status = request.args.get('status')
@@ -37,24 +50,13 @@ def get_doctors():
     if specialization:
         query = query.filter_by(specialization=specialization)
     if status:
-        query = query.filter_by(status=status)
+        query = query.filter_by(availability_status=status)
         
-    doctors = query.all()
-    
-    return jsonify([{
-        'id': doc.id,
-        'first_name': doc.first_name,
-        'last_name': doc.last_name,
-        'email': doc.email,
-        'specialization': doc.specialization,
-        'contact_number': doc.contact_number,
-        'consultation_fees': doc.consultation_fees,
-        'status': doc.status
-    } for doc in doctors]), 200
+    return paginated_response(query, Doctor.doctor_id, lambda doc: doc.doctor_id, DOCTOR.dump)
 
 @admin_bp.route('/doctors/<int:doctor_id>', methods=['PUT'])
 @jwt_required()
-@admin_required
+@admin_required()
 @swag_from({
     'tags': ['Admin'],
     'description': 'Update doctor status',
@@ -83,7 +85,7 @@ def update_doctor_status(doctor_id):
     data = request.get_json()
     
     try:
-        doctor.status = data['status']
+        doctor.availability_status = data['status']
         db.session.commit()
         return jsonify({'message': 'Doctor status updated successfully'}), 200
         
@@ -93,22 +95,14 @@ def update_doctor_status(doctor_id):
 
 @admin_bp.route('/patients', methods=['GET'])
 @jwt_required()
-@admin_required
+@admin_required()
+@read_only
 def get_patients():
-    patients = Patient.query.all()
-    
-    return jsonify([{
-        'id': patient.id,
-        'first_name': patient.first_name,
-        'last_name': patient.last_name,
-        'email': patient.email,
-        'contact_number': patient.contact_number,
-        'date_of_birth': patient.date_of_birth.isoformat()
-    } for patient in patients]), 200
+    return paginated_response(Patient.query, Patient.patient_id, lambda patient: patient.patient_id, PATIENT.dump)
 
 @admin_bp.route('/appointments', methods=['GET'])
 @jwt_required()
-@admin_required
+@admin_required()
 @swag_from({
     'tags': ['Admin'],
     'description': 'Get all appointments with optional filters',
@@ -126,108 +120,96 @@ def get_patients():
             'format': 'date',
             'required': False
         }
-    ]
+    ] + PAGINATION_PARAMETERS
 })
+@query_budget(1)
+@read_only
 def get_appointments():
     status = request.args.get('status')
     date_str = request.args.get('date')
     
-    query = Appointment.query
+    query = Appointment.query.options(
+        joinedload(Appointment.patient).load_only(Patient.first_name, Patient.last_name),
+        joinedload(Appointment.doctor).load_only(Doctor.first_name, Doctor.last_name)
+    )
     if status:
         query = query.filter_by(status=status)
     if date_str:
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        query = query.filter(Appointment.appointment_date == date)
+        query = query.filter(Appointment.date == date)
         
-    appointments = query.all()
-    
-    return jsonify([{
-        'id': apt.id,
-        'patient_name': f"{apt.patient.first_name} {apt.patient.last_name}",
-        'doctor_name': f"{apt.doctor.first_name} {apt.doctor.last_name}",
-        'date': apt.appointment_date.isoformat(),
-        'time': apt.appointment_time.strftime('%H:%M'),
-        'status': apt.status,
-        'mode': apt.mode,
-        'payment_status': apt.payment_status
-    } for apt in appointments]), 200
+    return paginated_response(query, Appointment.appointment_id, lambda apt: apt.appointment_id, ADMIN_APPOINTMENT.dump)
 
 @admin_bp.route('/statistics', methods=['GET'])
 @jwt_required()
-@admin_required
+@admin_required()
+@read_only
 def get_statistics():
     # Get date range
-    end_date = datetime.now()
+    end_date = datetime.now().date()
     start_date = end_date - timedelta(days=30)
     
     # Total counts
     total_patients = Patient.query.count()
     total_doctors = Doctor.query.count()
-    total_appointments = Appointment.query.count()
     
-    # Monthly statistics
-    monthly_appointments = Appointment.query.filter(
-        Appointment.appointment_date.between(start_date, end_date)
-    ).count()
+    # Appointment figures come from the daily_stats rollup rather than the appointment table
+    total_appointments = db.session.query(
+        func.coalesce(func.sum(DailyStats.appointment_count), 0)
+    ).scalar()
     
-    monthly_revenue = db.session.query(
-        func.sum(Doctor.consultation_fees)
-    ).join(Appointment).filter(
-        Appointment.appointment_date.between(start_date, end_date),
-        Appointment.status == 'completed',
-        Appointment.payment_status == 'paid'
-    ).scalar() or 0
+    # Monthly statistics
+    monthly_appointments, monthly_revenue = db.session.query(
+        func.coalesce(func.sum(DailyStats.appointment_count), 0),
+        func.coalesce(func.sum(case((DailyStats.status == 'completed', DailyStats.revenue), else_=0)), 0)
+    ).filter(
+        DailyStats.date.between(start_date, end_date)
+    ).one()
     
     # Appointment statistics
     appointment_status = db.session.query(
-        Appointment.status,
-        func.count(Appointment.id)
-    ).group_by(Appointment.status).all()
+        DailyStats.status,
+        func.sum(DailyStats.appointment_count)
+    ).group_by(DailyStats.status).all()
     
     # Doctor statistics
     doctor_specializations = db.session.query(
         Doctor.specialization,
-        func.count(Doctor.id)
+        func.count(Doctor.doctor_id)
     ).group_by(Doctor.specialization).all()
     
     return jsonify({
         'total_statistics': {
             'patients': total_patients,
             'doctors': total_doctors,
-            'appointments': total_appointments
+            'appointments': int(total_appointments)
         },
         'monthly_statistics': {
-            'appointments': monthly_appointments,
+            'appointments': int(monthly_appointments),
             'revenue': float(monthly_revenue)
         },
-        'appointment_status': dict(appointment_status),
+        'appointment_status': {status: int(count) for status, count in appointment_status},
         'doctor_specializations': dict(doctor_specializations)
     }), 200
 
 @admin_bp.route('/feedback', methods=['GET'])
 @jwt_required()
-@admin_required
+@admin_required()
+@read_only
 def get_feedback():
-    feedback = db.session.query(
+    query = db.session.query(
         Feedback,
         Patient.first_name.label('patient_first_name'),
         Patient.last_name.label('patient_last_name'),
         Doctor.first_name.label('doctor_first_name'),
         Doctor.last_name.label('doctor_last_name')
-    ).join(Patient).join(Doctor).all()
+    ).join(Patient).join(Doctor)
     
-    return jsonify([{
-        'id': f.Feedback.id,
-        'patient_name': f'{f.patient_first_name} {f.patient_last_name}',
-        'doctor_name': f'{f.doctor_first_name} {f.doctor_last_name}',
-        'rating': f.Feedback.rating,
-        'comment': f.Feedback.comment,
-        'date': f.Feedback.date.isoformat()
-    } for f in feedback]), 200
+    return paginated_response(query, Feedback.feedback_id, lambda f: f.Feedback.feedback_id, FEEDBACK_ROW.dump)
 
 @admin_bp.route('/reports', methods=['GET'])
 @jwt_required()
-@admin_required
+@admin_required()
 @swag_from({
     'tags': ['Admin'],
     'description': 'Generate various administrative reports',
@@ -239,6 +221,22 @@ def get_feedback():
             'required': True,
             'enum': ['revenue', 'appointments', 'doctors', 'patients']
         },
+        {
+            'name': 'format',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'enum': ['json', 'csv', 'ndjson', 'parquet'],
+            'description': 'csv, ndjson and parquet are streamed as a file download; parquet needs pyarrow installed'
+        },
+        {
+            'name': 'mode',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'enum': ['async'],
+            'description': 'Produce the file in the background; poll /reports/exports/<job_id>'
+        },
         {
             'name': 'start_date',
             'in': 'query',
@@ -255,72 +253,163 @@ def get_feedback():
         }
     ]
 })
+@read_only
 def generate_report():
     report_type = request.args.get('report_type')
+    fmt = request.args.get('format', 'json')
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
     
-    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else None
-    end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else None
-    
-    if report_type == 'revenue':
-        query = db.session.query(
-            Appointment.appointment_date,
-            func.sum(Doctor.consultation_fees)
-        ).join(Doctor).filter(
-            Appointment.status == 'completed',
-            Appointment.payment_status == 'paid'
-        )
-        
-        if start_date:
-            query = query.filter(Appointment.appointment_date >= start_date)
-        if end_date:
-            query = query.filter(Appointment.appointment_date <= end_date)
-            
-        results = query.group_by(Appointment.appointment_date).all()
-        
-        return jsonify([{
-            'date': date.isoformat(),
-            'revenue': float(revenue)
-        } for date, revenue in results]), 200
-        
-    elif report_type == 'appointments':
-        query = db.session.query(
-            Appointment.appointment_date,
-            func.count(Appointment.id)
-        )
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else None
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else None
+        if report_type not in REPORT_TYPES:
+            raise ReportError('Invalid report type')
+        if fmt != 'json':
+            check_export_format(fmt)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
         
-        if start_date:
-            query = query.filter(Appointment.appointment_date >= start_date)
-        if end_date:
-            query = query.filter(Appointment.appointment_date <= end_date)
-            
-        results = query.group_by(Appointment.appointment_date).all()
+    if request.args.get('mode') == 'async':
+        if fmt == 'json':
+            return jsonify({'message': 'Async exports need format=csv, ndjson or parquet'}), 400
+        job = create_export_job(report_type, fmt, start_date, end_date)
+        from ..tasks import export_report
+        export_report.delay(job['job_id'])
+        return jsonify(job), 202
         
-        return jsonify([{
-            'date': date.isoformat(),
-            'count': count
-        } for date, count in results]), 200
+    if fmt == 'json':
+        return jsonify(list(report_records(report_type, iter_report_rows(report_type, start_date, end_date)))), 200
         
-    elif report_type == 'doctors':
-        doctors = Doctor.query.all()
+    # Rows are encoded as they are fetched, so memory use does not grow with the range
+    chunks = export_chunks(report_type, fmt, iter_report_rows(report_type, start_date, end_date))
+    filename = export_filename(report_type, fmt, start_date, end_date)
+    return Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"'
+    })
+
+@admin_bp.route('/reports/exports/<job_id>', methods=['GET'])
+@jwt_required()
+@admin_required()
+@swag_from({
+    'tags': ['Admin'],
+    'description': 'Status of an async report export',
+    'parameters': [
+        {
+            'name': 'job_id',
+            'in': 'path',
+            'type': 'string',
+            'required': True
+        }
+    ]
+})
+def get_report_export(job_id):
+    job = get_export_job(job_id)
+    if job is None:
+        return jsonify({'message': 'Export not found'}), 404
+    return jsonify(job), 200
+
+@admin_bp.route('/reports/exports/<job_id>/download', methods=['GET'])
+@jwt_required()
+@admin_required()
+@swag_from({
+    'tags': ['Admin'],
+    'description': 'Download the file produced by a finished report export',
+    'parameters': [
+        {
+            'name': 'job_id',
+            'in': 'path',
+            'type': 'string',
+            'required': True
+        }
+    ]
+})
+def download_report_export(job_id):
+    job = get_export_job(job_id)
+    if job is None:
+        return jsonify({'message': 'Export not found'}), 404
+    if job['status'] != 'done':
+        return jsonify({'message': f"Export is {job['status']}"}), 409
         
-        return jsonify([{
-            'id': doc.id,
-            'name': f"{doc.first_name} {doc.last_name}",
-            'specialization': doc.specialization,
-            'appointment_count': len(doc.appointments),
-            'average_rating': sum(f.rating for f in doc.feedback) / len(doc.feedback) if doc.feedback else 0
-        } for doc in doctors]), 200
+    return send_file(export_path(job), mimetype=EXPORT_MIMETYPES[job['format']],
+                     as_attachment=True, download_name=job['filename'])
+
+@admin_bp.route('/import/<role>', methods=['POST'])
+@jwt_required()
+@admin_required()
+@swag_from({
+    'tags': ['Admin'],
+    'description': 'Bulk import patients or doctors from a CSV or NDJSON request body',
+    'consumes': ['text/csv', 'application/x-ndjson'],
+    'parameters': [
+        {
+            'name': 'role',
+            'in': 'path',
+            'type': 'string',
+            'enum': list(IMPORT_MODELS),
+            'required': True
+        },
+        {
+            'name': 'format',
+            'in': 'query',
+            'type': 'string',
+            'enum': list(IMPORT_FORMATS),
+            'required': False
+        },
+        {
+            'name': 'chunk_size',
+            'in': 'query',
+            'type': 'integer',
+            'required': False
+        }
+    ],
+    'responses': {
+        '200': {
+            'description': 'Import summary; rejected rows are listed in the report file'
+        },
+        '400': {
+            'description': 'Unsupported role or format'
+        }
+    }
+})
+def import_users(role):
+    fmt = request.args.get('format') or ('ndjson' if 'ndjson' in request.mimetype else 'csv')
+    chunk_size = request.args.get('chunk_size', DEFAULT_CHUNK_SIZE, type=int)
+    if role not in IMPORT_MODELS or fmt not in IMPORT_FORMATS or chunk_size < 1:
+        return jsonify({'message': 'Invalid role, format or chunk size'}), 400
         
-    elif report_type == 'patients':
-        patients = Patient.query.all()
+    report_folder = current_app.config['IMPORT_REPORT_FOLDER']
+    os.makedirs(report_folder, exist_ok=True)
+    report_name = f"{role}-{datetime.utcnow():%Y%m%d%H%M%S}-{uuid4().hex[:8]}.csv"
+    report_path = os.path.join(report_folder, report_name)
+    
+    try:
+        with open(report_path, 'w', newline='') as report:
+            result = BulkImporter(role, report, chunk_size).run(iter_records(request.stream, fmt))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
         
-        return jsonify([{
-            'id': pat.id,
-            'name': f"{pat.first_name} {pat.last_name}",
-            'appointment_count': len(pat.appointments),
-            'last_visit': max(apt.appointment_date for apt in pat.appointments).isoformat() if pat.appointments else None
-        } for pat in patients]), 200
+    if not result['failed']:
+        os.remove(report_path)
+        report_name = None
         
-    return jsonify({'message': 'Invalid report type'}), 400 
\ No newline at end of file
+    return jsonify({**result, 'report': report_name}), 200
+
+@admin_bp.route('/import/reports/<path:report_name>', methods=['GET'])
+@jwt_required()
+@admin_required()
+@swag_from({
+    'tags': ['Admin'],
+    'description': 'Download the per-row error report of a bulk import',
+    'parameters': [
+        {
+            'name': 'report_name',
+            'in': 'path',
+            'type': 'string',
+            'required': True
+        }
+    ]
+})
+def get_import_report(report_name):
+    return send_from_directory(current_app.config['IMPORT_REPORT_FOLDER'], report_name, mimetype='text/csv')
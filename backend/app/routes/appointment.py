@@ -1 +1,190 @@
- 
\ No newline at end of file
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from ..utils.auth import patient_required
+from ..utils.booking import (
+    BookingError, BookingBusy, SlotUnavailable, parse_slot, book_slots, load_for_update,
+    cancel_appointment, reschedule_appointment, MAX_BULK_SLOTS
+)
+from ..utils.serializers import APPOINTMENT
+from ..utils.swagger import swag_from
+
+appointment_bp = Blueprint('appointment', __name__)
+
+SLOT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'doctor_id': {'type': 'integer'},
+        'date': {'type': 'string', 'format': 'date'},
+        'time': {'type': 'string', 'example': '09:30'},
+        'mode': {'type': 'string', 'enum': ['online', 'in-person']}
+    }
+}
+
+def _error_response(error):
+    body = {'message': str(error)}
+    if isinstance(error, SlotUnavailable):
+        body['conflicts'] = error.slots
+    headers = {'Retry-After': str(error.retry_after)} if isinstance(error, BookingBusy) else {}
+    return jsonify(body), error.status_code, headers
+
+def _can_modify(appointment):
+    role = get_jwt().get('role')
+    user_id = str(get_jwt_identity())
+    if role == 'admin':
+        return True
+    if role == 'patient':
+        return str(appointment.patient_id) == user_id
+    if role == 'doctor':
+        return str(appointment.doctor_id) == user_id
+    return False
+
+@appointment_bp.route('', methods=['POST'])
+@jwt_required()
+@patient_required()
+@swag_from({
+    'tags': ['Appointment'],
+    'description': 'Book a single doctor slot',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': SLOT_SCHEMA
+        }
+    ],
+    'responses': {
+        '201': {'description': 'Appointment booked'},
+        '400': {'description': 'Invalid slot, in the past, or outside the doctor\'s schedule'},
+        '409': {'description': 'Slot already taken'},
+        '503': {'description': 'Lost a lock to a concurrent booking; retry after Retry-After seconds'}
+    }
+})
+def book_appointment():
+    try:
+        appointment, = book_slots(get_jwt_identity(), [parse_slot(request.get_json() or {})])
+    except BookingError as e:
+        return _error_response(e)
+        
+    return jsonify(APPOINTMENT.dump(appointment)), 201
+
+@appointment_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+@patient_required()
+@swag_from({
+    'tags': ['Appointment'],
+    'description': f'Book up to {MAX_BULK_SLOTS} slots in one transaction; either all are booked or none',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'slots': {'type': 'array', 'items': SLOT_SCHEMA}
+                }
+            }
+        }
+    ],
+    'responses': {
+        '201': {'description': 'All slots booked'},
+        '400': {'description': 'Invalid slot, in the past, or outside the doctor\'s schedule; nothing was booked'},
+        '409': {'description': 'At least one slot was taken; nothing was booked'},
+        '503': {'description': 'Lost a lock to a concurrent booking; nothing was booked, retry after Retry-After seconds'}
+    }
+})
+def book_appointments_bulk():
+    data = request.get_json() or {}
+    
+    try:
+        slots = [parse_slot(slot) for slot in data.get('slots', [])]
+        appointments = book_slots(get_jwt_identity(), slots)
+    except BookingError as e:
+        return _error_response(e)
+        
+    return jsonify(APPOINTMENT.dump_many(appointments)), 201
+
+@appointment_bp.route('/<int:appointment_id>', methods=['PUT'])
+@jwt_required()
+@swag_from({
+    'tags': ['Appointment'],
+    'description': 'Move an appointment to another slot with the same doctor',
+    'parameters': [
+        {
+            'name': 'appointment_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'date': {'type': 'string', 'format': 'date'},
+                    'time': {'type': 'string', 'example': '09:30'},
+                    'version': {'type': 'integer', 'description': 'Version the client last saw'}
+                }
+            }
+        }
+    ]
+})
+def update_appointment(appointment_id):
+    data = request.get_json() or {}
+    
+    try:
+        appointment = load_for_update(appointment_id, data.get('version'))
+        if appointment is None:
+            return jsonify({'message': 'Appointment not found'}), 404
+        if not _can_modify(appointment):
+            return jsonify({'message': 'Not allowed to modify this appointment'}), 403
+            
+        slot = parse_slot({**data, 'doctor_id': appointment.doctor_id, 'mode': appointment.mode})
+        appointment = reschedule_appointment(appointment, slot['date'], slot['time'])
+    except BookingError as e:
+        return _error_response(e)
+        
+    return jsonify(APPOINTMENT.dump(appointment)), 200
+
+@appointment_bp.route('/<int:appointment_id>/cancel', methods=['POST'])
+@jwt_required()
+@swag_from({
+    'tags': ['Appointment'],
+    'description': 'Cancel an appointment and release its slot',
+    'parameters': [
+        {
+            'name': 'appointment_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': False,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'version': {'type': 'integer', 'description': 'Version the client last saw'}
+                }
+            }
+        }
+    ]
+})
+def cancel(appointment_id):
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        appointment = load_for_update(appointment_id, data.get('version'))
+        if appointment is None:
+            return jsonify({'message': 'Appointment not found'}), 404
+        if not _can_modify(appointment):
+            return jsonify({'message': 'Not allowed to modify this appointment'}), 403
+            
+        appointment = cancel_appointment(appointment)
+    except BookingError as e:
+        return _error_response(e)
+        
+    return jsonify(APPOINTMENT.dump(appointment)), 200
@@ -3,7 +3,9 @@ from flask_jwt_extended import create_access_token, create_refresh_token, jwt_re
 from werkzeug.security import generate_password_hash
 from ..models.models import db, Patient, Doctor, Admin
 from ..utils.auth import generate_token_response
-from flasgger import swag_from
+from ..utils.passwords import needs_rehash
+from ..utils.credentials import load_user, CREDENTIAL_MODELS
+from ..utils.swagger import swag_from
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -125,7 +127,7 @@ def register_doctor():
 @auth_bp.route('/login', methods=['POST'])
 @swag_from({
     'tags': ['Authentication'],
-    'description': 'Login for patients, doctors, and admins',
+    'description': 'Login for patients, doctors, and admins; role is inferred from the email when omitted',
     'parameters': [
         {
             'name': 'body',
@@ -146,18 +148,22 @@ def login():
     data = request.get_json()
     email = data.get('email')
     password = data.get('password')
-    role = data.get('role', 'patient')
+    role = data.get('role')
     
-    if role == 'patient':
-        user = Patient.query.filter_by(email=email).first()
-    elif role == 'doctor':
-        user = Doctor.query.filter_by(email=email).first()
-    elif role == 'admin':
-        user = Admin.query.filter_by(email=email).first()
-    else:
+    if role and role not in CREDENTIAL_MODELS:
         return jsonify({'message': 'Invalid role'}), 400
         
+    # One indexed credential lookup resolves the role when it is not given
+    user, role = load_user(email, role)
+        
     if user and user.check_password(password):
+        # Upgrade stored hashes created with an older hasher or cost
+        if needs_rehash(user.password_hash):
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
         return jsonify(generate_token_response(user, role)), 200
     
     return jsonify({'message': 'Invalid credentials'}), 401
@@ -1 +1,140 @@
- 
\ No newline at end of file
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..models.models import db, DoctorSchedule
+from ..utils.auth import doctor_required
+from ..utils.slot_index import get_slot_index, check_schedule_entry
+from ..utils.serializers import SCHEDULE
+from ..utils.swagger import swag_from
+from datetime import datetime, timedelta
+
+doctor_bp = Blueprint('doctor', __name__)
+
+MAX_SEARCH_DAYS = 90
+MAX_SEARCH_RESULTS = 100
+
+@doctor_bp.route('/availability', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['Doctor'],
+    'description': 'Next free appointment slots for a specialization, earliest first',
+    'parameters': [
+        {
+            'name': 'specialization',
+            'in': 'query',
+            'type': 'string',
+            'required': True
+        },
+        {
+            'name': 'start_date',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date',
+            'required': False,
+            'description': 'Defaults to today'
+        },
+        {
+            'name': 'end_date',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date',
+            'required': False,
+            'description': f'Defaults to start_date + 30 days (at most {MAX_SEARCH_DAYS} days)'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': f'Number of slots to return (default 10, max {MAX_SEARCH_RESULTS})'
+        }
+    ]
+})
+def get_availability():
+    specialization = request.args.get('specialization')
+    if not specialization:
+        return jsonify({'message': 'specialization is required'}), 400
+        
+    try:
+        start_date_str = request.args.get('start_date')
+        end_date_str = request.args.get('end_date')
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else datetime.now().date()
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else start_date + timedelta(days=30)
+        limit = min(int(request.args.get('limit', 10)), MAX_SEARCH_RESULTS)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+        
+    end_date = min(end_date, start_date + timedelta(days=MAX_SEARCH_DAYS))
+    
+    index = get_slot_index()
+    index.ensure_fresh()
+    
+    return jsonify(index.next_free_slots(specialization, start_date, end_date, limit)), 200
+
+@doctor_bp.route('/schedule', methods=['GET'])
+@jwt_required()
+@doctor_required()
+def get_schedule():
+    doctor_id = get_jwt_identity()
+    schedules = DoctorSchedule.query.filter_by(doctor_id=doctor_id).order_by(
+        DoctorSchedule.weekday, DoctorSchedule.start_time
+    ).all()
+    
+    return jsonify(SCHEDULE.dump_many(schedules)), 200
+
+@doctor_bp.route('/schedule', methods=['PUT'])
+@jwt_required()
+@doctor_required()
+@swag_from({
+    'tags': ['Doctor'],
+    'description': 'Replace the weekly working hours of the current doctor',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'schedule': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'weekday': {'type': 'integer', 'minimum': 0, 'maximum': 6},
+                                'start_time': {'type': 'string', 'example': '09:00', 'description': 'HH:MM on a 5 minute boundary'},
+                                'end_time': {'type': 'string', 'example': '17:00', 'description': 'HH:MM after start_time, on a 5 minute boundary'},
+                                'slot_minutes': {'type': 'integer', 'example': 30, 'description': 'A multiple of 5'}
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    ]
+})
+def update_schedule():
+    doctor_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    
+    try:
+        schedules = [DoctorSchedule(
+            doctor_id=doctor_id,
+            weekday=int(entry['weekday']),
+            start_time=datetime.strptime(entry['start_time'], '%H:%M').time(),
+            end_time=datetime.strptime(entry['end_time'], '%H:%M').time(),
+            slot_minutes=int(entry.get('slot_minutes', 30))
+        ) for entry in data.get('schedule', [])]
+        for schedule in schedules:
+            check_schedule_entry(schedule)
+        
+        # Delete through the session so the slot index sees the old rows go
+        for schedule in DoctorSchedule.query.filter_by(doctor_id=doctor_id):
+            db.session.delete(schedule)
+        db.session.add_all(schedules)
+        db.session.commit()
+        
+        return jsonify({'message': 'Schedule updated successfully'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
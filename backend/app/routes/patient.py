@@ -1,15 +1,21 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..models.models import db, Patient, Appointment, MedicalReport, Prescription, Doctor, Feedback
-from ..utils.auth import patient_required
-from flasgger import swag_from
+from ..models.models import db, Appointment, MedicalReport, Prescription, Doctor, Feedback
+from ..utils.auth import patient_required, get_current_user
+from ..utils.query_counter import query_budget
+from ..utils.replicas import read_only
+from ..utils.doctor_cache import cached_directory_response
+from ..utils.doctor_search import search_doctors
+from ..utils.serializers import PATIENT, PATIENT_APPOINTMENT, MEDICAL_REPORT, PRESCRIPTION, DOCTOR_DIRECTORY, DOCTOR_SEARCH
+from ..utils.swagger import swag_from
+from sqlalchemy.orm import joinedload, load_only
 from datetime import datetime
 
 patient_bp = Blueprint('patient', __name__)
 
 @patient_bp.route('/profile', methods=['GET'])
 @jwt_required()
-@patient_required
+@patient_required()
 @swag_from({
     'tags': ['Patient'],
     'description': 'Get patient profile information',
@@ -19,22 +25,17 @@ patient_bp = Blueprint('patient', __name__)
         }
     }
 })
+@read_only
 def get_profile():
-    patient_id = get_jwt_identity()
-    patient = Patient.query.get_or_404(patient_id)
+    patient = get_current_user()
+    if patient is None:
+        return jsonify({'message': 'Patient not found'}), 404
     
-    return jsonify({
-        'id': patient.id,
-        'first_name': patient.first_name,
-        'last_name': patient.last_name,
-        'email': patient.email,
-        'date_of_birth': patient.date_of_birth.isoformat(),
-        'contact_number': patient.contact_number
-    }), 200
+    return jsonify(PATIENT.dump(patient)), 200
 
 @patient_bp.route('/profile', methods=['PUT'])
 @jwt_required()
-@patient_required
+@patient_required()
 @swag_from({
     'tags': ['Patient'],
     'description': 'Update patient profile information',
@@ -56,8 +57,9 @@ def get_profile():
     ]
 })
 def update_profile():
-    patient_id = get_jwt_identity()
-    patient = Patient.query.get_or_404(patient_id)
+    patient = get_current_user()
+    if patient is None:
+        return jsonify({'message': 'Patient not found'}), 404
     data = request.get_json()
     
     try:
@@ -79,7 +81,7 @@ def update_profile():
 
 @patient_bp.route('/appointments', methods=['GET'])
 @jwt_required()
-@patient_required
+@patient_required()
 @swag_from({
     'tags': ['Patient'],
     'description': 'Get patient appointments',
@@ -93,61 +95,49 @@ def update_profile():
         }
     ]
 })
+@query_budget(1)
+@read_only
 def get_appointments():
     patient_id = get_jwt_identity()
     status = request.args.get('status')
     
-    query = Appointment.query.filter_by(patient_id=patient_id)
+    query = Appointment.query.filter_by(patient_id=patient_id).options(
+        joinedload(Appointment.doctor).load_only(Doctor.first_name, Doctor.last_name)
+    )
     if status:
         query = query.filter_by(status=status)
         
-    appointments = query.all()
-    
-    return jsonify([{
-        'id': apt.id,
-        'doctor_name': f"{apt.doctor.first_name} {apt.doctor.last_name}",
-        'date': apt.appointment_date.isoformat(),
-        'time': apt.appointment_time.strftime('%H:%M'),
-        'status': apt.status,
-        'mode': apt.mode,
-        'payment_status': apt.payment_status
-    } for apt in appointments]), 200
+    return jsonify(PATIENT_APPOINTMENT.dump_many(query.all())), 200
 
 @patient_bp.route('/medical-reports', methods=['GET'])
 @jwt_required()
-@patient_required
+@patient_required()
+@query_budget(1)
+@read_only
 def get_medical_reports():
     patient_id = get_jwt_identity()
-    reports = MedicalReport.query.filter_by(patient_id=patient_id).all()
+    reports = MedicalReport.query.filter_by(patient_id=patient_id).options(
+        joinedload(MedicalReport.doctor).load_only(Doctor.first_name, Doctor.last_name)
+    ).all()
     
-    return jsonify([{
-        'id': report.id,
-        'doctor_name': f"{report.doctor.first_name} {report.doctor.last_name}",
-        'date': report.date.isoformat(),
-        'diagnosis': report.diagnosis,
-        'symptoms': report.symptoms,
-        'prescription_id': report.prescription_id
-    } for report in reports]), 200
+    return jsonify(MEDICAL_REPORT.dump_many(reports)), 200
 
 @patient_bp.route('/prescriptions', methods=['GET'])
 @jwt_required()
-@patient_required
+@patient_required()
+@query_budget(1)
+@read_only
 def get_prescriptions():
     patient_id = get_jwt_identity()
-    prescriptions = Prescription.query.filter_by(patient_id=patient_id).all()
+    prescriptions = Prescription.query.filter_by(patient_id=patient_id).options(
+        joinedload(Prescription.doctor).load_only(Doctor.first_name, Doctor.last_name)
+    ).all()
     
-    return jsonify([{
-        'id': prescription.id,
-        'doctor_name': f"{prescription.doctor.first_name} {prescription.doctor.last_name}",
-        'date': prescription.date.isoformat(),
-        'medications': prescription.medications,
-        'dosage': prescription.dosage,
-        'duration': prescription.duration
-    } for prescription in prescriptions]), 200
+    return jsonify(PRESCRIPTION.dump_many(prescriptions)), 200
 
 @patient_bp.route('/doctors', methods=['GET'])
 @jwt_required()
-@patient_required
+@patient_required()
 @swag_from({
     'tags': ['Patient'],
     'description': 'Get list of doctors',
@@ -161,26 +151,61 @@ def get_prescriptions():
         }
     ]
 })
+@read_only
 def get_doctors():
-    specialization = request.args.get('specialization')
+    specialization = request.args.get('specialization') or None
     
-    query = Doctor.query
-    if specialization:
-        query = query.filter_by(specialization=specialization)
+    def build():
+        query = Doctor.query
+        if specialization:
+            query = query.filter_by(specialization=specialization)
+            
+        return DOCTOR_DIRECTORY.dump_many(query.all())
         
-    doctors = query.all()
+    return cached_directory_response(specialization, build), 200
+
+@patient_bp.route('/doctors/search', methods=['GET'])
+@jwt_required()
+@patient_required()
+@swag_from({
+    'tags': ['Patient'],
+    'description': 'Search doctors by name, specialization or clinic; partial words match as prefixes',
+    'parameters': [
+        {
+            'name': 'q',
+            'in': 'query',
+            'type': 'string',
+            'required': True,
+            'description': 'Search text, e.g. "car gen" for cardiologists at General Hospital'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Maximum number of results (default 20, max 50)'
+        }
+    ]
+})
+@read_only
+def search_doctor_directory():
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+    doctor_ids = search_doctors(request.args.get('q', ''), limit)
+    if not doctor_ids:
+        return jsonify([]), 200
+    
+    doctors = Doctor.query.filter(Doctor.doctor_id.in_(doctor_ids)).options(
+        load_only(Doctor.first_name, Doctor.last_name, Doctor.specialization,
+                  Doctor.clinic_hospital_name, Doctor.consultation_fees)
+    )
+    by_id = {doctor.doctor_id: doctor for doctor in doctors}
     
-    return jsonify([{
-        'id': doctor.id,
-        'first_name': doctor.first_name,
-        'last_name': doctor.last_name,
-        'specialization': doctor.specialization,
-        'consultation_fees': doctor.consultation_fees
-    } for doctor in doctors]), 200
+    # Keep the index's ranking; ids removed since it was read are skipped
+    return jsonify([DOCTOR_SEARCH.dump(by_id[doctor_id]) for doctor_id in doctor_ids if doctor_id in by_id]), 200
 
 @patient_bp.route('/feedback', methods=['POST'])
 @jwt_required()
-@patient_required
+@patient_required()
 @swag_from({
     'tags': ['Patient'],
     'description': 'Submit feedback for a doctor',
@@ -209,7 +234,8 @@ def submit_feedback():
             patient_id=patient_id,
             doctor_id=data['doctor_id'],
             rating=data['rating'],
-            comment=data.get('comment', '')
+            comments=data.get('comment', ''),
+            date=datetime.now().date()
         )
         
         db.session.add(feedback)
@@ -0,0 +1,304 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from ..models.models import db, MedicalReport, Feedback
+from ..utils.file_handler import (
+    UploadError, store_stream, start_upload, get_upload, upload_part, list_parts, complete_upload, abort_upload,
+    send_stored_file, stored_file_exists, file_type_for
+)
+from ..utils.media import MEDIA_FIELDS, RENDITIONS, attach_file
+from ..utils.swagger import swag_from
+
+upload_bp = Blueprint('upload', __name__)
+
+def _owner():
+    return f"{get_jwt().get('role')}:{get_jwt_identity()}"
+
+def _owned_upload(upload_id):
+    session = get_upload(upload_id)
+    if session is None or session['owner'] != _owner():
+        return None
+    return session
+
+def _public(session):
+    return {key: value for key, value in session.items() if key not in ('owner', 's3_upload_id')}
+
+@upload_bp.route('', methods=['POST'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Start a resumable upload; send parts with PUT /uploads/{upload_id}/parts/{n}',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'file_type': {'type': 'string', 'enum': ['image', 'document', 'video']},
+                    'filename': {'type': 'string'},
+                    'content_type': {'type': 'string'}
+                }
+            }
+        }
+    ],
+    'responses': {
+        '201': {
+            'description': 'Upload session created'
+        }
+    }
+})
+def create_upload():
+    data = request.get_json() or {}
+
+    try:
+        session = start_upload(data.get('file_type'), data.get('filename'), data.get('content_type'), _owner())
+    except UploadError as e:
+        return jsonify({'message': str(e)}), 400
+
+    return jsonify(_public(session)), 201
+
+@upload_bp.route('/stream', methods=['POST'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Upload a file in one request; the raw request body is the file content',
+    'consumes': ['application/octet-stream'],
+    'parameters': [
+        {
+            'name': 'file_type',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['image', 'document', 'video'],
+            'required': True
+        },
+        {
+            'name': 'filename',
+            'in': 'query',
+            'type': 'string',
+            'required': True
+        }
+    ],
+    'responses': {
+        '201': {
+            'description': 'Stored file name, SHA-256, size and whether the content already existed'
+        }
+    }
+})
+def stream_upload():
+    try:
+        result = store_stream(request.stream, request.args.get('file_type'),
+                              request.args.get('filename'), request.content_type)
+    except UploadError as e:
+        return jsonify({'message': str(e)}), 400
+
+    return jsonify(result), 201
+
+@upload_bp.route('/<upload_id>', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Parts received so far, to resume an interrupted upload'
+})
+def get_upload_status(upload_id):
+    session = _owned_upload(upload_id)
+    if session is None:
+        return jsonify({'message': 'Upload not found'}), 404
+
+    return jsonify({**_public(session), 'parts': list_parts(session)}), 200
+
+@upload_bp.route('/<upload_id>/parts/<int:part_number>', methods=['PUT'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Send one part; re-sending a part number replaces it. Every part but the last must be at least 5 MB',
+    'consumes': ['application/octet-stream']
+})
+def put_upload_part(upload_id, part_number):
+    session = _owned_upload(upload_id)
+    if session is None:
+        return jsonify({'message': 'Upload not found'}), 404
+
+    try:
+        return jsonify(upload_part(session, part_number, request.stream)), 200
+    except UploadError as e:
+        return jsonify({'message': str(e)}), 400
+
+@upload_bp.route('/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Assemble the parts into a content-addressed file'
+})
+def finish_upload(upload_id):
+    session = _owned_upload(upload_id)
+    if session is None:
+        return jsonify({'message': 'Upload not found'}), 404
+
+    try:
+        return jsonify(complete_upload(session)), 201
+    except UploadError as e:
+        return jsonify({'message': str(e)}), 400
+
+@upload_bp.route('/<upload_id>', methods=['DELETE'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Abort an upload and discard its parts'
+})
+def cancel_upload(upload_id):
+    session = _owned_upload(upload_id)
+    if session is None:
+        return jsonify({'message': 'Upload not found'}), 404
+
+    abort_upload(session)
+    return '', 204
+
+def _can_access(patient_id, doctor_id):
+    role = get_jwt().get('role')
+    identity = int(get_jwt_identity())
+    return role == 'admin' or \
+           (role == 'patient' and patient_id == identity) or \
+           (role == 'doctor' and doctor_id == identity)
+
+def _serve(row, file_type):
+    if row is None or not row[2]:
+        return jsonify({'message': 'File not found'}), 404
+    if not _can_access(row[0], row[1]):
+        return jsonify({'message': 'Access denied'}), 403
+
+    response = send_stored_file(row[2], file_type)
+    if response is None:
+        return jsonify({'message': 'File not found'}), 404
+    return response
+
+@upload_bp.route('/medical-reports/<int:report_id>/file', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Download the file attached to a medical report (patient, doctor or admin); supports Range and conditional requests'
+})
+def download_report_file(report_id):
+    row = db.session.query(
+        MedicalReport.patient_id, MedicalReport.doctor_id, MedicalReport.uploaded_report_file
+    ).filter(MedicalReport.report_id == report_id).first()
+    return _serve(row, None)
+
+@upload_bp.route('/feedback/<int:feedback_id>/video', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Stream a feedback video (patient, doctor or admin); supports Range requests for seeking'
+})
+def download_feedback_video(feedback_id):
+    row = db.session.query(
+        Feedback.patient_id, Feedback.doctor_id, Feedback.video_file
+    ).filter(Feedback.feedback_id == feedback_id).first()
+    return _serve(row, 'video')
+
+RENDITION_PARAMETER = {
+    'name': 'rendition',
+    'in': 'path',
+    'type': 'string',
+    'enum': list(RENDITIONS),
+    'required': True
+}
+
+def _serve_rendition(model, record_id, column_prefix, rendition):
+    if rendition not in RENDITIONS:
+        return jsonify({'message': 'Unknown rendition'}), 404
+    primary_key = model.__mapper__.primary_key[0]
+    row = db.session.query(
+        model.patient_id, model.doctor_id, getattr(model, f'{column_prefix}{rendition}')
+    ).filter(primary_key == record_id).first()
+    return _serve(row, None)
+
+@upload_bp.route('/medical-reports/<int:report_id>/file/<rendition>', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Download the JPEG thumbnail (256px) or preview (1600px) of a medical report file',
+    'parameters': [RENDITION_PARAMETER]
+})
+def download_report_rendition(report_id, rendition):
+    return _serve_rendition(MedicalReport, report_id, 'file_', rendition)
+
+@upload_bp.route('/feedback/<int:feedback_id>/video/<rendition>', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Download the poster thumbnail (JPEG) or the 1280px-wide MP4 preview of a feedback video',
+    'parameters': [RENDITION_PARAMETER]
+})
+def download_feedback_rendition(feedback_id, rendition):
+    return _serve_rendition(Feedback, feedback_id, 'video_', rendition)
+
+def _attach(kind, record_id, owner_role):
+    model, _, prefix = MEDIA_FIELDS[kind]
+    record = db.session.get(model, record_id)
+    if record is None:
+        return jsonify({'message': 'Record not found'}), 404
+    role = get_jwt().get('role')
+    if role != 'admin' and (role != owner_role or getattr(record, f'{owner_role}_id') != int(get_jwt_identity())):
+        return jsonify({'message': 'Access denied'}), 403
+
+    filename = (request.get_json() or {}).get('filename')
+    file_type = 'video' if kind == 'feedback' else file_type_for(filename or '')
+    if not filename or not stored_file_exists(filename, file_type):
+        return jsonify({'message': 'Upload the file first and pass the returned filename'}), 400
+
+    try:
+        attach_file(record, kind, filename)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+
+    # Thumbnails, previews and MIME sniffing happen in the worker
+    from ..tasks import process_upload
+    process_upload.delay(kind, record_id)
+    return jsonify({'filename': filename, 'status': getattr(record, f'{prefix}status')}), 202
+
+@upload_bp.route('/medical-reports/<int:report_id>/file', methods=['PUT'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Attach an uploaded file to a medical report (owning doctor or admin) and queue its processing',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'filename': {'type': 'string'}
+                }
+            }
+        }
+    ]
+})
+def attach_report_file(report_id):
+    return _attach('medical_report', report_id, 'doctor')
+
+@upload_bp.route('/feedback/<int:feedback_id>/video', methods=['PUT'])
+@jwt_required()
+@swag_from({
+    'tags': ['Uploads'],
+    'description': 'Attach an uploaded video to feedback (owning patient or admin) and queue its processing',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'filename': {'type': 'string'}
+                }
+            }
+        }
+    ]
+})
+def attach_feedback_video(feedback_id):
+    return _attach('feedback', feedback_id, 'patient')
@@ -0,0 +1,49 @@
+import asyncio
+import os
+from flask import has_app_context
+from . import celery, ensure_celery_configured
+from .utils.reports import run_export_job
+from .utils.media import process_media
+from .utils.file_handler import reap_expired_uploads
+from .utils.reminders import get_scheduler
+
+# Worker and beat processes import this module without create_app; give them
+# the broker settings and beat schedule before the tasks are registered
+ensure_celery_configured()
+
+_app = None
+
+def _with_app_context(fn, *args):
+    # Eager tasks already run inside the request's app context; workers build their own
+    global _app
+    if has_app_context():
+        return fn(*args)
+    if _app is None:
+        from . import create_app
+        _app = create_app(os.getenv('FLASK_ENV', 'development'))
+    with _app.app_context():
+        return fn(*args)
+
+@celery.task(name='reports.export')
+def export_report(job_id):
+    job = _with_app_context(run_export_job, job_id)
+    return job['status'] if job else None
+
+@celery.task(name='media.process')
+def process_upload(kind, record_id):
+    return _with_app_context(process_media, kind, record_id)
+
+def _dispatch_reminders():
+    scheduler = get_scheduler()
+    asyncio.run(scheduler.tick())
+    return scheduler.metrics.snapshot()
+
+@celery.task(name='reminders.dispatch')
+def dispatch_reminders():
+    # Run by Celery beat every REMINDER_POLL_INTERVAL seconds; the heap lives on
+    # in the worker process between runs
+    return _with_app_context(_dispatch_reminders)
+
+@celery.task(name='uploads.reap')
+def reap_uploads():
+    return _with_app_context(reap_expired_uploads)
@@ -1,7 +1,7 @@
 from functools import wraps
 from flask import request, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
-from ..models.models import Patient, Doctor, Admin
+from .principal_cache import load_principal
 
 def admin_required():
     def wrapper(fn):
@@ -44,13 +44,7 @@ def get_current_user():
     user_id = get_jwt_identity()
     role = claims.get("role")
     
-    if role == "patient":
-        return Patient.query.get(user_id)
-    elif role == "doctor":
-        return Doctor.query.get(user_id)
-    elif role == "admin":
-        return Admin.query.get(user_id)
-    return None
+    return load_principal(role, user_id)
 
 def generate_token_response(user, role):
     from flask_jwt_extended import create_access_token, create_refresh_token
@@ -0,0 +1,204 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+from ..models.models import db, Appointment, Doctor, DoctorSchedule, ReminderLog
+
+CANCELLED_STATUS = 'cancelled'
+SCHEDULED_STATUS = 'Scheduled'
+MAX_BULK_SLOTS = 100
+RETRY_AFTER_SECONDS = 1
+# MySQL lock wait timeout and deadlock
+_MYSQL_LOCK_ERRORS = (1205, 1213)
+
+class BookingError(Exception):
+    status_code = 400
+
+class SlotUnavailable(BookingError):
+    status_code = 409
+
+    def __init__(self, slots):
+        super().__init__('Requested slot is no longer available')
+        self.slots = slots
+
+class StaleAppointment(BookingError):
+    status_code = 409
+
+    def __init__(self):
+        super().__init__('Appointment was modified by another request')
+
+class BookingBusy(BookingError):
+    # Lost a lock to a concurrent booking; nothing was written, so the client
+    # can send the same request again
+    status_code = 503
+    retry_after = RETRY_AFTER_SECONDS
+
+    def __init__(self):
+        super().__init__('Bookings are busy; please retry')
+
+def _is_lock_error(error):
+    orig = error.orig
+    code = orig.args[0] if getattr(orig, 'args', None) else None
+    return 'database is locked' in str(orig) or code in _MYSQL_LOCK_ERRORS
+
+@contextmanager
+def _lock_errors():
+    try:
+        yield
+    except OperationalError as e:
+        if not _is_lock_error(e):
+            raise
+        db.session.rollback()
+        raise BookingBusy()
+
+def parse_slot(data):
+    try:
+        return {
+            'doctor_id': int(data['doctor_id']),
+            'date': datetime.strptime(data['date'], '%Y-%m-%d').date(),
+            'time': datetime.strptime(data['time'], '%H:%M').time(),
+            'mode': data['mode']
+        }
+    except KeyError as e:
+        raise BookingError(f'Missing field: {e.args[0]}')
+    except (TypeError, ValueError):
+        raise BookingError('Invalid slot: expected doctor_id, date (YYYY-MM-DD), time (HH:MM) and mode')
+
+def _slot_key(slot):
+    return (slot['doctor_id'], slot['date'], slot['time'])
+
+def _in_schedule(schedule, start):
+    # Same slots the availability index offers: every slot_minutes from
+    # start_time, ending by end_time
+    minute = start.hour * 60 + start.minute
+    first = schedule.start_time.hour * 60 + schedule.start_time.minute
+    last = schedule.end_time.hour * 60 + schedule.end_time.minute - schedule.slot_minutes
+    return start.second == 0 and first <= minute <= last and (minute - first) % schedule.slot_minutes == 0
+
+def check_schedule(slots):
+    doctor_ids = {slot['doctor_id'] for slot in slots}
+    schedules = defaultdict(list)
+    for schedule in DoctorSchedule.query.filter(DoctorSchedule.doctor_id.in_(doctor_ids)):
+        schedules[(schedule.doctor_id, schedule.weekday)].append(schedule)
+
+    for slot in slots:
+        day_schedules = schedules[(slot['doctor_id'], slot['date'].weekday())]
+        if not any(_in_schedule(schedule, slot['time']) for schedule in day_schedules):
+            raise BookingError(
+                f"Doctor {slot['doctor_id']} has no slot at "
+                f"{slot['date'].isoformat()} {slot['time'].strftime('%H:%M')}"
+            )
+
+def check_not_past(slots):
+    now = datetime.now()
+    for slot in slots:
+        if datetime.combine(slot['date'], slot['time']) <= now:
+            raise BookingError(
+                f"Cannot book a slot in the past: "
+                f"{slot['date'].isoformat()} {slot['time'].strftime('%H:%M')}"
+            )
+
+def taken_slots(slots):
+    keys = [_slot_key(slot) for slot in slots]
+    rows = db.session.query(Appointment.doctor_id, Appointment.date, Appointment.time).filter(
+        tuple_(Appointment.doctor_id, Appointment.date, Appointment.time).in_(keys),
+        Appointment.slot_active.is_(True)
+    ).all()
+    return [{
+        'doctor_id': doctor_id,
+        'date': date.isoformat(),
+        'time': time.strftime('%H:%M')
+    } for doctor_id, date, time in rows]
+
+def book_slots(patient_id, slots):
+    if not slots:
+        raise BookingError('No slots requested')
+    if len(slots) > MAX_BULK_SLOTS:
+        raise BookingError(f'At most {MAX_BULK_SLOTS} slots can be booked at once')
+    if len({_slot_key(slot) for slot in slots}) != len(slots):
+        raise BookingError('Duplicate slots in request')
+
+    doctor_ids = {slot['doctor_id'] for slot in slots}
+    known = {doctor_id for doctor_id, in db.session.query(Doctor.doctor_id).filter(Doctor.doctor_id.in_(doctor_ids))}
+    if doctor_ids - known:
+        raise BookingError(f'Unknown doctor: {min(doctor_ids - known)}')
+    check_not_past(slots)
+    check_schedule(slots)
+
+    appointments = [Appointment(
+        patient_id=patient_id,
+        doctor_id=slot['doctor_id'],
+        date=slot['date'],
+        time=slot['time'],
+        mode=slot['mode'],
+        status=SCHEDULED_STATUS,
+        slot_active=True
+    ) for slot in slots]
+
+    # No read-then-insert check: the uq_appointment_doctor_slot constraint decides
+    # the race, and all slots commit or roll back together
+    db.session.add_all(appointments)
+    try:
+        with _lock_errors():
+            db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise SlotUnavailable(taken_slots(slots))
+
+    return appointments
+
+def load_for_update(appointment_id, expected_version=None):
+    # Row lock on MySQL; the version column still catches races on SQLite
+    with _lock_errors():
+        appointment = db.session.get(Appointment, appointment_id, with_for_update=True, populate_existing=True)
+    if appointment is None:
+        return None
+    if expected_version is None:
+        return appointment
+
+    try:
+        expected_version = int(expected_version)
+    except (TypeError, ValueError):
+        raise BookingError('Invalid version')
+    if appointment.version != expected_version:
+        db.session.rollback()
+        raise StaleAppointment()
+    return appointment
+
+def _commit_change(slots=None):
+    try:
+        with _lock_errors():
+            db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        raise StaleAppointment()
+    except IntegrityError:
+        db.session.rollback()
+        raise SlotUnavailable(taken_slots(slots) if slots else [])
+
+def cancel_appointment(appointment):
+    if appointment.status == CANCELLED_STATUS:
+        raise BookingError('Appointment is already cancelled')
+
+    appointment.status = CANCELLED_STATUS
+    appointment.slot_active = None
+    _commit_change()
+    return appointment
+
+def reschedule_appointment(appointment, date, time):
+    if appointment.status == CANCELLED_STATUS:
+        raise BookingError('Cannot reschedule a cancelled appointment')
+
+    slot = {'doctor_id': appointment.doctor_id, 'date': date, 'time': time}
+    if (appointment.date, appointment.time) != (date, time):
+        check_not_past([slot])
+        check_schedule([slot])
+        # Reminders already handled were for the old time; the scheduler
+        # queues the new time's reminders on its next refill
+        ReminderLog.query.filter_by(appointment_id=appointment.appointment_id).delete()
+    appointment.date = date
+    appointment.time = time
+    _commit_change([slot])
+    return appointment
@@ -0,0 +1,214 @@
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from ..models.models import db, Patient, Doctor, Credential
+from .credentials import normalize_email, publish_emails
+from .doctor_cache import invalidate_directory
+from .doctor_search import index_doctors
+from .passwords import hash_many, UNUSABLE_PASSWORD
+
+IMPORT_MODELS = {'patient': Patient, 'doctor': Doctor}
+IMPORT_FORMATS = ('csv', 'ndjson')
+DEFAULT_CHUNK_SIZE = 2000
+REPORT_COLUMNS = ['line', 'email', 'error']
+
+class BulkImportError(ValueError):
+    pass
+
+def _text(max_length):
+    def parse(value):
+        value = str(value).strip()
+        if len(value) > max_length:
+            raise ValueError(f'longer than {max_length} characters')
+        return value
+    return parse
+
+def _date(value):
+    return date.fromisoformat(str(value).strip())
+
+def _integer(value):
+    return int(str(value).strip())
+
+def _money(value):
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError('not a number')
+    if amount < 0 or not amount.is_finite():
+        raise ValueError('must be a positive amount')
+    return amount
+
+# field -> (required, parser, default); every row of a chunk must carry the same
+# keys for executemany, so optional fields fall back to their column default
+FIELDS = {
+    'patient': {
+        'first_name': (True, _text(50), None),
+        'last_name': (True, _text(50), None),
+        'email': (True, _text(100), None),
+        'date_of_birth': (True, _date, None),
+        'contact_number': (True, _text(15), None),
+        'gender': (False, _text(10), None),
+        'blood_type': (False, _text(5), None),
+        'address': (False, _text(255), None),
+        'emergency_contact': (False, _text(100), None),
+        'insurance_details': (False, _text(255), None)
+    },
+    'doctor': {
+        'first_name': (True, _text(50), None),
+        'last_name': (True, _text(50), None),
+        'email': (True, _text(100), None),
+        'specialization': (True, _text(100), None),
+        'contact_number': (True, _text(15), None),
+        'consultation_fees': (True, _money, None),
+        'experience_years': (False, _integer, None),
+        'clinic_hospital_name': (False, _text(255), None),
+        'availability_status': (False, _text(20), 'Available')
+    }
+}
+
+def iter_records(stream, fmt):
+    # Works on any binary line iterator: request.stream or an open file
+    lines = (line.decode('utf-8-sig') for line in stream)
+
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'ndjson':
+        for line_no, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, BulkImportError(f'invalid JSON: {e}')
+                continue
+            yield line_no, record if isinstance(record, dict) else BulkImportError('expected a JSON object')
+    else:
+        raise BulkImportError(f"Unsupported format '{fmt}', expected one of {', '.join(IMPORT_FORMATS)}")
+
+def validate_record(role, record):
+    if isinstance(record, Exception):
+        raise record
+
+    values = {}
+    for field, (required, parse, default) in FIELDS[role].items():
+        raw = record.get(field)
+        if raw is None or str(raw).strip() == '':
+            if required:
+                raise BulkImportError(f'{field} is required')
+            values[field] = default
+            continue
+        try:
+            values[field] = parse(raw)
+        except (TypeError, ValueError) as e:
+            raise BulkImportError(f'{field}: {e}')
+
+    values['email'] = normalize_email(values['email'])
+    if '@' not in values['email']:
+        raise BulkImportError('email is invalid')
+    if len(values['email']) > 50:
+        # The email doubles as the username, which is shorter
+        raise BulkImportError('email is too long to be used as a username')
+    values['username'] = values['email']
+
+    password = record.get('password')
+    return values, str(password) if password not in (None, '') else None
+
+class BulkImporter:
+    def __init__(self, role, report=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        if role not in IMPORT_MODELS:
+            raise BulkImportError(f"Unsupported role '{role}', expected one of {', '.join(IMPORT_MODELS)}")
+        self.role = role
+        self.model = IMPORT_MODELS[role]
+        self.chunk_size = chunk_size
+        self.report = csv.writer(report) if report is not None else None
+        self.imported = 0
+        self.failed = 0
+        self._seen = set()
+
+    def _reject(self, line_no, email, message):
+        self.failed += 1
+        if self.report is not None:
+            self.report.writerow([line_no, email or '', message])
+
+    def run(self, records):
+        if self.report is not None:
+            self.report.writerow(REPORT_COLUMNS)
+
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            self._import_chunk(chunk)
+
+        return {'imported': self.imported, 'failed': self.failed}
+
+    def _import_chunk(self, chunk):
+        valid = []
+        for line_no, record in chunk:
+            try:
+                values, password = validate_record(self.role, record)
+            except BulkImportError as e:
+                email = record.get('email') if isinstance(record, dict) else None
+                self._reject(line_no, email, str(e))
+                continue
+
+            if values['email'] in self._seen:
+                self._reject(line_no, values['email'], 'duplicate email in import')
+                continue
+            self._seen.add(values['email'])
+            valid.append((line_no, values, password))
+
+        if not valid:
+            return
+
+        # One IN query per chunk instead of a SELECT per row
+        existing = set(db.session.execute(
+            select(self.model.email).where(self.model.email.in_([values['email'] for _, values, _ in valid]))
+        ).scalars())
+        rows = []
+        for line_no, values, password in valid:
+            if values['email'] in existing:
+                self._reject(line_no, values['email'], 'email already registered')
+            else:
+                rows.append((line_no, values, password))
+
+        if not rows:
+            return
+
+        passwords = [password for _, _, password in rows if password is not None]
+        hashes = iter(hash_many(passwords))
+        for _, values, password in rows:
+            # Accounts imported without a password must go through a reset before logging in
+            values['password_hash'] = next(hashes) if password is not None else UNUSABLE_PASSWORD
+
+        emails = [values['email'] for _, values, _ in rows]
+        try:
+            table = self.model.__table__
+            db.session.execute(insert(table), [values for _, values, _ in rows])
+
+            # Core inserts skip the ORM flush, so the credential rows and search index entries are written here
+            primary_key = table.primary_key.columns.values()[0]
+            created = db.session.execute(select(primary_key, table.c.email).where(table.c.email.in_(emails))).all()
+            db.session.execute(insert(Credential.__table__), [
+                {'email': normalize_email(email), 'role': self.role, 'user_id': user_id} for user_id, email in created
+            ])
+            if self.role == 'doctor':
+                index_doctors(db.session, [user_id for user_id, _ in created])
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            for line_no, values, _ in rows:
+                self._reject(line_no, values['email'], f'chunk rejected: {getattr(e, "orig", e)}')
+            return
+
+        self.imported += len(rows)
+        publish_emails(emails)
+        if self.role == 'doctor':
+            invalidate_directory({values['specialization'] for _, values, _ in rows})
@@ -0,0 +1,210 @@
+import hashlib
+import math
+import threading
+import time
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, insert, update, delete
+from sqlalchemy.orm.attributes import get_history
+from .. import cache
+from ..models.models import db, Patient, Doctor, Admin, Credential
+
+CREDENTIAL_MODELS = {'patient': Patient, 'doctor': Doctor, 'admin': Admin}
+_ROLES_BY_MODEL = {model: role for role, model in CREDENTIAL_MODELS.items()}
+# Without an explicit role, login keeps its old default of trying patient first
+ROLE_PRIORITY = ('patient', 'doctor', 'admin')
+
+GENERATION_KEY = 'credentials:generation'
+_ADDED_KEY = 'credentials:added:{}'
+_MISS_KEY = 'credentials:miss:{}'
+_PENDING_KEY = 'credential_emails_added'
+BULK_PUBLISH_THRESHOLD = 100
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+class EmailFilter:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._generation = None
+        self._built_at = 0
+
+    def _rebuild(self, generation):
+        emails = db.session.query(Credential.email).yield_per(10000)
+        total = db.session.query(Credential.credential_id).count()
+        bloom = BloomFilter(max(total * 2, 10000))
+        for email, in emails:
+            bloom.add(normalize_email(email))
+        with self._lock:
+            self._bloom = bloom
+            self._generation = generation
+            self._built_at = time.monotonic()
+
+    def _catch_up(self, generation):
+        # Registrations in other workers are published as numbered cache entries;
+        # replay the ones we missed, or rebuild if any have expired
+        with self._lock:
+            start = self._generation
+        if start is None or generation < start or time.monotonic() - self._built_at > self.ttl:
+            return self._rebuild(generation)
+
+        added = cache.get_many(*[_ADDED_KEY.format(n) for n in range(start + 1, generation + 1)])
+        if any(email is None for email in added):
+            return self._rebuild(generation)
+        with self._lock:
+            for email in added:
+                self._bloom.add(email)
+            self._generation = max(self._generation, generation)
+            if self._bloom.count > self._bloom.capacity:
+                self._built_at = 0
+
+    def may_exist(self, email):
+        generation = int(cache.get(GENERATION_KEY) or 0)
+        if self._generation != generation or time.monotonic() - self._built_at > self.ttl:
+            self._catch_up(generation)
+        with self._lock:
+            return email in self._bloom
+
+    def add(self, email):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(email)
+
+_filter = None
+_filter_lock = threading.Lock()
+
+def _email_filter():
+    global _filter
+    if _filter is None:
+        with _filter_lock:
+            if _filter is None:
+                _filter = EmailFilter(current_app.config.get('LOGIN_BLOOM_TTL', 600))
+    return _filter
+
+def find_credential(email, role=None):
+    normalized = normalize_email(email)
+    if not normalized:
+        return None
+
+    # Unknown emails stop here without touching the database
+    if current_app.config.get('LOGIN_BLOOM_FILTER', True) and not _email_filter().may_exist(normalized):
+        return None
+    if cache.get(_MISS_KEY.format(normalized)):
+        return None
+
+    # Credential emails are stored normalized, the same key the filter and miss cache use
+    query = db.session.query(Credential.role, Credential.user_id).filter(Credential.email == normalized)
+    if role:
+        query = query.filter(Credential.role == role)
+    rows = dict(query.all())
+
+    for candidate in ROLE_PRIORITY:
+        if candidate in rows:
+            return candidate, rows[candidate]
+
+    if not role:
+        cache.set(_MISS_KEY.format(normalized), 1, timeout=current_app.config.get('LOGIN_NEGATIVE_CACHE_TTL', 60))
+    return None
+
+def load_user(email, role=None):
+    credential = find_credential(email, role)
+    if credential is None:
+        return None, role
+
+    role, user_id = credential
+    return db.session.get(CREDENTIAL_MODELS[role], user_id), role
+
+def publish_emails(emails):
+    normalized = [normalize_email(email) for email in emails]
+    cache.delete_many(*[_MISS_KEY.format(email) for email in normalized])
+
+    if len(normalized) > BULK_PUBLISH_THRESHOLD:
+        # Bumping the generation without numbered entries makes every worker
+        # rebuild its filter once instead of replaying thousands of entries
+        cache.cache.inc(GENERATION_KEY)
+        if _filter is not None:
+            for email in normalized:
+                _filter.add(email)
+        return
+
+    timeout = current_app.config.get('LOGIN_BLOOM_TTL', 600)
+    for email in normalized:
+        # Atomic INCR on Redis; Flask-Caching only exposes it on the backend
+        generation = cache.cache.inc(GENERATION_KEY)
+        cache.set(_ADDED_KEY.format(generation), email, timeout=timeout)
+        if _filter is not None:
+            _filter.add(email)
+
+def _primary_key(obj):
+    return inspect(obj).mapper.primary_key_from_instance(obj)[0]
+
+@event.listens_for(db.session, 'after_flush')
+def _sync_credentials(session, flush_context):
+    table = Credential.__table__
+    inserts = []
+    statements = []
+    added = []
+
+    for obj in session.new:
+        role = _ROLES_BY_MODEL.get(type(obj))
+        if role is not None:
+            inserts.append({'email': normalize_email(obj.email), 'role': role, 'user_id': _primary_key(obj)})
+            added.append(obj.email)
+
+    for obj in session.dirty:
+        role = _ROLES_BY_MODEL.get(type(obj))
+        if role is not None and get_history(obj, 'email').has_changes():
+            statements.append(update(table).where(
+                table.c.role == role, table.c.user_id == _primary_key(obj)
+            ).values(email=normalize_email(obj.email)))
+            added.append(obj.email)
+
+    for obj in session.deleted:
+        role = _ROLES_BY_MODEL.get(type(obj))
+        if role is not None:
+            statements.append(delete(table).where(
+                table.c.role == role, table.c.user_id == _primary_key(obj)
+            ))
+
+    if not (inserts or statements):
+        return
+
+    connection = session.connection()
+    if inserts:
+        connection.execute(insert(table), inserts)
+    for statement in statements:
+        connection.execute(statement)
+    session.info.setdefault(_PENDING_KEY, []).extend(added)
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_after_commit(session):
+    added = session.info.pop(_PENDING_KEY, None)
+    if added and has_app_context():
+        publish_emails(added)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
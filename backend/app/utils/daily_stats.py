@@ -0,0 +1,101 @@
+from datetime import datetime
+from itertools import chain
+from sqlalchemy import event, func, case, select, delete, insert, literal, DateTime
+from sqlalchemy.orm.attributes import get_history
+from ..models.models import db, Appointment, Doctor, DailyStats
+
+REFRESH_CHUNK_SIZE = 500
+
+# Appointment columns that move a row between rollup buckets or change its revenue
+_TRACKED_APPOINTMENT_FIELDS = ('date', 'status', 'payment_status', 'doctor_id')
+_TRACKED_DOCTOR_FIELDS = ('specialization', 'consultation_fees')
+
+def _rollup_select():
+    status = func.coalesce(Appointment.status, '')
+    is_paid = Appointment.payment_status == 'paid'
+
+    return select(
+        Appointment.date,
+        status,
+        Doctor.specialization,
+        func.count(Appointment.appointment_id),
+        func.sum(case((is_paid, 1), else_=0)),
+        func.coalesce(func.sum(case((is_paid, Doctor.consultation_fees), else_=0)), 0),
+        literal(datetime.utcnow(), DateTime)
+    ).join(
+        Doctor, Doctor.doctor_id == Appointment.doctor_id
+    ).group_by(Appointment.date, status, Doctor.specialization)
+
+def _replace_rows(connection, source, purge):
+    table = DailyStats.__table__
+    connection.execute(purge)
+    result = connection.execute(insert(table).from_select([
+        table.c.date,
+        table.c.status,
+        table.c.specialization,
+        table.c.appointment_count,
+        table.c.paid_count,
+        table.c.revenue,
+        table.c.updated_at
+    ], source))
+    return max(result.rowcount, 0)
+
+def refresh_days(connection, dates):
+    table = DailyStats.__table__
+    dates = sorted(dates)
+    rows = 0
+
+    for i in range(0, len(dates), REFRESH_CHUNK_SIZE):
+        chunk = dates[i:i + REFRESH_CHUNK_SIZE]
+        rows += _replace_rows(
+            connection,
+            _rollup_select().where(Appointment.date.in_(chunk)),
+            delete(table).where(table.c.date.in_(chunk))
+        )
+    return rows
+
+def rebuild_daily_stats(connection, start_date=None, end_date=None):
+    table = DailyStats.__table__
+    source = _rollup_select()
+    purge = delete(table)
+
+    if start_date:
+        source = source.where(Appointment.date >= start_date)
+        purge = purge.where(table.c.date >= start_date)
+    if end_date:
+        source = source.where(Appointment.date <= end_date)
+        purge = purge.where(table.c.date <= end_date)
+
+    return _replace_rows(connection, source, purge)
+
+def _changed(obj, fields):
+    return any(get_history(obj, field).has_changes() for field in fields)
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_touched_days(session, flush_context):
+    dates = set()
+    doctor_ids = set()
+
+    # new/dirty/deleted and attribute history still describe the flush here
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Appointment):
+            if obj in session.dirty and not _changed(obj, _TRACKED_APPOINTMENT_FIELDS):
+                continue
+            history = get_history(obj, 'date')
+            dates.update(chain(history.added, history.unchanged, history.deleted))
+        elif isinstance(obj, Doctor) and obj in session.dirty:
+            if _changed(obj, _TRACKED_DOCTOR_FIELDS):
+                doctor_ids.add(obj.doctor_id)
+
+    if not (dates or doctor_ids):
+        return
+
+    connection = session.connection()
+    if doctor_ids:
+        dates.update(connection.execute(
+            select(Appointment.date).where(Appointment.doctor_id.in_(doctor_ids)).distinct()
+        ).scalars())
+
+    dates.discard(None)
+    if dates:
+        refresh_days(connection, dates)
@@ -0,0 +1,61 @@
+from itertools import chain
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history
+from .. import cache
+from ..models.models import db, Doctor
+from .replicas import primary_reads
+
+DIRECTORY_KEY_PREFIX = 'doctor_directory'
+_PENDING_KEY = 'doctor_directory_changes'
+# Doctor columns the cached directory bodies show (DOCTOR_DIRECTORY)
+DIRECTORY_COLUMNS = ('first_name', 'last_name', 'specialization', 'consultation_fees')
+
+def directory_key(specialization=None):
+    if specialization is None:
+        return f'{DIRECTORY_KEY_PREFIX}:all'
+    return f'{DIRECTORY_KEY_PREFIX}:specialization:{specialization}'
+
+def cached_directory_response(specialization, build):
+    key = directory_key(specialization)
+    body = cache.get(key)
+    
+    if body is None:
+        # Store the encoded body so hits skip both the query and serialization;
+        # it is built from the primary so it cannot cache a replica's lag
+        with primary_reads():
+            body = current_app.json.dumps(build()).encode()
+        cache.set(key, body)
+        
+    return current_app.response_class(body, mimetype='application/json')
+
+def invalidate_directory(specializations=()):
+    keys = [directory_key()] + [directory_key(spec) for spec in specializations if spec]
+    cache.delete_many(*keys)
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_doctor_changes(session, flush_context):
+    changed = None
+    
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Doctor):
+            continue
+        # Logins rehash passwords and profile edits touch other columns; neither changes the listing
+        if obj in session.dirty and not any(get_history(obj, column).has_changes() for column in DIRECTORY_COLUMNS):
+            continue
+            
+        # Both the old and new specialization lists are affected by a move
+        history = get_history(obj, 'specialization')
+        if changed is None:
+            changed = session.info.setdefault(_PENDING_KEY, set())
+        changed.update(chain(history.added, history.unchanged, history.deleted))
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    changed = session.info.pop(_PENDING_KEY, None)
+    if changed is not None and has_app_context():
+        invalidate_directory(changed)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,328 @@
+import heapq
+import logging
+import re
+import threading
+import time as timer
+import unicodedata
+from collections import defaultdict
+from itertools import chain
+from flask import current_app, has_app_context
+from sqlalchemy import event, text, bindparam
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm.attributes import get_history
+from .. import cache
+from ..models.models import db, Doctor
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COLUMNS = ('first_name', 'last_name', 'specialization', 'clinic_hospital_name')
+# A hit on a name outranks one on the specialization, which outranks the clinic
+COLUMN_WEIGHTS = (10.0, 10.0, 4.0, 2.0)
+FTS_TABLE = 'doctor_search'
+MAX_TERMS = 8
+DEFAULT_INDEX_TTL = 3600
+_PENDING_KEY = 'doctor_search_changes'
+GENERATION_KEY = 'doctor_search:generation'
+_CHANGED_KEY = 'doctor_search:changed:{}'
+MAX_CATCH_UP = 1000
+# Same token rules as FTS5's unicode61 tokenizer: runs of letters and digits
+_WORD = re.compile(r'[^\W_]+')
+
+CREATE_FTS5 = text(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{', '.join(SEARCH_COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+SEARCH_FTS5 = text(
+    f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :query "
+    f"ORDER BY bm25({FTS_TABLE}, {', '.join(map(str, COLUMN_WEIGHTS))}), rowid LIMIT :limit"
+)
+SEARCH_FULLTEXT = text(
+    f"SELECT doctor_id FROM doctor WHERE MATCH ({', '.join(SEARCH_COLUMNS)}) AGAINST (:query IN BOOLEAN MODE) "
+    f"ORDER BY MATCH ({', '.join(SEARCH_COLUMNS)}) AGAINST (:query IN BOOLEAN MODE) DESC, doctor_id LIMIT :limit"
+)
+
+def tokenize(value):
+    # Case and accents are folded so 'José' is found by 'jose'
+    decomposed = unicodedata.normalize('NFKD', (value or '').casefold())
+    return _WORD.findall(''.join(c for c in decomposed if not unicodedata.combining(c)))
+
+def _fts5_exists(connection):
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+    ).first() is not None
+
+def _fts5_insert(connection, doctor_ids=None):
+    columns = ', '.join(SEARCH_COLUMNS)
+    values = ', '.join(f"coalesce({column}, '')" for column in SEARCH_COLUMNS)
+    statement = f"INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT doctor_id, {values} FROM doctor"
+    if doctor_ids is None:
+        connection.execute(text(statement))
+    else:
+        connection.execute(text(statement + " WHERE doctor_id IN :ids").bindparams(
+            bindparam('ids', expanding=True)), {'ids': list(doctor_ids)})
+
+def create_fts5_index(connection):
+    connection.execute(CREATE_FTS5)
+    connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    _fts5_insert(connection)
+
+def sync_fts5_index(connection, doctor_ids):
+    # Runs inside the writing transaction, so the index commits or rolls back with the rows
+    connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN :ids").bindparams(
+        bindparam('ids', expanding=True)), {'ids': list(doctor_ids)})
+    _fts5_insert(connection, doctor_ids)
+
+def _fulltext_exists(connection):
+    return connection.execute(text(
+        "SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() "
+        "AND table_name = 'doctor' AND index_type = 'FULLTEXT' LIMIT 1"
+    )).first() is not None
+
+def _grams(padded):
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    # Fallback for databases without a usable full-text index. Words are
+    # indexed by trigrams of '  word ', so a query term's leading trigrams
+    # ('  te', ' ter', ...) find every word it is a prefix of, and its inner
+    # trigrams find words that merely contain it
+    def __init__(self, ttl=DEFAULT_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._generation = None
+        self._postings = {}                         # word -> {doctor_id: weight}
+        self._grams = defaultdict(set)              # trigram -> words
+        self._words = {}                            # doctor_id -> words
+        self._stale_doctors = set()
+
+    def _load(self, doctor_ids=None):
+        query = db.session.query(Doctor.doctor_id, *[getattr(Doctor, column) for column in SEARCH_COLUMNS])
+        if doctor_ids is not None:
+            query = query.filter(Doctor.doctor_id.in_(doctor_ids))
+        return query.yield_per(10000)
+
+    def _add(self, doctor_id, values):
+        weights = {}
+        for value, weight in zip(values, COLUMN_WEIGHTS):
+            for word in tokenize(value):
+                weights[word] = max(weights.get(word, 0), weight)
+
+        for word, weight in weights.items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                for gram in _grams(f'  {word} '):
+                    self._grams[gram].add(word)
+            postings[doctor_id] = weight
+        self._words[doctor_id] = list(weights)
+
+    def _remove(self, doctor_id):
+        for word in self._words.pop(doctor_id, ()):
+            postings = self._postings[word]
+            postings.pop(doctor_id, None)
+            if not postings:
+                del self._postings[word]
+                for gram in _grams(f'  {word} '):
+                    self._grams[gram].discard(word)
+                    if not self._grams[gram]:
+                        del self._grams[gram]
+
+    def rebuild(self, generation=None):
+        rows = list(self._load())
+        with self._lock:
+            self._postings, self._grams, self._words = {}, defaultdict(set), {}
+            for doctor_id, *values in rows:
+                self._add(doctor_id, values)
+            self._stale_doctors.clear()
+            self._generation = generation
+            self._built_at = timer.monotonic()
+
+    def _catch_up(self, generation):
+        # Doctors changed in other workers are published as numbered cache
+        # entries; mark the ones we missed stale, or rebuild if any have expired
+        with self._lock:
+            start = self._generation
+        if start is None or not start < generation <= start + MAX_CATCH_UP:
+            self.rebuild(generation)
+            return True
+
+        changed = cache.get_many(*[_CHANGED_KEY.format(n) for n in range(start + 1, generation + 1)])
+        if any(doctor_ids is None for doctor_ids in changed):
+            self.rebuild(generation)
+            return True
+        with self._lock:
+            for doctor_ids in changed:
+                self._stale_doctors.update(doctor_ids)
+            self._generation = max(self._generation, generation)
+        return False
+
+    def ensure_fresh(self):
+        generation = int(cache.get(GENERATION_KEY) or 0)
+        if self._built_at is None or timer.monotonic() - self._built_at > self.ttl:
+            self.rebuild(generation)
+            return
+        if generation != self._generation and self._catch_up(generation):
+            return
+
+        with self._lock:
+            stale = set(self._stale_doctors)
+        if not stale:
+            return
+
+        rows = list(self._load(stale))
+        with self._lock:
+            for doctor_id in stale:
+                self._remove(doctor_id)
+            for doctor_id, *values in rows:
+                self._add(doctor_id, values)
+            self._stale_doctors -= stale
+
+    def invalidate_doctors(self, doctor_ids):
+        with self._lock:
+            self._stale_doctors.update(doctor_ids)
+
+    def _candidates(self, grams):
+        # Intersect the smallest posting sets first
+        sets = sorted((self._grams.get(gram, ()) for gram in grams), key=len)
+        if not sets or not sets[0]:
+            return set()
+        return set(sets[0]).intersection(*sets[1:])
+
+    def _match(self, term):
+        # doctor_id -> best score for this term: whole word > prefix > infix
+        scores = {}
+        matches = [(word, 1.0 if word == term else 0.75) for word in self._candidates(_grams(f'  {term}'))
+                   if word.startswith(term)]
+        if len(term) >= 3:
+            matches += [(word, 0.4) for word in self._candidates(_grams(term))
+                        if term in word and not word.startswith(term)]
+        for word, quality in matches:
+            for doctor_id, weight in self._postings[word].items():
+                score = quality * weight
+                if score > scores.get(doctor_id, 0):
+                    scores[doctor_id] = score
+        return scores
+
+    def search(self, terms, limit):
+        with self._lock:
+            totals = None
+            # Every term has to match, like the implicit AND of the SQL backends
+            for term in sorted(terms, key=len, reverse=True):
+                scores = self._match(term)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {doctor_id: total + scores[doctor_id]
+                              for doctor_id, total in totals.items() if doctor_id in scores}
+                if not totals:
+                    return []
+        ranked = heapq.nsmallest(limit, totals.items(), key=lambda item: (-item[1], item[0]))
+        return [doctor_id for doctor_id, _ in ranked]
+
+_index = None
+_index_lock = threading.Lock()
+_backends = {}                                      # engine -> 'fts5' | 'fulltext' | 'trigram'
+_fts5_engines = set()
+
+def get_trigram_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TrigramIndex(current_app.config.get('DOCTOR_SEARCH_INDEX_TTL', DEFAULT_INDEX_TTL))
+    return _index
+
+def _detect_backend(engine):
+    if current_app.config.get('DOCTOR_SEARCH_BACKEND', 'auto') == 'trigram':
+        return 'trigram'
+    try:
+        if engine.dialect.name == 'sqlite':
+            with engine.begin() as connection:
+                if not _fts5_exists(connection):
+                    create_fts5_index(connection)
+            _fts5_engines.add(engine)
+            return 'fts5'
+        if engine.dialect.name in ('mysql', 'mariadb'):
+            with engine.connect() as connection:
+                if _fulltext_exists(connection):
+                    return 'fulltext'
+            logger.warning("No FULLTEXT index on doctor; using the in-process trigram index for search")
+    except DBAPIError as e:
+        # e.g. SQLite built without FTS5
+        logger.warning(f"Full-text doctor search unavailable, using the trigram index: {e.orig}")
+    return 'trigram'
+
+def search_backend():
+    engine = db.engine
+    backend = _backends.get(engine)
+    if backend is None:
+        backend = _backends[engine] = _detect_backend(engine)
+    return backend
+
+def search_doctors(query, limit):
+    # Doctor ids ranked best first. Every term matches as a word prefix, so
+    # partial input already finds results while the user is typing
+    terms = tokenize(query)[:MAX_TERMS]
+    if not terms:
+        return []
+
+    backend = search_backend()
+    if backend == 'fts5':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return db.session.execute(SEARCH_FTS5, {'query': match, 'limit': limit}).scalars().all()
+    if backend == 'fulltext':
+        match = ' '.join(f'+{term}*' for term in terms)
+        return db.session.execute(SEARCH_FULLTEXT, {'query': match, 'limit': limit}).scalars().all()
+
+    index = get_trigram_index()
+    index.ensure_fresh()
+    return index.search(terms, limit)
+
+def index_doctors(session, doctor_ids):
+    # Updates the search index for doctors written in the session's current
+    # transaction; the ORM flush does this itself, Core inserts call it directly
+    doctor_ids = {int(doctor_id) for doctor_id in doctor_ids if doctor_id is not None}
+    if not doctor_ids:
+        return
+
+    connection = session.connection()
+    if connection.dialect.name == 'sqlite':
+        engine = connection.engine
+        if engine not in _fts5_engines and _fts5_exists(connection):
+            _fts5_engines.add(engine)
+        if engine in _fts5_engines:
+            sync_fts5_index(connection, doctor_ids)
+    session.info.setdefault(_PENDING_KEY, set()).update(doctor_ids)
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_search_changes(session, flush_context):
+    changed = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Doctor):
+            continue
+        if obj in session.dirty and not any(get_history(obj, column).has_changes() for column in SEARCH_COLUMNS):
+            continue
+        changed.add(obj.doctor_id)
+
+    if changed:
+        index_doctors(session, changed)
+
+def publish_search_changes(doctor_ids):
+    # Atomic INCR on Redis, as for the login Bloom filter; entries only need
+    # to outlive the index TTL, after which every worker rebuilds anyway
+    generation = cache.cache.inc(GENERATION_KEY)
+    cache.set(_CHANGED_KEY.format(generation), sorted(doctor_ids),
+              timeout=current_app.config.get('DOCTOR_SEARCH_INDEX_TTL', DEFAULT_INDEX_TTL))
+    if _index is not None:
+        _index.invalidate_doctors(doctor_ids)
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_search_changes(session):
+    changed = session.info.pop(_PENDING_KEY, None)
+    if changed and has_app_context():
+        publish_search_changes(changed)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_search_changes(session):
+    session.info.pop(_PENDING_KEY, None)
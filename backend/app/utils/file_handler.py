@@ -1,71 +1,479 @@
+import hashlib
+import mimetypes
 import os
+import re
+import shutil
+import tempfile
 import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
-from flask import current_app
-import boto3
+from flask import current_app, request, send_file, redirect
 from botocore.exceptions import ClientError
+from sqlalchemy import select
+from .. import cache
+from ..models.models import db, MedicalReport, Feedback
+from .s3 import get_s3_client, presigned_url, delete_keys
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+MIN_PART_SIZE = 5 * 1024 * 1024
+STAGING_DIR = '.staging'
+_UPLOAD_KEY = 'upload:{}'
+CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{2}/([0-9a-f]{64})(\.[a-z0-9]+)?$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+REFERENCE_CHUNK_SIZE = 500
+
+# Every column holding a stored file name; content addressing lets several rows share one blob
+FILE_COLUMNS = (
+    MedicalReport.uploaded_report_file, MedicalReport.file_thumbnail, MedicalReport.file_preview,
+    Feedback.video_file, Feedback.video_thumbnail, Feedback.video_preview
+)
+
+class UploadError(ValueError):
+    pass
 
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
+def _use_s3():
+    return bool(current_app.config.get('AWS_ACCESS_KEY_ID'))
+
+def _chunk_size():
+    return current_app.config.get('UPLOAD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+def iter_chunks(stream, chunk_size=None):
+    chunk_size = chunk_size or _chunk_size()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+def blob_name(digest, extension):
+    # Content-addressed: identical bytes with the same extension map to one object
+    return f"{digest[:2]}/{digest}{extension}"
+
+def _extension(filename):
+    return os.path.splitext(filename)[1].lower()
+
+def _check_filename(filename, file_type):
+    filename = secure_filename(filename or '')
+    if not allowed_file(filename, current_app.config['ALLOWED_EXTENSIONS'].get(file_type, ())):
+        raise UploadError('File type not allowed')
+    return filename
+
+def _hashed_copy(chunks, output, max_size=None):
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if max_size and size > max_size:
+            raise UploadError('File is too large')
+        digest.update(chunk)
+        output.write(chunk)
+    return digest.hexdigest(), size
+
+def _store_local(chunks, file_type, extension, max_size=None):
+    upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], file_type)
+    os.makedirs(upload_dir, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix='.incoming-')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            digest, size = _hashed_copy(chunks, output, max_size)
+
+        name = blob_name(digest, extension)
+        path = os.path.join(upload_dir, name)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            return name, digest, size, True
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        return name, digest, size, False
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _s3_exists(client, key):
+    try:
+        client.head_object(Bucket=current_app.config['AWS_BUCKET_NAME'], Key=key)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+def _store_s3(chunks, file_type, extension, content_type=None, max_size=None):
+    # The key depends on the hash, so the body is spooled (memory, then disk)
+    # while hashing and only sent when the blob is not stored yet
+    client = get_s3_client()
+    with tempfile.SpooledTemporaryFile(max_size=8 * _chunk_size()) as spool:
+        digest, size = _hashed_copy(chunks, spool, max_size)
+        name = blob_name(digest, extension)
+        key = f"{file_type}/{name}"
+        if _s3_exists(client, key):
+            return name, digest, size, True
+
+        spool.seek(0)
+        client.upload_fileobj(spool, current_app.config['AWS_BUCKET_NAME'], key, ExtraArgs={
+            'ACL': 'private',
+            'ContentType': content_type or 'application/octet-stream'
+        })
+    return name, digest, size, False
+
+def store_stream(stream, file_type, filename, content_type=None):
+    filename = _check_filename(filename, file_type)
+    chunks = iter_chunks(stream)
+    max_size = current_app.config.get('UPLOAD_MAX_SIZE')
+    if _use_s3():
+        name, digest, size, existed = _store_s3(chunks, file_type, _extension(filename), content_type, max_size)
+    else:
+        name, digest, size, existed = _store_local(chunks, file_type, _extension(filename), max_size)
+    return {'filename': name, 'sha256': digest, 'size': size, 'deduplicated': existed}
+
 def save_file(file, file_type='document'):
     if not file:
         return None
-        
-    filename = secure_filename(file.filename)
-    if not allowed_file(filename, current_app.config['ALLOWED_EXTENSIONS'][file_type]):
+
+    try:
+        return store_stream(file.stream, file_type, file.filename, file.content_type)['filename']
+    except UploadError:
+        return None
+    except Exception as e:
+        current_app.logger.error(f"Error saving file: {str(e)}")
         return None
-        
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}_{filename}"
-    
-    # Check if using S3 or local storage
-    if current_app.config.get('AWS_ACCESS_KEY_ID'):
-        return save_to_s3(file, unique_filename, file_type)
-    else:
-        return save_to_local(file, unique_filename, file_type)
 
 def save_to_local(file, filename, file_type):
     try:
-        # Create type-specific subdirectory
-        upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], file_type)
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        file_path = os.path.join(upload_dir, filename)
-        file.save(file_path)
-        return filename
+        return _store_local(iter_chunks(file.stream), file_type, _extension(filename))[0]
     except Exception as e:
         current_app.logger.error(f"Error saving file locally: {str(e)}")
         return None
 
 def save_to_s3(file, filename, file_type):
     try:
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=current_app.config['AWS_ACCESS_KEY_ID'],
-            aws_secret_access_key=current_app.config['AWS_SECRET_ACCESS_KEY'],
-            region_name=current_app.config['AWS_REGION']
-        )
-        
-        # Create S3 path with file type folder
-        s3_path = f"{file_type}/{filename}"
-        
-        s3_client.upload_fileobj(
-            file,
-            current_app.config['AWS_BUCKET_NAME'],
-            s3_path,
-            ExtraArgs={
-                'ACL': 'private',
-                'ContentType': file.content_type
-            }
-        )
-        
-        return s3_path
+        name = _store_s3(iter_chunks(file.stream), file_type, _extension(filename), file.content_type)[0]
+        return f"{file_type}/{name}"
     except Exception as e:
         current_app.logger.error(f"Error uploading to S3: {str(e)}")
         return None
 
+# Resumable uploads: the client opens a session, sends numbered parts (retrying
+# or resuming any that are missing) and completes it. Parts are staged on disk
+# or as an S3 multipart upload; the received parts are read back from storage,
+# so the cached session itself never changes after it is created.
+
+def _session_timeout():
+    return current_app.config.get('UPLOAD_SESSION_TTL', 86400)
+
+def _staging_dir(upload_id):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], STAGING_DIR, upload_id)
+
+def _staging_key(upload_id):
+    return f"{STAGING_DIR}/{upload_id}"
+
+def start_upload(file_type, filename, content_type, owner):
+    filename = _check_filename(filename, file_type)
+    session = {
+        'upload_id': uuid.uuid4().hex,
+        'file_type': file_type,
+        'filename': filename,
+        'content_type': content_type,
+        'owner': owner
+    }
+
+    if _use_s3():
+        response = get_s3_client().create_multipart_upload(
+            Bucket=current_app.config['AWS_BUCKET_NAME'],
+            Key=_staging_key(session['upload_id']),
+            ContentType=content_type or 'application/octet-stream'
+        )
+        session['s3_upload_id'] = response['UploadId']
+    else:
+        os.makedirs(_staging_dir(session['upload_id']))
+
+    cache.set(_UPLOAD_KEY.format(session['upload_id']), session, timeout=_session_timeout())
+    return session
+
+def get_upload(upload_id):
+    return cache.get(_UPLOAD_KEY.format(upload_id))
+
+def _check_part_number(part_number):
+    # S3 numbers parts 1..10000; local staging follows the same rule
+    if not 1 <= part_number <= 10000:
+        raise UploadError('Part number must be between 1 and 10000')
+
+def _part_limits(session, part_number):
+    # The session's size limit applies to the parts received so far; a part
+    # sent again replaces the earlier copy, so that one does not count
+    others = [part for part in list_parts(session) if part['part_number'] != part_number]
+    max_size = current_app.config.get('UPLOAD_MAX_SIZE')
+    if not max_size:
+        return others, None
+    remaining = max_size - sum(part['size'] for part in others)
+    if remaining <= 0:
+        raise UploadError('File is too large')
+    return others, remaining
+
+def _check_part_size(others, part_number, size):
+    # Only the last part may be smaller than the minimum, which S3 rejects
+    # when completing; refuse it now rather than after the whole transfer
+    min_size = current_app.config.get('UPLOAD_MIN_PART_SIZE', MIN_PART_SIZE)
+    if size < min_size and any(part['part_number'] > part_number for part in others):
+        raise UploadError(f'Only the last part may be smaller than {min_size} bytes')
+    if any(part['part_number'] < part_number and part['size'] < min_size for part in others):
+        raise UploadError(f'Only the last part may be smaller than {min_size} bytes; '
+                          'resend the smaller earlier part')
+
+def upload_part(session, part_number, stream):
+    _check_part_number(part_number)
+
+    if _use_s3():
+        others, max_size = _part_limits(session, part_number)
+        with tempfile.SpooledTemporaryFile(max_size=8 * _chunk_size()) as spool:
+            digest, size = _hashed_copy(iter_chunks(stream), spool, max_size)
+            _check_part_size(others, part_number, size)
+            spool.seek(0)
+            get_s3_client().upload_part(
+                Bucket=current_app.config['AWS_BUCKET_NAME'],
+                Key=_staging_key(session['upload_id']),
+                UploadId=session['s3_upload_id'],
+                PartNumber=part_number,
+                Body=spool
+            )
+        return {'part_number': part_number, 'size': size, 'sha256': digest}
+
+    staging = _staging_dir(session['upload_id'])
+    if not os.path.isdir(staging):
+        raise UploadError('Upload session is no longer available')
+    others, max_size = _part_limits(session, part_number)
+
+    # A part only becomes visible once it is complete, so an interrupted
+    # transfer is simply sent again
+    path = os.path.join(staging, f"{part_number:05d}")
+    fd, temp_path = tempfile.mkstemp(dir=staging, prefix='.incoming-')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            digest, size = _hashed_copy(iter_chunks(stream), output, max_size)
+        _check_part_size(others, part_number, size)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return {'part_number': part_number, 'size': size, 'sha256': digest}
+
+def list_parts(session):
+    if _use_s3():
+        client = get_s3_client()
+        parts = []
+        kwargs = {
+            'Bucket': current_app.config['AWS_BUCKET_NAME'],
+            'Key': _staging_key(session['upload_id']),
+            'UploadId': session['s3_upload_id']
+        }
+        while True:
+            response = client.list_parts(**kwargs)
+            parts.extend({'part_number': part['PartNumber'], 'size': part['Size'], 'etag': part['ETag']}
+                         for part in response.get('Parts', ()))
+            if not response.get('IsTruncated'):
+                return parts
+            kwargs['PartNumberMarker'] = response['NextPartNumberMarker']
+
+    staging = _staging_dir(session['upload_id'])
+    return [
+        {'part_number': int(name), 'size': os.path.getsize(os.path.join(staging, name))}
+        for name in sorted(os.listdir(staging)) if name.isdigit()
+    ]
+
+def _check_contiguous(parts):
+    numbers = [part['part_number'] for part in parts]
+    if not numbers or numbers != list(range(1, len(numbers) + 1)):
+        raise UploadError('Parts must be numbered 1..N without gaps before completing')
+
+def _iter_files(paths):
+    for path in paths:
+        with open(path, 'rb') as part:
+            yield from iter_chunks(part)
+
+def complete_upload(session):
+    parts = list_parts(session)
+    _check_contiguous(parts)
+    max_size = current_app.config.get('UPLOAD_MAX_SIZE')
+    if max_size and sum(part['size'] for part in parts) > max_size:
+        raise UploadError('File is too large')
+
+    file_type = session['file_type']
+    extension = _extension(session['filename'])
+
+    if not _use_s3():
+        staging = _staging_dir(session['upload_id'])
+        paths = [os.path.join(staging, f"{part['part_number']:05d}") for part in parts]
+        name, digest, size, existed = _store_local(_iter_files(paths), file_type, extension)
+        shutil.rmtree(staging, ignore_errors=True)
+    else:
+        name, digest, size, existed = _complete_s3(session, parts, file_type, extension)
+
+    cache.delete(_UPLOAD_KEY.format(session['upload_id']))
+    return {'filename': name, 'sha256': digest, 'size': size, 'deduplicated': existed}
+
+def _complete_s3(session, parts, file_type, extension):
+    client = get_s3_client()
+    bucket = current_app.config['AWS_BUCKET_NAME']
+    staging_key = _staging_key(session['upload_id'])
+
+    client.complete_multipart_upload(
+        Bucket=bucket,
+        Key=staging_key,
+        UploadId=session['s3_upload_id'],
+        MultipartUpload={'Parts': [{'PartNumber': part['part_number'], 'ETag': part['etag']} for part in parts]}
+    )
+
+    # S3 cannot hash the assembled object for us, so read it back once as a stream
+    body = client.get_object(Bucket=bucket, Key=staging_key)['Body']
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in body.iter_chunks(_chunk_size()):
+        digest.update(chunk)
+        size += len(chunk)
+    digest = digest.hexdigest()
+
+    name = blob_name(digest, extension)
+    key = f"{file_type}/{name}"
+    existed = _s3_exists(client, key)
+    if not existed:
+        client.copy({'Bucket': bucket, 'Key': staging_key}, bucket, key, ExtraArgs={
+            'ACL': 'private',
+            'ContentType': session.get('content_type') or 'application/octet-stream',
+            'MetadataDirective': 'REPLACE'
+        })
+    client.delete_object(Bucket=bucket, Key=staging_key)
+    return name, digest, size, existed
+
+def abort_upload(session):
+    if _use_s3():
+        get_s3_client().abort_multipart_upload(
+            Bucket=current_app.config['AWS_BUCKET_NAME'],
+            Key=_staging_key(session['upload_id']),
+            UploadId=session['s3_upload_id']
+        )
+    else:
+        shutil.rmtree(_staging_dir(session['upload_id']), ignore_errors=True)
+    cache.delete(_UPLOAD_KEY.format(session['upload_id']))
+
+def _reap_s3_uploads(cutoff):
+    client = get_s3_client()
+    bucket = current_app.config['AWS_BUCKET_NAME']
+    kwargs = {'Bucket': bucket, 'Prefix': f"{STAGING_DIR}/"}
+    reaped = 0
+    while True:
+        response = client.list_multipart_uploads(**kwargs)
+        for upload in response.get('Uploads', ()):
+            upload_id = upload['Key'].rsplit('/', 1)[-1]
+            if upload['Initiated'] < cutoff and get_upload(upload_id) is None:
+                client.abort_multipart_upload(Bucket=bucket, Key=upload['Key'], UploadId=upload['UploadId'])
+                reaped += 1
+        if not response.get('IsTruncated'):
+            return reaped
+        kwargs.update(KeyMarker=response['NextKeyMarker'], UploadIdMarker=response['NextUploadIdMarker'])
+
+def _reap_local_uploads(cutoff):
+    root = os.path.join(current_app.config['UPLOAD_FOLDER'], STAGING_DIR)
+    if not os.path.isdir(root):
+        return 0
+    reaped = 0
+    for entry in os.scandir(root):
+        # Writing a part touches the directory, so its mtime is the last activity
+        modified = datetime.fromtimestamp(entry.stat().st_mtime, timezone.utc)
+        if entry.is_dir() and modified < cutoff and get_upload(entry.name) is None:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            reaped += 1
+    return reaped
+
+def reap_expired_uploads(now=None):
+    # Sessions abandoned without complete or abort only expire from the cache;
+    # their staged parts (a directory or an S3 multipart upload) are removed
+    # here once they are older than UPLOAD_SESSION_TTL
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=_session_timeout())
+    return _reap_s3_uploads(cutoff) if _use_s3() else _reap_local_uploads(cutoff)
+
+def _local_path(filename, file_type):
+    return safe_join(current_app.config['UPLOAD_FOLDER'], file_type, filename)
+
+def stored_file_exists(filename, file_type):
+    if _use_s3():
+        return _s3_exists(get_s3_client(), f"{file_type}/{filename}")
+    path = _local_path(filename, file_type)
+    return path is not None and os.path.isfile(path)
+
+@contextmanager
+def local_copy(filename, file_type):
+    # Yields a filesystem path to a stored file, downloading it first from S3
+    if not _use_s3():
+        path = _local_path(filename, file_type)
+        if path is None or not os.path.isfile(path):
+            raise FileNotFoundError(filename)
+        yield path
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=_extension(filename)) as download:
+        get_s3_client().download_fileobj(current_app.config['AWS_BUCKET_NAME'], f"{file_type}/{filename}", download)
+        download.flush()
+        yield download.name
+
+def file_type_for(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    for file_type, extensions in current_app.config['ALLOWED_EXTENSIONS'].items():
+        if extension in extensions:
+            return file_type
+    return 'document'
+
+def send_stored_file(filename, file_type=None):
+    file_type = file_type or file_type_for(filename)
+    if _use_s3():
+        # S3 serves Range, ETag and conditional requests itself
+        url = get_file_url(filename, file_type)
+        return redirect(url) if url else None
+
+    path = _local_path(filename, file_type)
+    if path is None or not os.path.isfile(path):
+        return None
+
+    # Content-addressed names carry their SHA-256, which is a strong ETag for
+    # free and lets clients cache the bytes forever
+    match = CONTENT_ADDRESSED.match(filename)
+    etag = match.group(1) if match else True
+    accel_prefix = current_app.config.get('X_ACCEL_REDIRECT_PREFIX')
+
+    if accel_prefix:
+        # nginx streams the file (and answers Range requests) from an internal location
+        stat = os.stat(path)
+        response = current_app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{file_type}/{filename}"
+        response.set_etag(etag if match else f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+        response.last_modified = stat.st_mtime
+        response.make_conditional(request, accept_ranges=False)
+        if response.status_code == 304:
+            # nginx would act on the header and send the file body anyway
+            del response.headers['X-Accel-Redirect']
+    else:
+        # send_file answers Range and If-None-Match/If-Modified-Since itself, hands the
+        # file to the server's sendfile through wsgi.file_wrapper, or emits X-Sendfile
+        # when USE_X_SENDFILE is on
+        response = send_file(path, conditional=True, etag=etag, max_age=IMMUTABLE_MAX_AGE if match else 0)
+
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if match:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
 def get_file_url(filename, file_type):
     if not filename:
         return None
@@ -73,15 +481,8 @@ def get_file_url(filename, file_type):
     # If using S3
     if current_app.config.get('AWS_ACCESS_KEY_ID'):
         try:
-            s3_client = boto3.client('s3')
-            return s3_client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': current_app.config['AWS_BUCKET_NAME'],
-                    'Key': f"{file_type}/{filename}"
-                },
-                ExpiresIn=3600  # URL expires in 1 hour
-            )
+            # Signed once per object and reused until shortly before it expires
+            return presigned_url(current_app.config['AWS_BUCKET_NAME'], f"{file_type}/{filename}")
         except ClientError as e:
             current_app.logger.error(f"Error generating S3 URL: {str(e)}")
             return None
@@ -89,30 +490,48 @@ def get_file_url(filename, file_type):
     # If using local storage
     return os.path.join('/uploads', file_type, filename)
 
-def delete_file(filename, file_type):
-    if not filename:
-        return False
+def referenced_files(filenames):
+    filenames = sorted(set(filenames))
+    referenced = set()
+    for i in range(0, len(filenames), REFERENCE_CHUNK_SIZE):
+        chunk = filenames[i:i + REFERENCE_CHUNK_SIZE]
+        for column in FILE_COLUMNS:
+            referenced.update(db.session.execute(select(column).where(column.in_(chunk))).scalars())
+    return referenced
+
+def delete_files(files):
+    # files: iterable of (filename, file_type), named after the rows pointing at them
+    # were deleted or changed; blobs another row still references are kept.
+    # S3 deletes go out 1000 keys per request
+    files = [(filename, file_type) for filename, file_type in files if filename]
+    in_use = referenced_files(filename for filename, _ in files)
+    files = [(filename, file_type) for filename, file_type in files if filename not in in_use]
+    if not files:
+        return 0
         
-    # If using S3
     if current_app.config.get('AWS_ACCESS_KEY_ID'):
         try:
-            s3_client = boto3.client('s3')
-            s3_client.delete_object(
-                Bucket=current_app.config['AWS_BUCKET_NAME'],
-                Key=f"{file_type}/{filename}"
+            deleted, errors = delete_keys(
+                current_app.config['AWS_BUCKET_NAME'],
+                [f"{file_type}/{filename}" for filename, file_type in files]
             )
-            return True
         except ClientError as e:
             current_app.logger.error(f"Error deleting from S3: {str(e)}")
-            return False
+            return 0
+        for error in errors:
+            current_app.logger.error(f"Error deleting {error['Key']} from S3: {error.get('Message')}")
+        return len(deleted)
     
-    # If using local storage
-    try:
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], file_type, filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return True
-        return False
-    except Exception as e:
-        current_app.logger.error(f"Error deleting local file: {str(e)}")
-        return False 
\ No newline at end of file
+    deleted = 0
+    for filename, file_type in files:
+        try:
+            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], file_type, filename)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+                deleted += 1
+        except Exception as e:
+            current_app.logger.error(f"Error deleting local file: {str(e)}")
+    return deleted
+
+def delete_file(filename, file_type):
+    return delete_files([(filename, file_type)]) == 1
@@ -0,0 +1,148 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+from flask import current_app, url_for
+from ..models.models import db, MedicalReport, Feedback
+from .file_handler import local_copy, store_stream, file_type_for
+
+PENDING = 'pending'
+PROCESSING = 'processing'
+READY = 'ready'
+FAILED = 'failed'
+
+THUMBNAIL_SIZE = 256
+PREVIEW_SIZE = 1600
+VIDEO_PREVIEW_WIDTH = 1280
+
+# kind -> (model, uploaded file column, prefix of the processing state columns)
+MEDIA_FIELDS = {
+    'medical_report': (MedicalReport, 'uploaded_report_file', 'file_'),
+    'feedback': (Feedback, 'video_file', 'video_')
+}
+
+# kind -> (endpoint serving the original, endpoint serving renditions, id argument)
+MEDIA_ENDPOINTS = {
+    'medical_report': ('upload.download_report_file', 'upload.download_report_rendition', 'report_id'),
+    'feedback': ('upload.download_feedback_video', 'upload.download_feedback_rendition', 'feedback_id')
+}
+RENDITIONS = ('thumbnail', 'preview')
+
+class MediaError(Exception):
+    pass
+
+def attach_file(record, kind, filename):
+    _, file_column, prefix = MEDIA_FIELDS[kind]
+    setattr(record, file_column, filename)
+    setattr(record, f'{prefix}status', PENDING)
+    for field in ('mime_type', 'thumbnail', 'preview'):
+        setattr(record, f'{prefix}{field}', None)
+
+def media_links(record, kind):
+    # What clients show in lists: the thumbnail and preview, with the original
+    # fetched only when opened. Rendition URLs are null until processing is done
+    _, file_column, prefix = MEDIA_FIELDS[kind]
+    if not getattr(record, file_column):
+        return None
+    file_endpoint, rendition_endpoint, id_name = MEDIA_ENDPOINTS[kind]
+    record_id = getattr(record, id_name)
+    links = {
+        'url': url_for(file_endpoint, **{id_name: record_id}),
+        'status': getattr(record, f'{prefix}status'),
+        'mime_type': getattr(record, f'{prefix}mime_type')
+    }
+    for rendition in RENDITIONS:
+        links[f'{rendition}_url'] = url_for(rendition_endpoint, rendition=rendition, **{id_name: record_id}) \
+            if getattr(record, f'{prefix}{rendition}') else None
+    return links
+
+def _store_jpeg(image, size):
+    from PIL import Image
+    image = image.copy()
+    image.thumbnail((size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+    buffer.seek(0)
+    return store_stream(buffer, 'image', 'rendition.jpg', 'image/jpeg')['filename']
+
+def image_renditions(path, preview=True):
+    from PIL import Image, ImageOps
+    with Image.open(path) as image:
+        # JPEG scans are decoded at a reduced scale when they are much larger than the preview
+        image.draft('RGB', (PREVIEW_SIZE, PREVIEW_SIZE))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    image.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE), Image.LANCZOS)
+    return _store_jpeg(image, THUMBNAIL_SIZE), _store_jpeg(image, PREVIEW_SIZE) if preview else None
+
+def _ffmpeg(*args):
+    binary = shutil.which(current_app.config.get('MEDIA_FFMPEG_BINARY', 'ffmpeg'))
+    if binary is None:
+        return False
+    subprocess.run([binary, '-v', 'error', '-y', *args], check=True, capture_output=True,
+                   timeout=current_app.config.get('MEDIA_FFMPEG_TIMEOUT', 600))
+    return True
+
+def video_renditions(path):
+    # Pillow cannot decode video; posters and previews need an ffmpeg binary and
+    # are skipped (MIME type only) without one
+    with tempfile.TemporaryDirectory() as workdir:
+        poster = os.path.join(workdir, 'poster.jpg')
+        if not _ffmpeg('-ss', '1', '-i', path, '-frames:v', '1', poster) or not os.path.exists(poster):
+            return None, None
+        thumbnail, _ = image_renditions(poster, preview=False)
+
+        preview = os.path.join(workdir, 'preview.mp4')
+        _ffmpeg('-i', path, '-vf', f"scale='min({VIDEO_PREVIEW_WIDTH},iw)':-2", '-c:v', 'libx264',
+                '-preset', 'veryfast', '-crf', '28', '-c:a', 'aac', '-b:a', '96k',
+                '-movflags', '+faststart', preview)
+        with open(preview, 'rb') as output:
+            preview = store_stream(output, 'video', 'preview.mp4', 'video/mp4')['filename']
+    return thumbnail, preview
+
+def _update(model, record_id, file_column, filename, values):
+    # Only touch the row while it still points at the file that was processed,
+    # so a newer upload is never overwritten by results for an older one
+    primary_key = model.__mapper__.primary_key[0]
+    updated = db.session.query(model).filter(
+        primary_key == record_id, getattr(model, file_column) == filename
+    ).update(values, synchronize_session=False)
+    db.session.commit()
+    return updated
+
+def process_media(kind, record_id):
+    # Only the worker processes media, so web workers never load libmagic or Pillow
+    import magic
+    model, file_column, prefix = MEDIA_FIELDS[kind]
+    record = db.session.get(model, record_id)
+    filename = getattr(record, file_column) if record is not None else None
+    if not filename:
+        return None
+
+    if not _update(model, record_id, file_column, filename, {f'{prefix}status': PROCESSING}):
+        return None
+
+    file_type = 'video' if kind == 'feedback' else file_type_for(filename)
+    try:
+        with local_copy(filename, file_type) as path:
+            mime_type = magic.from_file(path, mime=True)
+            thumbnail = preview = None
+            if mime_type.startswith('image/'):
+                thumbnail, preview = image_renditions(path)
+            elif mime_type.startswith('video/'):
+                thumbnail, preview = video_renditions(path)
+            elif kind == 'feedback':
+                raise MediaError(f'Expected a video, got {mime_type}')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Processing {kind} {record_id} failed: {str(e)}")
+        _update(model, record_id, file_column, filename, {f'{prefix}status': FAILED})
+        return FAILED
+
+    _update(model, record_id, file_column, filename, {
+        f'{prefix}status': READY,
+        f'{prefix}mime_type': mime_type,
+        f'{prefix}thumbnail': thumbnail,
+        f'{prefix}preview': preview
+    })
+    return READY
@@ -0,0 +1,198 @@
+import hmac
+import logging
+import threading
+import time as timer
+from bisect import bisect_left
+from contextvars import ContextVar
+from flask import request, current_app, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .serializers import FastJSONProvider
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SERIALIZE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+slow_query_logger = logging.getLogger('app.slow_queries')
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Histogram:
+    def __init__(self, name, description, labels, buckets):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}           # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        for labels, values in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, labels)} {values[-1]}')
+            lines.append(f'{self.name}_count{_labels(self.labels, labels)} {cumulative}')
+        return lines
+
+class Counter:
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with self._lock:
+            series = sorted(self._series.items())
+        lines.extend(f'{self.name}{_labels(self.labels, labels)} {value}' for labels, value in series)
+        return lines
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Wall time spent handling a request',
+                             ('endpoint', 'method', 'status'), DURATION_BUCKETS)
+DB_QUERIES = Histogram('http_request_db_queries', 'SQL statements executed per request',
+                       ('endpoint',), QUERY_COUNT_BUCKETS)
+DB_DURATION = Histogram('http_request_db_seconds', 'Time spent in SQL statements per request',
+                        ('endpoint',), DURATION_BUCKETS)
+SERIALIZE_DURATION = Histogram('http_request_serialize_seconds', 'Time spent encoding JSON per request',
+                               ('endpoint',), SERIALIZE_BUCKETS)
+RESPONSE_SIZE = Histogram('http_response_size_bytes', 'Response body size (streamed responses excluded)',
+                          ('endpoint',), SIZE_BUCKETS)
+SLOW_QUERIES = Counter('db_slow_queries_total', 'SQL statements slower than METRICS_SLOW_QUERY_SECONDS',
+                       ('endpoint',))
+
+REGISTRY = [REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZE_DURATION, RESPONSE_SIZE, SLOW_QUERIES]
+
+class RequestStats:
+    __slots__ = ('endpoint', 'started', 'queries', 'db_seconds', 'serialize_seconds')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = timer.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+_current = ContextVar('request_stats', default=None)
+_slow_query_seconds = None
+_listening = False
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = timer.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_started', None)
+    if started is None:
+        return
+    elapsed = timer.perf_counter() - started
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+    if _slow_query_seconds is not None and elapsed >= _slow_query_seconds:
+        # Statement text only: bound parameters can hold patient data
+        endpoint = stats.endpoint if stats is not None else '-'
+        SLOW_QUERIES.inc((endpoint,))
+        slow_query_logger.warning(f"Slow query ({elapsed * 1000:.1f} ms) in {endpoint}: {statement}")
+
+class TimedJSONProvider(FastJSONProvider):
+    def encode(self, obj, indent=False):
+        stats = _current.get()
+        if stats is None:
+            return super().encode(obj, indent)
+        started = timer.perf_counter()
+        try:
+            return super().encode(obj, indent)
+        finally:
+            stats.serialize_seconds += timer.perf_counter() - started
+
+def _start_request():
+    _current.set(RequestStats(request.endpoint or 'unmatched'))
+
+def _finish_request(response):
+    stats = _current.get()
+    if stats is None:
+        return response
+
+    elapsed = timer.perf_counter() - stats.started
+    endpoint = stats.endpoint
+    REQUEST_DURATION.observe((endpoint, request.method, str(response.status_code)), elapsed)
+    DB_QUERIES.observe((endpoint,), stats.queries)
+    DB_DURATION.observe((endpoint,), stats.db_seconds)
+    SERIALIZE_DURATION.observe((endpoint,), stats.serialize_seconds)
+    if not response.is_streamed and response.content_length is not None:
+        RESPONSE_SIZE.observe((endpoint,), response.content_length)
+
+    if current_app.config.get('METRICS_SERVER_TIMING'):
+        response.headers.add('Server-Timing', ', '.join((
+            f'app;dur={elapsed * 1000:.1f}',
+            f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"',
+            f'serialize;dur={stats.serialize_seconds * 1000:.1f}'
+        )))
+    return response
+
+def _end_request(exc):
+    _current.set(None)
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return {'message': 'Unauthorized'}, 401
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
+
+def init_metrics(app):
+    global _slow_query_seconds, _listening
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    if app.config.get('METRICS_REQUIRE_TOKEN') and not app.config.get('METRICS_TOKEN'):
+        raise RuntimeError('Set METRICS_TOKEN to serve /metrics, or METRICS_ENABLED=false to turn metrics off')
+
+    # Listening on the Engine class covers every engine and bind the app creates
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listening = True
+    _slow_query_seconds = app.config.get('METRICS_SLOW_QUERY_SECONDS')
+
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
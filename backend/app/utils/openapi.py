@@ -0,0 +1,88 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from flask import current_app, request, jsonify
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+DEFAULT_MAX_AGE = 3600
+
+class Spec:
+    # Encoded once per file version: plain and gzip bodies, each with its own strong ETag
+    def __init__(self, body, version=None):
+        self.version = version
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.gzipped = gzip.compress(body, 9, mtime=0)
+
+_specs = {}                 # path -> Spec
+_lock = threading.Lock()
+
+def build_spec(app):
+    # The same document flasgger serves at /apispec_1.json, assembled from the
+    # routes' swag_from specs; keys are sorted so rebuilds diff cleanly
+    swagger = getattr(app, 'swag', None)
+    if swagger is None:
+        raise RuntimeError('Swagger is disabled for this app; set SWAGGER_ENABLED to build the spec')
+    with app.test_request_context():
+        spec = swagger.get_apispecs('apispec_1')
+    return (json.dumps(spec, indent=2, sort_keys=True) + '\n').encode()
+
+def write_spec(app, path):
+    body = build_spec(app)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Replaced atomically, so workers serving the old file never read half a new one
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(body)
+    os.replace(temp_path, path)
+    return body
+
+def _load(path):
+    try:
+        version = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    spec = _specs.get(path)
+    if spec is None or spec.version != version:
+        with _lock:
+            spec = _specs.get(path)
+            if spec is None or spec.version != version:
+                with open(path, 'rb') as f:
+                    spec = _specs[path] = Spec(f.read(), version)
+    return spec
+
+def _live_spec(app):
+    # Without a built file, apps running flasgger assemble the spec once per process
+    spec = app.extensions.get('openapi_spec')
+    if spec is None:
+        spec = app.extensions['openapi_spec'] = Spec(build_spec(app))
+    return spec
+
+def openapi_view():
+    path = current_app.config.get('OPENAPI_SPEC_PATH')
+    spec = _load(path) if path else None
+    if spec is None and getattr(current_app, 'swag', None) is not None:
+        spec = _live_spec(current_app._get_current_object())
+    if spec is None:
+        return jsonify({'message': 'OpenAPI spec has not been built; run build_openapi.py'}), 404
+
+    if 'gzip' in request.accept_encodings:
+        response = current_app.response_class(spec.gzipped, mimetype='application/json')
+        response.content_encoding = 'gzip'
+        response.set_etag(f'{spec.etag}-gz')
+    else:
+        response = current_app.response_class(spec.body, mimetype='application/json')
+        response.set_etag(spec.etag)
+    response.vary.add('Accept-Encoding')
+
+    response.cache_control.public = True
+    if request.args.get('v') == spec.etag:
+        # ?v=<ETag> names one version of the spec, so it can be cached forever
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = current_app.config.get('OPENAPI_SPEC_MAX_AGE', DEFAULT_MAX_AGE)
+    return response.make_conditional(request)
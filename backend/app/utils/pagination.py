@@ -0,0 +1,93 @@
+import base64
+import json
+from flask import request, jsonify, current_app, Response, stream_with_context
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+
+def encode_cursor(value):
+    raw = json.dumps({'after': value}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    if not token:
+        return None
+
+    padded = token + '=' * (-len(token) % 4)
+    try:
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))['after']
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def get_page_size():
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('Invalid limit')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def keyset_page(query, key_column, get_key, serialize, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    after = decode_cursor(cursor)
+    if after is not None:
+        query = query.filter(key_column > after)
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(key_column).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        'items': [serialize(row) for row in rows],
+        'next_cursor': encode_cursor(get_key(rows[-1])) if has_more else None
+    }
+
+def stream_ndjson(query, key_column, serialize, batch_size=STREAM_BATCH_SIZE):
+    dumps = current_app.json.dumps
+
+    def generate():
+        # yield_per keeps only one batch of rows in memory (server-side cursor on MySQL)
+        for row in query.order_by(key_column).yield_per(batch_size):
+            yield dumps(serialize(row)) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def paginated_response(query, key_column, get_key, serialize):
+    if request.args.get('format') == 'ndjson':
+        return stream_ndjson(query, key_column, serialize)
+
+    try:
+        page = keyset_page(
+            query, key_column, get_key, serialize,
+            cursor=request.args.get('cursor'),
+            limit=get_page_size()
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    return jsonify(page), 200
+
+PAGINATION_PARAMETERS = [
+    {
+        'name': 'cursor',
+        'in': 'query',
+        'type': 'string',
+        'required': False,
+        'description': 'Opaque next_cursor token from the previous page'
+    },
+    {
+        'name': 'limit',
+        'in': 'query',
+        'type': 'integer',
+        'required': False,
+        'description': f'Page size (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})'
+    },
+    {
+        'name': 'format',
+        'in': 'query',
+        'type': 'string',
+        'required': False,
+        'enum': ['json', 'ndjson'],
+        'description': 'ndjson streams every matching row instead of a single page'
+    }
+]
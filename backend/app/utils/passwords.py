@@ -0,0 +1,111 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Stored for accounts created without a password (e.g. bulk imports); never verifies
+UNUSABLE_PASSWORD = '!'
+
+DEFAULTS = {
+    'PASSWORD_HASHER': 'pbkdf2',
+    'PASSWORD_PBKDF2_ITERATIONS': 600000,
+    'PASSWORD_BCRYPT_ROUNDS': 12,
+    'PASSWORD_HASH_WORKERS': 0,
+    'PASSWORD_HASH_QUEUE_SIZE': 64
+}
+
+def _setting(name):
+    if has_app_context():
+        return current_app.config.get(name, DEFAULTS[name])
+    return DEFAULTS[name]
+
+# Hashers run inside pool processes, so they are plain module-level functions
+
+def _hash(scheme, cost, password):
+    if scheme == 'bcrypt':
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=cost)).decode()
+    if scheme == 'pbkdf2':
+        return generate_password_hash(password, method=f'pbkdf2:sha256:{cost}')
+    raise ValueError(f'Unknown password hasher: {scheme}')
+
+def _verify(password_hash, password):
+    if identify(password_hash)[0] == 'bcrypt':
+        return bcrypt.checkpw(password.encode(), password_hash.encode())
+    return check_password_hash(password_hash, password)
+
+def identify(password_hash):
+    if password_hash.startswith(('$2a$', '$2b$', '$2y$')):
+        return 'bcrypt', int(password_hash.split('$')[2])
+    if password_hash.startswith('pbkdf2:'):
+        method = password_hash.split('$', 1)[0]
+        parts = method.split(':')
+        return 'pbkdf2', int(parts[2]) if len(parts) > 2 else None
+    return password_hash.split('$', 1)[0].split(':', 1)[0], None
+
+def current_parameters():
+    scheme = _setting('PASSWORD_HASHER')
+    if scheme == 'bcrypt':
+        return scheme, _setting('PASSWORD_BCRYPT_ROUNDS')
+    return scheme, _setting('PASSWORD_PBKDF2_ITERATIONS')
+
+def needs_rehash(password_hash):
+    return identify(password_hash) != current_parameters()
+
+class HashPool:
+    def __init__(self, workers, queue_size):
+        # spawn: forking a threaded gunicorn worker can deadlock the child
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def run(self, fn, *args):
+        # Callers beyond the queue bound wait here instead of growing the backlog;
+        # the waiting request thread sleeps on a lock and does not hold the GIL
+        with self._slots:
+            return self._executor.submit(fn, *args).result()
+
+    def map(self, fn, *iterables, chunksize=1):
+        return list(self._executor.map(fn, *iterables, chunksize=chunksize))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_hash_pool():
+    global _pool
+    workers = _setting('PASSWORD_HASH_WORKERS')
+    if not workers:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashPool(workers, _setting('PASSWORD_HASH_QUEUE_SIZE'))
+    return _pool
+
+def hash_password(password):
+    scheme, cost = current_parameters()
+    pool = get_hash_pool()
+    if pool is None:
+        return _hash(scheme, cost, password)
+    return pool.run(_hash, scheme, cost, password)
+
+def hash_many(passwords):
+    scheme, cost = current_parameters()
+    pool = get_hash_pool()
+    if pool is None or len(passwords) < 2:
+        return [_hash(scheme, cost, password) for password in passwords]
+    count = len(passwords)
+    return pool.map(_hash, [scheme] * count, [cost] * count, passwords,
+                    chunksize=max(1, count // (4 * pool.workers)))
+
+def verify_password(password_hash, password):
+    if not password_hash or password_hash == UNUSABLE_PASSWORD or password is None:
+        return False
+    pool = get_hash_pool()
+    if pool is None:
+        return _verify(password_hash, password)
+    return pool.run(_verify, password_hash, password)
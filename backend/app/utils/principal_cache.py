@@ -0,0 +1,104 @@
+import threading
+from itertools import chain
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from .. import cache
+from .ttl_cache import TTLCache
+from ..models.models import db, Patient, Doctor, Admin
+
+PRINCIPAL_MODELS = {'patient': Patient, 'doctor': Doctor, 'admin': Admin}
+# Columns the views read from the current user. Cached copies never hold
+# password_hash or other secrets; anything else loads on access
+PRINCIPAL_COLUMNS = {
+    Patient: ('patient_id', 'first_name', 'last_name', 'email', 'contact_number', 'date_of_birth'),
+    Doctor: ('doctor_id', 'first_name', 'last_name', 'email', 'specialization', 'contact_number',
+             'consultation_fees', 'availability_status'),
+    Admin: ('admin_id', 'name', 'email', 'contact')
+}
+_ROLES_BY_MODEL = {model: role for role, model in PRINCIPAL_MODELS.items()}
+_PENDING_KEY = 'principal_cache_changes'
+
+_local = None
+_local_lock = threading.Lock()
+
+def _local_cache():
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                _local = TTLCache(
+                    current_app.config.get('PRINCIPAL_CACHE_SIZE', 10000),
+                    current_app.config.get('PRINCIPAL_CACHE_TTL', 30)
+                )
+    return _local
+
+def _shared_key(role, user_id):
+    return f'principal:{role}:{user_id}'
+
+def _snapshot(user):
+    return {column: getattr(user, column) for column in PRINCIPAL_COLUMNS[type(user)]}
+
+def _attach(model, snapshot):
+    # Rebuild the row as an already-persistent instance without a SELECT
+    user = model(**snapshot)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+def load_principal(role, user_id):
+    model = PRINCIPAL_MODELS.get(role)
+    if model is None or user_id is None:
+        return None
+        
+    key = (role, str(user_id))
+    identity_map = g.setdefault('_principals', {})
+    if key in identity_map:
+        return identity_map[key]
+        
+    ttl = current_app.config.get('PRINCIPAL_CACHE_TTL', 30)
+    shared = current_app.config.get('PRINCIPAL_CACHE_SHARED', False)
+    snapshot = _local_cache().get(key) if ttl else None
+    if snapshot is None and shared:
+        snapshot = cache.get(_shared_key(*key))
+        if snapshot is not None and ttl:
+            _local_cache().set(key, snapshot)
+            
+    if snapshot is not None:
+        user = _attach(model, snapshot)
+    else:
+        user = db.session.get(model, int(user_id))
+        if user is not None and ttl:
+            snapshot = _snapshot(user)
+            _local_cache().set(key, snapshot)
+            if shared:
+                cache.set(_shared_key(*key), snapshot, timeout=ttl)
+                
+    identity_map[key] = user
+    return user
+
+def invalidate_principal(role, user_id):
+    key = (role, str(user_id))
+    if _local is not None:
+        _local.delete(key)
+    if has_app_context():
+        g.pop('_principals', None)
+        if current_app.config.get('PRINCIPAL_CACHE_SHARED', False):
+            cache.delete(_shared_key(*key))
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_principal_changes(session, flush_context):
+    for obj in chain(session.dirty, session.deleted):
+        role = _ROLES_BY_MODEL.get(type(obj))
+        if role is not None:
+            ident = inspect(obj).identity
+            if ident:
+                session.info.setdefault(_PENDING_KEY, set()).add((role, ident[0]))
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    for role, user_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_principal(role, user_id)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
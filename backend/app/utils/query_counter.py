@@ -0,0 +1,56 @@
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app
+from sqlalchemy import event
+from ..models.models import db
+
+class QueryCounter:
+    def __init__(self, engine=None):
+        # Without an engine, statements on the primary and every replica count
+        self.engines = [engine] if engine is not None else list(db.engines.values())
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        for engine in self.engines:
+            event.listen(engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        for engine in self.engines:
+            event.remove(engine, 'before_cursor_execute', self._on_execute)
+        return False
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+@contextmanager
+def assert_max_queries(budget, engine=None, label='block'):
+    with QueryCounter(engine) as counter:
+        yield counter
+
+    if counter.count > budget:
+        raise QueryBudgetExceeded(
+            f"{label} executed {counter.count} queries, budget is {budget}:\n" +
+            "\n".join(counter.statements)
+        )
+
+def query_budget(budget):
+    # Declares how many SQL statements a view may run; enforced when
+    # QUERY_BUDGET_ENFORCED is set (on in TestingConfig)
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            if not current_app.config.get('QUERY_BUDGET_ENFORCED'):
+                return fn(*args, **kwargs)
+            with assert_max_queries(budget, label=fn.__name__):
+                return fn(*args, **kwargs)
+        decorator.query_budget = budget
+        return decorator
+    return wrapper
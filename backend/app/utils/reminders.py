@@ -0,0 +1,332 @@
+import asyncio
+import heapq
+import importlib
+import time as timer
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, update
+from ..models.models import db, Appointment, Patient, Doctor, ReminderLog
+from .booking import SCHEDULED_STATUS
+
+SENT = 'sent'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+CLAIMED = 'claimed'
+
+def _insert_ignore():
+    # Rows that already exist are left alone: another scheduler process got there first
+    return insert(ReminderLog.__table__).prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite')
+
+class ReminderMetrics:
+    def __init__(self):
+        self.fetched = 0
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.batches = 0
+        self.send_seconds = 0.0
+
+    def snapshot(self):
+        return {
+            'fetched': self.fetched,
+            'queued': self.queued,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'skipped': self.skipped,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'sent_per_second': self.sent / self.send_seconds if self.send_seconds else 0.0
+        }
+
+class LogSender:
+    # Default sender: writes reminders to the application log
+    async def send(self, reminder):
+        current_app.logger.info(
+            f"Reminder for appointment {reminder['appointment_id']} at {reminder['starts_at']:%Y-%m-%d %H:%M} "
+            f"to {reminder['patient_email']}"
+        )
+
+class FakeSender:
+    def __init__(self, latency=0.0, failing_ids=()):
+        self.latency = latency
+        self.failing_ids = set(failing_ids)
+        self.sent = []
+
+    async def send(self, reminder):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if reminder['appointment_id'] in self.failing_ids:
+            raise RuntimeError('delivery failed')
+        self.sent.append(reminder)
+
+def load_sender(path):
+    module_name, _, class_name = path.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+class ReminderScheduler:
+    def __init__(self, sender, offsets=(1440, 60), horizon=600, concurrency=50, batch_size=500,
+                 max_attempts=3, retry_delay=60, refill_interval=60):
+        self.sender = sender
+        self.offsets = sorted(offsets)
+        self.horizon = timedelta(seconds=horizon)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.refill_interval = refill_interval
+        self.metrics = ReminderMetrics()
+        self._heap = []                 # (send_at, appointment_id, offset_minutes)
+        self._pending = {}              # (appointment_id, offset_minutes) -> reminder
+        self._attempts = {}
+        self._claimed = set()           # keys whose reminder_log row this process inserted
+        self._log_rows = []
+        self._next_refill = None
+
+    @classmethod
+    def from_config(cls, sender=None):
+        config = current_app.config
+        return cls(
+            sender or load_sender(config.get('REMINDER_SENDER', 'app.utils.reminders:LogSender')),
+            offsets=config.get('REMINDER_OFFSETS_MINUTES', (1440, 60)),
+            horizon=config.get('REMINDER_HORIZON_SECONDS', 600),
+            concurrency=config.get('REMINDER_CONCURRENCY', 50),
+            batch_size=config.get('REMINDER_BATCH_SIZE', 500),
+            max_attempts=config.get('REMINDER_MAX_ATTEMPTS', 3),
+            retry_delay=config.get('REMINDER_RETRY_DELAY', 60),
+            refill_interval=config.get('REMINDER_POLL_INTERVAL', 30)
+        )
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _upcoming_query(self, now, until):
+        # Every reminder due by `until` belongs to an appointment starting
+        # before until + the largest offset: one range scan over the
+        # (date, status, ...) index, with the reminders already handled joined in
+        last_day = (until + timedelta(minutes=self.offsets[-1])).date()
+        return select(
+            Appointment.appointment_id,
+            Appointment.date,
+            Appointment.time,
+            Appointment.doctor_id,
+            Patient.patient_id,
+            Patient.first_name.label('patient_first_name'),
+            Patient.email,
+            Patient.contact_number,
+            Doctor.first_name.label('doctor_first_name'),
+            Doctor.last_name.label('doctor_last_name'),
+            ReminderLog.offset_minutes
+        ).join(
+            Patient, Patient.patient_id == Appointment.patient_id
+        ).join(
+            Doctor, Doctor.doctor_id == Appointment.doctor_id
+        ).outerjoin(
+            ReminderLog, ReminderLog.appointment_id == Appointment.appointment_id
+        ).where(
+            Appointment.date.between(now.date(), last_day),
+            Appointment.status == SCHEDULED_STATUS,
+            Appointment.slot_active.is_(True)
+        )
+
+    def refill(self, now):
+        until = now + self.horizon
+        appointments = {}
+        handled = set()
+        for row in db.session.execute(self._upcoming_query(now, until)):
+            appointment_id = row.appointment_id
+            if row.offset_minutes is not None:
+                handled.add((appointment_id, row.offset_minutes))
+            appointments[appointment_id] = row
+        self.metrics.fetched += len(appointments)
+
+        for appointment_id, row in appointments.items():
+            starts_at = datetime.combine(row.date, row.time)
+            if starts_at <= now:
+                continue
+
+            # Offsets ascend, so once a nearer reminder is queued or sent any
+            # missed earlier one (booked late, scheduler down) is skipped
+            covered = False
+            for offset in self.offsets:
+                key = (appointment_id, offset)
+                send_at = starts_at - timedelta(minutes=offset)
+                if key in handled or key in self._pending:
+                    covered = True
+                    continue
+                if send_at > until:
+                    continue
+                if send_at <= now and covered:
+                    self._log({'appointment_id': appointment_id, 'offset_minutes': offset}, SKIPPED, 0)
+                    self.metrics.skipped += 1
+                    continue
+                covered = True
+
+                self._pending[key] = {
+                    'appointment_id': appointment_id,
+                    'offset_minutes': offset,
+                    'starts_at': starts_at,
+                    'doctor_id': row.doctor_id,
+                    'doctor_name': f"{row.doctor_first_name} {row.doctor_last_name}",
+                    'patient_id': row.patient_id,
+                    'patient_name': row.patient_first_name,
+                    'patient_email': row.email,
+                    'patient_contact': row.contact_number
+                }
+                heapq.heappush(self._heap, (send_at, appointment_id, offset))
+                self.metrics.queued += 1
+
+        self._next_refill = now + timedelta(seconds=self.refill_interval)
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            _, appointment_id, offset = heapq.heappop(self._heap)
+            due.append(self._pending[(appointment_id, offset)])
+        return due
+
+    def _still_valid(self, due):
+        # The heap may be minutes old: drop reminders for appointments that were
+        # cancelled or moved since (a moved one is picked up again by refill)
+        ids = {reminder['appointment_id'] for reminder in due}
+        current = {
+            row.appointment_id: datetime.combine(row.date, row.time)
+            for row in db.session.execute(select(
+                Appointment.appointment_id, Appointment.date, Appointment.time
+            ).where(
+                Appointment.appointment_id.in_(ids),
+                Appointment.status == SCHEDULED_STATUS,
+                Appointment.slot_active.is_(True)
+            ))
+        }
+
+        valid = []
+        for reminder in due:
+            if current.get(reminder['appointment_id']) == reminder['starts_at']:
+                valid.append(reminder)
+            else:
+                self._forget(reminder)
+                self.metrics.dropped += 1
+        return valid
+
+    def _claim(self, reminders):
+        # Every worker process (and reminder_worker.py) keeps its own heap, so
+        # several may hold the same reminder; the one whose reminder_log row
+        # insert succeeds sends it and the others drop it. A process that dies
+        # after claiming leaves the row as 'claimed', so a reminder is sent at most once
+        statement = _insert_ignore()
+        claimed = []
+        for reminder in reminders:
+            key = (reminder['appointment_id'], reminder['offset_minutes'])
+            if key not in self._claimed:
+                result = db.session.execute(statement, {
+                    'appointment_id': key[0], 'offset_minutes': key[1], 'status': CLAIMED, 'attempts': 0
+                })
+                if not result.rowcount:
+                    self._forget(reminder)
+                    self.metrics.dropped += 1
+                    continue
+                self._claimed.add(key)
+            claimed.append(reminder)
+        db.session.commit()
+        return claimed
+
+    def _log(self, reminder, status, attempts):
+        self._log_rows.append({
+            'appointment_id': reminder['appointment_id'],
+            'offset_minutes': reminder['offset_minutes'],
+            'status': status,
+            'attempts': attempts
+        })
+
+    def _forget(self, reminder):
+        key = (reminder['appointment_id'], reminder['offset_minutes'])
+        self._pending.pop(key, None)
+        self._claimed.discard(key)
+        return self._attempts.pop(key, 0)
+
+    async def _deliver(self, reminders):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(reminder):
+            async with semaphore:
+                await self.sender.send(reminder)
+
+        started = timer.perf_counter()
+        results = await asyncio.gather(*(send(reminder) for reminder in reminders), return_exceptions=True)
+        self.metrics.send_seconds += timer.perf_counter() - started
+        return results
+
+    async def dispatch(self, now):
+        while True:
+            due = self._pop_due(now)
+            if not due:
+                break
+            self.metrics.batches += 1
+
+            reminders = self._claim(self._still_valid(due))
+            results = await self._deliver(reminders)
+            for reminder, result in zip(reminders, results):
+                key = (reminder['appointment_id'], reminder['offset_minutes'])
+                attempts = self._attempts.get(key, 0) + 1
+                if not isinstance(result, Exception):
+                    self._forget(reminder)
+                    self._log(reminder, SENT, attempts)
+                    self.metrics.sent += 1
+                elif attempts < self.max_attempts:
+                    self._attempts[key] = attempts
+                    heapq.heappush(self._heap, (now + timedelta(seconds=self.retry_delay * attempts), *key))
+                    self.metrics.retried += 1
+                else:
+                    current_app.logger.error(f"Reminder {key} failed after {attempts} attempts: {result}")
+                    self._forget(reminder)
+                    self._log(reminder, FAILED, attempts)
+                    self.metrics.failed += 1
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        if not self._log_rows:
+            return
+        # Sent and failed reminders update the row claimed before sending;
+        # skipped ones were never claimed and are inserted
+        skipped = [row for row in self._log_rows if row['status'] == SKIPPED]
+        finished = [row for row in self._log_rows if row['status'] != SKIPPED]
+        if skipped:
+            db.session.execute(_insert_ignore(), skipped)
+        if finished:
+            db.session.execute(update(ReminderLog), finished)
+        db.session.commit()
+        self._log_rows = []
+
+    async def tick(self, now=None):
+        now = now or datetime.now()
+        if self._next_refill is None or now >= self._next_refill:
+            self.refill(now)
+        await self.dispatch(now)
+
+    def seconds_until_next(self, now):
+        wake = [self._next_refill] + ([self._heap[0][0]] if self._heap else [])
+        return max(0.0, (min(wake) - now).total_seconds())
+
+    async def run_forever(self, stop=None):
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            await self.tick()
+            # Releases the connection between ticks so an idle scheduler holds none
+            db.session.remove()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.seconds_until_next(datetime.now()))
+            except asyncio.TimeoutError:
+                pass
+
+_scheduler = None
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ReminderScheduler.from_config()
+    return _scheduler
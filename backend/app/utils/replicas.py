@@ -0,0 +1,94 @@
+import random
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, request, has_app_context, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+DEFAULT_STICKY_SECONDS = 5
+_STICKY_KEY = 'replica_sticky:{}'
+_WROTE = 'replica_wrote'
+_STICKY = 'replica_sticky'
+
+def init_replicas(app):
+    # Each SQLALCHEMY_REPLICA_URLS entry becomes a bind with the primary's pool
+    # settings; call before db.init_app so the engines are created with the rest
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    keys = []
+    for i, url in enumerate(app.config.get('SQLALCHEMY_REPLICA_URLS') or ()):
+        key = f'replica_{i}'
+        binds[key] = {**options, 'url': url}
+        keys.append(key)
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['db_replicas'] = keys
+
+class RoutingSession(Session):
+    # SELECTs run by @read_only views go to a random replica; writes, flushes
+    # and everything outside those views use the primary. Once the session has
+    # written, the rest of the request reads from the primary too
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if self._flushing or getattr(clause, 'is_dml', False):
+            self.info[_WROTE] = True
+            return engine
+        if bind is not None or not getattr(clause, 'is_select', False) or self.info.get(_STICKY):
+            return engine
+        if not (has_app_context() and g.get('read_only')) or engine is not self._db.engine:
+            return engine
+
+        replicas = current_app.extensions.get('db_replicas')
+        if not replicas:
+            return engine
+        return self._db.engines[random.choice(replicas)]
+
+def _client_key():
+    from flask_jwt_extended import get_jwt
+    try:
+        claims = get_jwt()
+        return f"{claims.get('role')}:{claims['sub']}"
+    except (RuntimeError, KeyError):
+        return request.remote_addr
+
+def _sticky_seconds():
+    return current_app.config.get('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    if not session.info.pop(_WROTE, False):
+        return
+    session.info[_STICKY] = True
+    if has_request_context() and current_app.extensions.get('db_replicas'):
+        # Replicas may not have the commit yet; this client reads from the
+        # primary for a few seconds so it sees its own writes
+        from .. import cache
+        cache.set(_STICKY_KEY.format(_client_key()), 1, timeout=_sticky_seconds())
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_writes(session):
+    session.info.pop(_WROTE, None)
+
+def read_only(fn):
+    # Lets the view's queries (including a streamed response body) use the
+    # replicas, unless this client committed a write in the last few seconds
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        if current_app.extensions.get('db_replicas'):
+            from .. import cache
+            g.read_only = not cache.get(_STICKY_KEY.format(_client_key()))
+        return fn(*args, **kwargs)
+    decorator.read_only = True
+    return decorator
+
+@contextmanager
+def primary_reads():
+    # For results that outlive the request, such as cached response bodies:
+    # a lagging replica would keep serving rows the invalidation already dropped
+    read_only = g.get('read_only') if has_app_context() else None
+    if read_only:
+        g.read_only = False
+    try:
+        yield
+    finally:
+        if read_only:
+            g.read_only = read_only
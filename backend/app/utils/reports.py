@@ -0,0 +1,291 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from uuid import uuid4
+from flask import current_app
+from sqlalchemy import func
+from .. import cache
+from ..models.models import db, Doctor, Patient, Appointment, Feedback, DailyStats
+
+REPORT_TYPES = ('revenue', 'appointments', 'doctors', 'patients')
+EXPORT_FORMATS = ('csv', 'ndjson', 'parquet')
+EXPORT_EXTENSIONS = {'csv': 'csv', 'ndjson': 'ndjson', 'parquet': 'parquet'}
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+EXPORT_BATCH_SIZE = 5000
+# Streamed text formats are flushed to the client in blocks of about this size
+FLUSH_BYTES = 64 * 1024
+_JOB_KEY = 'report_export:{}'
+
+# Output columns of each report and the type used to coerce them
+REPORT_COLUMNS = {
+    'revenue': [('date', 'date'), ('revenue', 'float')],
+    'appointments': [('date', 'date'), ('count', 'int')],
+    'doctors': [('id', 'int'), ('name', 'string'), ('specialization', 'string'),
+                ('appointment_count', 'int'), ('average_rating', 'float')],
+    'patients': [('id', 'int'), ('name', 'string'), ('appointment_count', 'int'), ('last_visit', 'date')]
+}
+
+class ReportError(ValueError):
+    pass
+
+def _filter_date_range(query, column, start_date, end_date):
+    if start_date:
+        query = query.filter(column >= start_date)
+    if end_date:
+        query = query.filter(column <= end_date)
+    return query
+
+def report_query(report_type, start_date=None, end_date=None):
+    # Rows come back in REPORT_COLUMNS order
+    if report_type == 'revenue':
+        query = db.session.query(
+            DailyStats.date,
+            func.sum(DailyStats.revenue)
+        ).filter(
+            DailyStats.status == 'completed',
+            DailyStats.paid_count > 0
+        )
+        return _filter_date_range(query, DailyStats.date, start_date, end_date).group_by(
+            DailyStats.date
+        ).order_by(DailyStats.date)
+
+    if report_type == 'appointments':
+        query = db.session.query(
+            DailyStats.date,
+            func.sum(DailyStats.appointment_count)
+        )
+        return _filter_date_range(query, DailyStats.date, start_date, end_date).group_by(
+            DailyStats.date
+        ).order_by(DailyStats.date)
+
+    if report_type == 'doctors':
+        # Aggregate in derived tables so the two outer joins don't multiply rows
+        appointment_counts = _filter_date_range(db.session.query(
+            Appointment.doctor_id,
+            func.count(Appointment.appointment_id).label('appointment_count')
+        ), Appointment.date, start_date, end_date).group_by(Appointment.doctor_id).subquery()
+
+        ratings = _filter_date_range(db.session.query(
+            Feedback.doctor_id,
+            func.avg(Feedback.rating).label('average_rating')
+        ), Feedback.date, start_date, end_date).group_by(Feedback.doctor_id).subquery()
+
+        return db.session.query(
+            Doctor.doctor_id,
+            Doctor.first_name + ' ' + Doctor.last_name,
+            Doctor.specialization,
+            func.coalesce(appointment_counts.c.appointment_count, 0),
+            func.coalesce(ratings.c.average_rating, 0)
+        ).outerjoin(
+            appointment_counts, appointment_counts.c.doctor_id == Doctor.doctor_id
+        ).outerjoin(
+            ratings, ratings.c.doctor_id == Doctor.doctor_id
+        ).order_by(Doctor.doctor_id)
+
+    if report_type == 'patients':
+        visits = _filter_date_range(db.session.query(
+            Appointment.patient_id,
+            func.count(Appointment.appointment_id).label('appointment_count'),
+            func.max(Appointment.date).label('last_visit')
+        ), Appointment.date, start_date, end_date).group_by(Appointment.patient_id).subquery()
+
+        return db.session.query(
+            Patient.patient_id,
+            Patient.first_name + ' ' + Patient.last_name,
+            func.coalesce(visits.c.appointment_count, 0),
+            visits.c.last_visit
+        ).outerjoin(
+            visits, visits.c.patient_id == Patient.patient_id
+        ).order_by(Patient.patient_id)
+
+    raise ReportError('Invalid report type')
+
+_COERCE = {'int': int, 'float': float, 'string': str, 'date': lambda value: value}
+
+def iter_report_rows(report_type, start_date=None, end_date=None, batch_size=EXPORT_BATCH_SIZE):
+    coerce = [_COERCE[kind] for _, kind in REPORT_COLUMNS[report_type]]
+    # yield_per streams from a server-side cursor on MySQL, one batch in memory at a time
+    for row in report_query(report_type, start_date, end_date).yield_per(batch_size):
+        yield tuple(None if value is None else convert(value) for convert, value in zip(coerce, row))
+
+def _plain(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def report_records(report_type, rows):
+    names = [name for name, _ in REPORT_COLUMNS[report_type]]
+    for row in rows:
+        yield {name: _plain(value) for name, value in zip(names, row)}
+
+def _buffered(lines):
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+def _csv_lines(report_type, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in REPORT_COLUMNS[report_type]])
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def _ndjson_lines(report_type, rows):
+    for record in report_records(report_type, rows):
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+class _StreamSink(io.RawIOBase):
+    # Write-only file for pyarrow that hands written bytes back to the caller;
+    # tell() keeps counting so Parquet offsets stay valid after each drain
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _arrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ReportError('Parquet export requires pyarrow to be installed')
+    return pyarrow
+
+def _parquet_chunks(report_type, rows, batch_size=EXPORT_BATCH_SIZE):
+    pa = _arrow()
+    types = {'int': pa.int64(), 'float': pa.float64(), 'string': pa.string(), 'date': pa.date32()}
+    schema = pa.schema([(name, types[kind]) for name, kind in REPORT_COLUMNS[report_type]])
+
+    sink = _StreamSink()
+    writer = pa.parquet.ParquetWriter(sink, schema)
+    rows = iter(rows)
+    while True:
+        # One row group per batch keeps memory bounded by the batch size
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        columns = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+        ))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def check_export_format(fmt):
+    if fmt not in EXPORT_FORMATS:
+        raise ReportError(f"Unsupported format '{fmt}', expected one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == 'parquet':
+        _arrow()
+
+def export_chunks(report_type, fmt, rows):
+    if fmt == 'csv':
+        return (chunk.encode() for chunk in _buffered(_csv_lines(report_type, rows)))
+    if fmt == 'ndjson':
+        return (chunk.encode() for chunk in _buffered(_ndjson_lines(report_type, rows)))
+    return _parquet_chunks(report_type, rows)
+
+def export_filename(report_type, fmt, start_date=None, end_date=None):
+    period = '_'.join(day.isoformat() for day in (start_date, end_date) if day) or 'all'
+    return f'{report_type}_{period}.{EXPORT_EXTENSIONS[fmt]}'
+
+def _job_timeout():
+    return current_app.config.get('REPORT_EXPORT_TTL', 86400)
+
+def get_export_job(job_id):
+    return cache.get(_JOB_KEY.format(job_id))
+
+def _save_job(job):
+    cache.set(_JOB_KEY.format(job['job_id']), job, timeout=_job_timeout())
+
+def create_export_job(report_type, fmt, start_date=None, end_date=None):
+    job = {
+        'job_id': uuid4().hex,
+        'status': 'pending',
+        'report_type': report_type,
+        'format': fmt,
+        'start_date': start_date.isoformat() if start_date else None,
+        'end_date': end_date.isoformat() if end_date else None,
+        'filename': export_filename(report_type, fmt, start_date, end_date),
+        'rows': None,
+        'error': None,
+        'created_at': datetime.utcnow().isoformat()
+    }
+    _save_job(job)
+    return job
+
+def export_path(job):
+    return os.path.join(current_app.config['REPORT_EXPORT_FOLDER'], f"{job['job_id']}.{EXPORT_EXTENSIONS[job['format']]}")
+
+def run_export_job(job_id):
+    job = get_export_job(job_id)
+    if job is None:
+        return None
+
+    job['status'] = 'running'
+    _save_job(job)
+
+    path = export_path(job)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    start_date = date.fromisoformat(job['start_date']) if job['start_date'] else None
+    end_date = date.fromisoformat(job['end_date']) if job['end_date'] else None
+    counted = {'rows': 0}
+
+    def counting(rows):
+        for row in rows:
+            counted['rows'] += 1
+            yield row
+
+    try:
+        rows = counting(iter_report_rows(job['report_type'], start_date, end_date))
+        # Written under a temporary name so a download never sees a partial file
+        with open(path + '.part', 'wb') as output:
+            for chunk in export_chunks(job['report_type'], job['format'], rows):
+                output.write(chunk)
+        os.replace(path + '.part', path)
+    except Exception as e:
+        db.session.rollback()
+        if os.path.exists(path + '.part'):
+            os.remove(path + '.part')
+        job.update(status='failed', error=str(e))
+    else:
+        job.update(status='done', rows=counted['rows'], finished_at=datetime.utcnow().isoformat())
+
+    _save_job(job)
+    return job
@@ -0,0 +1,98 @@
+import os
+import threading
+from flask import current_app
+from .ttl_cache import TTLCache
+
+DELETE_BATCH_SIZE = 1000  # delete_objects limit
+DEFAULT_URL_EXPIRES = 3600
+DEFAULT_URL_REFRESH_MARGIN = 300
+
+# Low-level boto3 clients are thread-safe, so one client per process and
+# configuration is shared by every request thread; its urllib3 pool is sized
+# to the worker's thread count through S3_MAX_POOL_CONNECTIONS
+_clients = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+_urls = None
+
+def _client_key():
+    config = current_app.config
+    return (config.get('AWS_ACCESS_KEY_ID'), config.get('AWS_SECRET_ACCESS_KEY'),
+            config.get('AWS_REGION'), config.get('AWS_S3_ENDPOINT_URL'))
+
+def get_s3_client():
+    global _clients_pid
+    key = _client_key()
+    client = _clients.get(key) if _clients_pid == os.getpid() else None
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        # Sockets must not be shared with a parent process after a fork
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+        if key not in _clients:
+            # boto3 takes longer to import than the rest of the app; only S3 deployments pay for it
+            import boto3
+            from botocore.config import Config
+            access_key, secret_key, region, endpoint_url = key
+            _clients[key] = boto3.session.Session().client(
+                's3',
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                region_name=region,
+                endpoint_url=endpoint_url,
+                config=Config(
+                    max_pool_connections=current_app.config.get('S3_MAX_POOL_CONNECTIONS', 50),
+                    retries={'mode': 'standard'}
+                )
+            )
+        return _clients[key]
+
+def _url_cache():
+    global _urls
+    if _urls is None:
+        with _clients_lock:
+            if _urls is None:
+                expires = current_app.config.get('S3_PRESIGNED_URL_EXPIRES', DEFAULT_URL_EXPIRES)
+                margin = current_app.config.get('S3_PRESIGNED_URL_REFRESH_MARGIN', DEFAULT_URL_REFRESH_MARGIN)
+                # Entries are dropped before the URL expires, so a cached URL is
+                # always valid for at least the margin after it is handed out
+                _urls = TTLCache(current_app.config.get('S3_PRESIGNED_URL_CACHE_SIZE', 10000),
+                                 max(expires - margin, 0))
+    return _urls
+
+def presigned_url(bucket, key):
+    cache = _url_cache()
+    url = cache.get((bucket, key))
+    if url is None:
+        url = get_s3_client().generate_presigned_url(
+            'get_object',
+            Params={'Bucket': bucket, 'Key': key},
+            ExpiresIn=current_app.config.get('S3_PRESIGNED_URL_EXPIRES', DEFAULT_URL_EXPIRES)
+        )
+        cache.set((bucket, key), url)
+    return url
+
+def delete_keys(bucket, keys):
+    client = get_s3_client()
+    keys = list(dict.fromkeys(keys))
+    deleted = []
+    errors = []
+
+    for i in range(0, len(keys), DELETE_BATCH_SIZE):
+        batch = keys[i:i + DELETE_BATCH_SIZE]
+        response = client.delete_objects(Bucket=bucket, Delete={
+            'Objects': [{'Key': key} for key in batch],
+            'Quiet': True
+        })
+        # Quiet mode only reports failures
+        failed = {error['Key'] for error in response.get('Errors', ())}
+        errors.extend(response.get('Errors', ()))
+        deleted.extend(key for key in batch if key not in failed)
+
+    if _urls is not None:
+        for key in deleted:
+            _urls.delete((bucket, key))
+    return deleted, errors
@@ -0,0 +1,257 @@
+import json
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime, Time, Numeric, Float
+from ..models.models import Patient, Doctor, Appointment, MedicalReport, Prescription, DoctorSchedule
+from .media import media_links
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Wire formats the routes have always used: ISO dates, HH:MM times and
+# Decimals as strings (what Flask's default encoder produced for fees)
+FORMATS = {
+    'date': '{}.isoformat()',
+    'datetime': '{}.isoformat()',
+    'time': "{}.strftime('%H:%M')",
+    'decimal': 'str({})'
+}
+
+class Field:
+    def __init__(self, source, fmt=None, nullable=True):
+        self.source = source
+        self.fmt = fmt
+        self.nullable = nullable
+
+class Join:
+    # Several string fields joined by a separator, e.g. a person's full name
+    def __init__(self, *sources, sep=' '):
+        self.sources = sources
+        self.sep = sep
+
+def full_name(relationship):
+    return Join(f'{relationship}.first_name', f'{relationship}.last_name')
+
+def _column_format(column_type):
+    if isinstance(column_type, DateTime):
+        return 'datetime'
+    if isinstance(column_type, Date):
+        return 'date'
+    if isinstance(column_type, Time):
+        return 'time'
+    if isinstance(column_type, Numeric) and not isinstance(column_type, Float):
+        return 'decimal'
+    return None
+
+def _infer(model, path):
+    # Follows relationships along a dotted path to the column it ends on
+    mapper = model.__mapper__
+    *relationships, attribute = path.split('.')
+    for name in relationships:
+        mapper = mapper.relationships[name].mapper
+    column = mapper.columns[attribute]
+    return Field(path, _column_format(column.type), column.nullable)
+
+def _attribute(path):
+    return 'obj.' + path
+
+def _loaded(path):
+    # Reads loaded values straight from the instance __dict__, skipping the
+    # instrumented descriptors; a missing key means the value is not loaded
+    first, *rest = path.split('.')
+    return f'd[{first!r}]' + ''.join(f'.__dict__[{name!r}]' for name in rest)
+
+class Schema:
+    # Compiles the field list into generated functions, so dumping a row is a
+    # single dict display with the conversions inlined. Mapped models get a
+    # fast path over already-loaded state that falls back to normal attribute
+    # access (and lazy loading) when something is missing
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = {name: self._field(source) for name, source in fields.items()}
+        self.dump = self._compile()
+
+    def _field(self, source):
+        if isinstance(source, (Field, Join)) or callable(source):
+            return source
+        if self.model is None:
+            return Field(source)
+        return _infer(self.model, source)
+
+    def _entries(self, access, namespace):
+        entries = []
+        for i, (name, field) in enumerate(self.fields.items()):
+            if isinstance(field, Join):
+                parts = [f'{{{access(source)}}}' for source in field.sources]
+                entries.append(f'{name!r}: f{field.sep.join(parts)!r}')
+            elif not isinstance(field, Field):
+                namespace[f'_f{i}'] = field
+                entries.append(f'{name!r}: _f{i}(obj)')
+            elif field.fmt is None:
+                entries.append(f'{name!r}: {access(field.source)}')
+            elif not field.nullable:
+                entries.append(f'{name!r}: {FORMATS[field.fmt].format(access(field.source))}')
+            else:
+                entries.append(f'{name!r}: None if (_v{i} := {access(field.source)}) is None '
+                               f'else {FORMATS[field.fmt].format(f"_v{i}")}')
+        return '{\n        ' + ',\n        '.join(entries) + '\n    }'
+
+    def _compile(self):
+        for field in self.fields.values():
+            sources = field.sources if isinstance(field, Join) else [getattr(field, 'source', '')]
+            if not all(part.isidentifier() for source in sources for part in source.split('.') if source):
+                raise ValueError(f'Invalid field source: {sources}')
+
+        namespace = {}
+        source = f'def dump_attributes(obj):\n    return {self._entries(_attribute, namespace)}\n'
+        if self.model is not None:
+            source += (f'def dump(obj):\n    d = obj.__dict__\n    try:\n'
+                       f'        return {self._entries(_loaded, namespace)}\n'
+                       f'    except KeyError:\n        return dump_attributes(obj)\n')
+        name = self.model.__name__ if self.model is not None else 'row'
+        exec(compile(source, f'<schema {name}>', 'exec'), namespace)
+        return namespace['dump' if self.model is not None else 'dump_attributes']
+
+    def dump_many(self, objs):
+        dump = self.dump
+        return [dump(obj) for obj in objs]
+
+class FastJSONProvider(DefaultJSONProvider):
+    # orjson when installed, with the same output as Flask's encoder: dates and
+    # dataclasses still go through `default`, so nothing changes on the wire
+    OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+               if orjson else 0)
+
+    def encode(self, obj, indent=False):
+        if orjson is not None:
+            option = self.OPTIONS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=self.default, option=option)
+            except orjson.JSONEncodeError:
+                # e.g. integers beyond 64 bits; the stdlib encoder copes
+                pass
+        kwargs = {'indent': 2} if indent else {'separators': (',', ':')}
+        return json.dumps(obj, default=self.default, ensure_ascii=self.ensure_ascii,
+                          sort_keys=self.sort_keys, **kwargs).encode()
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj, indent=bool(kwargs.get('indent'))).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.encode(obj, indent) + b'\n', mimetype=self.mimetype)
+
+PATIENT = Schema(Patient, {
+    'id': 'patient_id',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'email': 'email',
+    'contact_number': 'contact_number',
+    'date_of_birth': 'date_of_birth'
+})
+
+DOCTOR = Schema(Doctor, {
+    'id': 'doctor_id',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'email': 'email',
+    'specialization': 'specialization',
+    'contact_number': 'contact_number',
+    'consultation_fees': 'consultation_fees',
+    'status': 'availability_status'
+})
+
+DOCTOR_DIRECTORY = Schema(Doctor, {
+    'id': 'doctor_id',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'specialization': 'specialization',
+    'consultation_fees': 'consultation_fees'
+})
+
+DOCTOR_SEARCH = Schema(Doctor, {
+    'id': 'doctor_id',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'specialization': 'specialization',
+    'clinic_hospital_name': 'clinic_hospital_name',
+    'consultation_fees': 'consultation_fees'
+})
+
+APPOINTMENT = Schema(Appointment, {
+    'id': 'appointment_id',
+    'patient_id': 'patient_id',
+    'doctor_id': 'doctor_id',
+    'date': 'date',
+    'time': 'time',
+    'status': 'status',
+    'mode': 'mode',
+    'payment_status': 'payment_status',
+    'version': 'version'
+})
+
+PATIENT_APPOINTMENT = Schema(Appointment, {
+    'id': 'appointment_id',
+    'doctor_name': full_name('doctor'),
+    'date': 'date',
+    'time': 'time',
+    'status': 'status',
+    'mode': 'mode',
+    'payment_status': 'payment_status'
+})
+
+ADMIN_APPOINTMENT = Schema(Appointment, {
+    'id': 'appointment_id',
+    'patient_name': full_name('patient'),
+    'doctor_name': full_name('doctor'),
+    'date': 'date',
+    'time': 'time',
+    'status': 'status',
+    'mode': 'mode',
+    'payment_status': 'payment_status'
+})
+
+MEDICAL_REPORT = Schema(MedicalReport, {
+    'id': 'report_id',
+    'doctor_name': full_name('doctor'),
+    'date': 'date',
+    'diagnosis': 'diagnosis',
+    'symptoms': 'symptoms',
+    'appointment_id': 'appointment_id',
+    'file': lambda report: media_links(report, 'medical_report')
+})
+
+PRESCRIPTION = Schema(Prescription, {
+    'id': 'prescription_id',
+    'doctor_name': full_name('doctor'),
+    'date': 'date_issued',
+    'medicine_name': 'medicine_name',
+    'dosage': 'dosage',
+    'frequency': 'frequency'
+})
+
+SCHEDULE = Schema(DoctorSchedule, {
+    'weekday': 'weekday',
+    'start_time': 'start_time',
+    'end_time': 'end_time',
+    'slot_minutes': 'slot_minutes'
+})
+
+# Rows of (Feedback, patient/doctor name labels) from the admin listing
+FEEDBACK_ROW = Schema(None, {
+    'id': 'Feedback.feedback_id',
+    'patient_name': lambda row: f'{row.patient_first_name} {row.patient_last_name}',
+    'doctor_name': lambda row: f'{row.doctor_first_name} {row.doctor_last_name}',
+    'rating': 'Feedback.rating',
+    'comment': 'Feedback.comments',
+    'date': Field('Feedback.date', 'date', nullable=False),
+    'video': lambda row: media_links(row.Feedback, 'feedback')
+})
@@ -0,0 +1,286 @@
+import heapq
+import threading
+import time as timer
+from collections import defaultdict
+from datetime import datetime, date, time, timedelta
+from itertools import chain
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history
+from .. import cache
+from ..models.models import db, Doctor, DoctorSchedule, Appointment
+
+# Slots are tracked by start time on a 5 minute grid: one bit per grid cell,
+# 288 bits per day, so a day's availability for a doctor is a single int
+GRID_MINUTES = 5
+DEFAULT_INDEX_TTL = 300
+_PENDING_KEY = 'slot_index_changes'
+# Bookings and schedule edits are published to other workers like the doctor
+# search index: a shared counter and one cache entry per committed change set
+GENERATION_KEY = 'slot_index:generation'
+_CHANGED_KEY = 'slot_index:changed:{}'
+MAX_CATCH_UP = 1000
+# Doctor columns shown in slot search results
+_DOCTOR_FIELDS = ('first_name', 'last_name', 'specialization')
+
+def _bit(value):
+    return (value.hour * 60 + value.minute) // GRID_MINUTES
+
+def _time_of(bit):
+    minutes = bit * GRID_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+def _iter_bits(mask, doctor_id):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1, doctor_id
+        mask ^= low
+
+def check_schedule_entry(schedule):
+    # The index only has cells on the grid, so off-grid hours would never be offered
+    if not 0 <= schedule.weekday <= 6:
+        raise ValueError('weekday must be between 0 (Monday) and 6 (Sunday)')
+    for field in ('start_time', 'end_time'):
+        value = getattr(schedule, field)
+        if value.minute % GRID_MINUTES or value.second:
+            raise ValueError(f'{field} must be on a {GRID_MINUTES} minute boundary')
+    if schedule.end_time <= schedule.start_time:
+        raise ValueError('end_time must be after start_time')
+    if schedule.slot_minutes <= 0 or schedule.slot_minutes % GRID_MINUTES:
+        raise ValueError(f'slot_minutes must be a positive multiple of {GRID_MINUTES}')
+
+def template_mask(schedules):
+    mask = 0
+    for schedule in schedules:
+        start = schedule.start_time.hour * 60 + schedule.start_time.minute
+        end = schedule.end_time.hour * 60 + schedule.end_time.minute
+        for minute in range(start, end - schedule.slot_minutes + 1, schedule.slot_minutes):
+            mask |= 1 << (minute // GRID_MINUTES)
+    return mask
+
+class SlotIndex:
+    def __init__(self, ttl=DEFAULT_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._templates = {}                        # doctor_id -> [mask per weekday]
+        self._doctors = {}                          # doctor_id -> (name, specialization)
+        self._by_specialization = defaultdict(list)
+        self._booked = defaultdict(int)             # (doctor_id, date) -> mask
+        self._stale_doctors = set()
+        self._generation = None
+
+    def _load_doctors(self, doctor_ids=None):
+        query = db.session.query(DoctorSchedule, Doctor.first_name, Doctor.last_name, Doctor.specialization).join(
+            Doctor, Doctor.doctor_id == DoctorSchedule.doctor_id
+        )
+        if doctor_ids is not None:
+            query = query.filter(DoctorSchedule.doctor_id.in_(doctor_ids))
+
+        schedules = defaultdict(lambda: defaultdict(list))
+        doctors = {}
+        for schedule, first_name, last_name, specialization in query:
+            schedules[schedule.doctor_id][schedule.weekday].append(schedule)
+            doctors[schedule.doctor_id] = (f"{first_name} {last_name}", specialization)
+
+        templates = {
+            doctor_id: [template_mask(by_weekday.get(weekday, ())) for weekday in range(7)]
+            for doctor_id, by_weekday in schedules.items()
+        }
+        return templates, doctors
+
+    def _load_bookings(self, since):
+        booked = defaultdict(int)
+        rows = db.session.query(Appointment.doctor_id, Appointment.date, Appointment.time).filter(
+            Appointment.date >= since,
+            Appointment.slot_active.is_(True)
+        ).yield_per(10000)
+        for doctor_id, day, start in rows:
+            booked[(doctor_id, day)] |= 1 << _bit(start)
+        return booked
+
+    def _reindex_specializations(self):
+        by_specialization = defaultdict(list)
+        for doctor_id, (_, specialization) in sorted(self._doctors.items()):
+            by_specialization[specialization].append(doctor_id)
+        self._by_specialization = by_specialization
+
+    def rebuild(self, generation=None):
+        templates, doctors = self._load_doctors()
+        booked = self._load_bookings(date.today())
+        with self._lock:
+            self._templates = templates
+            self._doctors = doctors
+            self._booked = booked
+            self._stale_doctors.clear()
+            self._reindex_specializations()
+            self._generation = generation
+            self._built_at = timer.monotonic()
+
+    def apply_changes(self, changes):
+        for doctor_id, day, start in changes['free']:
+            self.mark_free(doctor_id, day, start)
+        for doctor_id, day, start in changes['booked']:
+            self.mark_booked(doctor_id, day, start)
+        if changes['doctors']:
+            self.invalidate_doctors(changes['doctors'])
+
+    def _catch_up(self, generation):
+        # Replays the change sets other workers committed since our last
+        # generation, in order; rebuilds if any have expired
+        with self._lock:
+            start = self._generation
+        if start is None or not start < generation <= start + MAX_CATCH_UP:
+            self.rebuild(generation)
+            return True
+
+        changed = cache.get_many(*[_CHANGED_KEY.format(n) for n in range(start + 1, generation + 1)])
+        if any(changes is None for changes in changed):
+            self.rebuild(generation)
+            return True
+        for changes in changed:
+            self.apply_changes(changes)
+        with self._lock:
+            self._generation = max(self._generation, generation)
+        return False
+
+    def ensure_fresh(self):
+        generation = int(cache.get(GENERATION_KEY) or 0)
+        if self._built_at is None or timer.monotonic() - self._built_at > self.ttl:
+            self.rebuild(generation)
+            return
+        if generation != self._generation and self._catch_up(generation):
+            return
+
+        with self._lock:
+            stale = set(self._stale_doctors)
+        if not stale:
+            return
+
+        templates, doctors = self._load_doctors(stale)
+        with self._lock:
+            for doctor_id in stale:
+                self._templates.pop(doctor_id, None)
+                self._doctors.pop(doctor_id, None)
+            self._templates.update(templates)
+            self._doctors.update(doctors)
+            self._stale_doctors -= stale
+            self._reindex_specializations()
+
+    def mark_booked(self, doctor_id, day, start):
+        with self._lock:
+            self._booked[(doctor_id, day)] |= 1 << _bit(start)
+
+    def mark_free(self, doctor_id, day, start):
+        with self._lock:
+            key = (doctor_id, day)
+            self._booked[key] &= ~(1 << _bit(start))
+            if not self._booked[key]:
+                del self._booked[key]
+
+    def invalidate_doctors(self, doctor_ids):
+        with self._lock:
+            self._stale_doctors.update(doctor_ids)
+
+    def next_free_slots(self, specialization, start_date, end_date, limit, now=None):
+        now = now or datetime.now()
+        start_date = max(start_date, now.date())
+        results = []
+
+        with self._lock:
+            doctor_ids = self._by_specialization.get(specialization, ())
+            day = start_date
+            while day <= end_date and len(results) < limit:
+                weekday = day.weekday()
+                # Drop grid cells that have already started today
+                floor = ~((1 << (_bit(now.time()) + 1)) - 1) if day == now.date() else -1
+
+                free_by_doctor = []
+                for doctor_id in doctor_ids:
+                    free = self._templates[doctor_id][weekday] & ~self._booked.get((doctor_id, day), 0) & floor
+                    if free:
+                        free_by_doctor.append(_iter_bits(free, doctor_id))
+
+                # Earliest slots first across all doctors of the specialization
+                for bit, doctor_id in heapq.merge(*free_by_doctor):
+                    name, _ = self._doctors[doctor_id]
+                    results.append({
+                        'doctor_id': doctor_id,
+                        'doctor_name': name,
+                        'date': day.isoformat(),
+                        'time': _time_of(bit).strftime('%H:%M')
+                    })
+                    if len(results) >= limit:
+                        break
+                day += timedelta(days=1)
+
+        return results
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_slot_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SlotIndex(current_app.config.get('SLOT_INDEX_TTL', DEFAULT_INDEX_TTL))
+    return _index
+
+def _old_and_new(obj, fields):
+    old, new = {}, {}
+    for field in fields:
+        history = get_history(obj, field)
+        unchanged = history.unchanged[0] if history.unchanged else None
+        old[field] = history.deleted[0] if history.deleted else unchanged
+        new[field] = history.added[0] if history.added else unchanged
+    return old, new
+
+def _unchanged(session, obj, fields):
+    return obj in session.dirty and not any(get_history(obj, field).has_changes() for field in fields)
+
+def _pending(session):
+    return session.info.setdefault(_PENDING_KEY, {'free': [], 'booked': [], 'doctors': set()})
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_slot_changes(session, flush_context):
+    fields = ('doctor_id', 'date', 'time', 'slot_active')
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Appointment):
+            # Status and payment updates do not move the slot
+            if _unchanged(session, obj, fields):
+                continue
+            changes = _pending(session)
+            old, new = _old_and_new(obj, fields)
+            if obj not in session.new and old['slot_active']:
+                changes['free'].append((old['doctor_id'], old['date'], old['time']))
+            if obj not in session.deleted and new['slot_active']:
+                changes['booked'].append((new['doctor_id'], new['date'], new['time']))
+        elif isinstance(obj, DoctorSchedule):
+            _pending(session)['doctors'].update(chain(*get_history(obj, 'doctor_id')))
+        elif isinstance(obj, Doctor):
+            # Password rehashes and profile edits leave the index alone
+            if _unchanged(session, obj, _DOCTOR_FIELDS):
+                continue
+            _pending(session)['doctors'].add(obj.doctor_id)
+
+def publish_slot_changes(changes):
+    changes = dict(changes, doctors=sorted({int(doctor_id) for doctor_id in changes['doctors'] if doctor_id is not None}))
+    if not any(changes.values()):
+        return
+    generation = cache.cache.inc(GENERATION_KEY)
+    cache.set(_CHANGED_KEY.format(generation), changes,
+              timeout=current_app.config.get('SLOT_INDEX_TTL', DEFAULT_INDEX_TTL))
+    # Applied here right away; catching up replays it in order with the others
+    if _index is not None:
+        _index.apply_changes(changes)
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_slot_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes is not None and has_app_context():
+        publish_slot_changes(changes)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_slot_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,8 @@
+def swag_from(specs):
+    # Stand-in for flasgger.swag_from with dict specs: flasgger reads the same
+    # specs_dict attribute when it builds /apispec_1.json, so the routes no
+    # longer import flasgger (and jsonschema) in workers that never serve docs
+    def decorator(function):
+        function.specs_dict = specs
+        return function
+    return decorator
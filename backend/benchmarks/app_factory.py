@@ -0,0 +1,38 @@
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from app import cache, configure_celery
+from app.models.models import db
+from app.utils.replicas import init_replicas
+from app.utils.serializers import FastJSONProvider
+from config.config import TestingConfig
+
+def make_app(database_url, blueprints=(), **overrides):
+    # A bare app with only the pieces a benchmark exercises: no rate limiter,
+    # metrics or CORS, and only the blueprints it passes in
+    app = Flask('benchmarks')
+    app.config.from_object(TestingConfig)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=database_url,
+        QUERY_BUDGET_ENFORCED=False,
+        JWT_SECRET_KEY='benchmark-jwt-secret-key-with-enough-bytes'
+    )
+    app.config.update(overrides)
+    
+    app.json = FastJSONProvider(app)
+    # TestingConfig runs tasks eagerly, without a broker
+    configure_celery(app.config)
+    init_replicas(app)
+    db.init_app(app)
+    JWTManager(app)
+    cache.init_app(app)
+    for blueprint, url_prefix in blueprints:
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+        
+    # Same session listeners create_app installs
+    from app.utils import daily_stats, credentials  # noqa: F401
+    return app
+
+def auth_header(app, user_id, role):
+    with app.app_context():
+        token = create_access_token(identity=str(user_id), additional_claims={'role': role})
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,112 @@
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time as timer
+from datetime import date, time, timedelta
+from sqlalchemy import func
+from app.models.models import db, Appointment
+from app.utils.booking import BookingBusy, BookingError, SlotUnavailable, book_slots
+from benchmarks.app_factory import make_app
+from benchmarks.seed import seed_database
+
+def candidate_slots(doctor_id, days, slots_per_day, start_date):
+    return [{
+        'doctor_id': doctor_id,
+        'date': start_date + timedelta(days=day),
+        'time': time(8 + slot // 2, 30 * (slot % 2)),
+        'mode': 'online'
+    } for day in range(days) for slot in range(slots_per_day)]
+
+def worker(app, slots, attempts, bulk_size, counters, lock, seed):
+    rng = random.Random(seed)
+    booked = conflicts = busy = errors = 0
+    
+    with app.app_context():
+        for _ in range(attempts):
+            request_slots = rng.sample(slots, bulk_size)
+            try:
+                booked += len(book_slots(rng.randint(1, 100), request_slots))
+            except SlotUnavailable:
+                conflicts += 1
+            except BookingBusy:
+                busy += 1
+            except BookingError:
+                errors += 1
+            except Exception:
+                db.session.rollback()
+                errors += 1
+        db.session.remove()
+        
+    with lock:
+        counters['booked'] += booked
+        counters['conflicts'] += conflicts
+        counters['busy'] += busy
+        counters['errors'] += errors
+
+def main():
+    parser = argparse.ArgumentParser(description='Many threads booking the same doctor; verifies no slot is double-booked')
+    parser.add_argument('--database-url', help='Defaults to a fresh SQLite file; pass a MySQL URL to test row locking there')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--attempts', type=int, default=200, help='Booking requests per thread')
+    parser.add_argument('--bulk-size', type=int, default=1, help='Slots per request (>1 exercises the bulk path)')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--slots-per-day', type=int, default=16)
+    args = parser.parse_args()
+    
+    database_url = args.database_url
+    if not database_url:
+        path = os.path.join(tempfile.gettempdir(), 'bench_booking.sqlite')
+        if os.path.exists(path):
+            os.remove(path)
+        database_url = f'sqlite:///{path}'
+        
+    app = make_app(database_url, SQLALCHEMY_ENGINE_OPTIONS={
+        'connect_args': {'timeout': 30} if database_url.startswith('sqlite') else {},
+        'pool_size': args.threads
+    })
+    with app.app_context():
+        db.create_all()
+        seed_database(db.engine, patients=100, doctors=1, appointments=0, schedule_days=7)
+        
+    slots = candidate_slots(1, args.days, args.slots_per_day, date.today() + timedelta(days=1))
+    counters = {'booked': 0, 'conflicts': 0, 'busy': 0, 'errors': 0}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=worker, args=(app, slots, args.attempts, args.bulk_size, counters, lock, seed))
+        for seed in range(args.threads)
+    ]
+    
+    started = timer.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = timer.perf_counter() - started
+    
+    with app.app_context():
+        double_booked = db.session.query(
+            Appointment.doctor_id, Appointment.date, Appointment.time
+        ).filter(
+            Appointment.slot_active.is_(True)
+        ).group_by(
+            Appointment.doctor_id, Appointment.date, Appointment.time
+        ).having(func.count() > 1).count()
+        stored = Appointment.query.filter(Appointment.slot_active.is_(True)).count()
+        
+    requests = args.threads * args.attempts
+    print(f"{args.threads} threads x {args.attempts} requests ({args.bulk_size} slot(s) each) against {len(slots)} slots")
+    print(f"requests/sec:        {requests / elapsed:10.1f}")
+    print(f"bookings/sec:        {counters['booked'] / elapsed:10.1f}")
+    print(f"booked:              {counters['booked']:10d}")
+    print(f"rejected (conflict): {counters['conflicts']:10d}")
+    print(f"rejected (busy):     {counters['busy']:10d}")
+    print(f"other errors:        {counters['errors']:10d}")
+    print(f"double-booked slots: {double_booked:10d}")
+    
+    if double_booked or stored != counters['booked']:
+        raise SystemExit('FAILED: booking table does not match successful bookings')
+
+if __name__ == '__main__':
+    main()
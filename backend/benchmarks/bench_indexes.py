@@ -0,0 +1,110 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time as timer
+from datetime import date, time
+from sqlalchemy import create_engine, select, func, text
+from app.models.models import db, Doctor, Appointment, MedicalReport, Prescription, Feedback
+from benchmarks.seed import seed_database
+
+# Indexes added by migration 3c1f8e2a9d47; the (doctor_id, date, time) index
+# has since become the uq_appointment_doctor_slot constraint
+BENCHMARKED_INDEXES = [
+    index for table in (Appointment.__table__, MedicalReport.__table__, Prescription.__table__,
+                        Feedback.__table__, Doctor.__table__)
+    for index in table.indexes
+    if index.name in {
+        'ix_appointment_patient_status',
+        'ix_appointment_date_status_payment',
+        'ix_medical_report_patient_id',
+        'ix_prescription_patient_id',
+        'ix_feedback_doctor_id',
+        'ix_doctor_specialization'
+    }
+]
+
+def route_queries():
+    return {
+        'patient.get_appointments': select(Appointment).where(
+            Appointment.patient_id == 42, Appointment.status == 'Scheduled'
+        ),
+        'appointment slot lookup': select(Appointment.appointment_id).where(
+            Appointment.doctor_id == 7, Appointment.date == date(2022, 2, 1), Appointment.time == time(9, 0)
+        ),
+        'admin revenue (30 days)': select(Appointment.date, func.sum(Doctor.consultation_fees)).join(
+            Doctor, Doctor.doctor_id == Appointment.doctor_id
+        ).where(
+            Appointment.date.between(date(2022, 2, 1), date(2022, 3, 2)),
+            Appointment.status == 'completed',
+            Appointment.payment_status == 'paid'
+        ).group_by(Appointment.date),
+        'patient.get_medical_reports': select(MedicalReport).where(MedicalReport.patient_id == 42),
+        'patient.get_prescriptions': select(Prescription).where(Prescription.patient_id == 42),
+        'doctor average rating': select(func.avg(Feedback.rating)).where(Feedback.doctor_id == 7),
+        'patient.get_doctors (specialization)': select(Doctor).where(Doctor.specialization == 'Neurology')
+    }
+
+def explain(connection, statement):
+    sql = str(statement.compile(connection, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+def time_query(connection, statement, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = timer.perf_counter()
+        connection.execute(statement).fetchall()
+        samples.append((timer.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def run_phase(engine, label, repeat):
+    results = {}
+    with engine.connect() as connection:
+        for name, statement in route_queries().items():
+            results[name] = {
+                'plan': explain(connection, statement),
+                'median_ms': time_query(connection, statement, repeat)
+            }
+    print(f"\n== {label} ==")
+    for name, result in results.items():
+        print(f"{name:40s} {result['median_ms']:10.3f} ms")
+        for step in result['plan']:
+            print(f"    {step}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare query plans and latency before/after the query-pattern indexes')
+    parser.add_argument('--db', default=os.path.join(tempfile.gettempdir(), 'bench_indexes.sqlite'))
+    parser.add_argument('--appointments', type=int, default=1000000)
+    parser.add_argument('--patients', type=int, default=50000)
+    parser.add_argument('--doctors', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine(f'sqlite:///{args.db}')
+    db.metadata.create_all(engine)
+    for index in BENCHMARKED_INDEXES:
+        index.drop(engine)
+
+    started = timer.perf_counter()
+    seed_database(engine, patients=args.patients, doctors=args.doctors, appointments=args.appointments)
+    print(f"Seeded {args.appointments} appointments in {timer.perf_counter() - started:.1f}s ({args.db})")
+
+    before = run_phase(engine, 'without indexes', args.repeat)
+
+    for index in BENCHMARKED_INDEXES:
+        index.create(engine)
+    with engine.begin() as connection:
+        connection.execute(text('ANALYZE'))
+
+    after = run_phase(engine, 'with indexes', args.repeat)
+
+    print("\n== speedup ==")
+    for name in before:
+        speedup = before[name]['median_ms'] / max(after[name]['median_ms'], 1e-6)
+        print(f"{name:40s} {before[name]['median_ms']:10.3f} -> {after[name]['median_ms']:8.3f} ms  (x{speedup:.1f})")
+
+if __name__ == '__main__':
+    main()
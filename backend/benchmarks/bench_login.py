@@ -0,0 +1,82 @@
+import argparse
+import os
+import tempfile
+import threading
+import time as timer
+from app.models.models import db
+from app.routes.auth import auth_bp
+from app.utils import passwords
+from benchmarks.app_factory import make_app
+from benchmarks.seed import seed_database
+
+PASSWORD = 'correct horse battery staple'
+
+def run(database_url, workers, threads, logins, users, settings):
+    passwords._pool = None
+    app = make_app(database_url, [(auth_bp, '/api/auth')], PASSWORD_HASH_WORKERS=workers, **settings)
+    failures = []
+    
+    def worker(offset):
+        client = app.test_client()
+        for i in range(logins):
+            email = f'patient{(offset * logins + i) % users + 1}@example.com'
+            response = client.post('/api/auth/login', json={'email': email, 'password': PASSWORD, 'role': 'patient'})
+            if response.status_code != 200:
+                failures.append(response.status_code)
+                
+    # Start the pool (and its spawned processes) outside the timed section
+    with app.app_context():
+        if passwords.get_hash_pool():
+            passwords.get_hash_pool().map(passwords._verify, ['pbkdf2:sha256:1$a$b'] * workers, [''] * workers)
+            
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = timer.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = timer.perf_counter() - started
+    
+    if passwords._pool is not None:
+        passwords._pool.shutdown()
+    if failures:
+        raise SystemExit(f'{len(failures)} logins failed: {sorted(set(failures))}')
+    return threads * logins / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput with inline hashing vs the hashing process pool')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent request threads')
+    parser.add_argument('--logins', type=int, default=25, help='Logins per thread')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Hashing processes for the pooled run')
+    parser.add_argument('--hasher', choices=['pbkdf2', 'bcrypt'], default='pbkdf2')
+    parser.add_argument('--cost', type=int, help='pbkdf2 iterations or bcrypt rounds')
+    args = parser.parse_args()
+    
+    settings = {'PASSWORD_HASHER': args.hasher}
+    if args.cost:
+        settings['PASSWORD_PBKDF2_ITERATIONS' if args.hasher == 'pbkdf2' else 'PASSWORD_BCRYPT_ROUNDS'] = args.cost
+    else:
+        settings['PASSWORD_PBKDF2_ITERATIONS'] = passwords.DEFAULTS['PASSWORD_PBKDF2_ITERATIONS']
+        
+    path = os.path.join(tempfile.gettempdir(), 'bench_login.sqlite')
+    if os.path.exists(path):
+        os.remove(path)
+    database_url = f'sqlite:///{path}'
+    
+    users = 200
+    app = make_app(database_url, **settings)
+    with app.app_context():
+        db.create_all()
+        # One shared hash keeps seeding fast; every login still pays a full verify
+        seed_database(db.engine, patients=users, doctors=1, appointments=0,
+                      password_hash=passwords.hash_password(PASSWORD))
+        
+    inline = run(database_url, 0, args.threads, args.logins, users, settings)
+    pooled = run(database_url, args.workers, args.threads, args.logins, users, settings)
+    
+    print(f"{args.hasher} login, {args.threads} threads x {args.logins} logins")
+    print(f"inline hashing:              {inline:8.1f} logins/s")
+    print(f"process pool ({args.workers} workers):   {pooled:8.1f} logins/s  (x{pooled / inline:.2f})")
+
+if __name__ == '__main__':
+    main()
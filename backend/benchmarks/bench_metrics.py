@@ -0,0 +1,52 @@
+import argparse
+import os
+import tempfile
+import time as timer
+from app.models.models import db
+from app.routes.patient import patient_bp
+from app.utils.metrics import init_metrics
+from benchmarks.app_factory import make_app, auth_header
+from benchmarks.seed import seed_database
+
+def run(app, requests, patients):
+    headers = [auth_header(app, user_id, 'patient') for user_id in range(1, patients + 1)]
+    client = app.test_client()
+
+    for header in headers:
+        client.get('/api/patients/profile', headers=header)
+
+    started = timer.perf_counter()
+    for i in range(requests):
+        response = client.get('/api/patients/profile', headers=headers[i % patients])
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return (timer.perf_counter() - started) / requests
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-request cost of the metrics middleware on /api/patients/profile')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--patients', type=int, default=100)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), 'bench_metrics.sqlite')
+    if os.path.exists(path):
+        os.remove(path)
+    database_url = f'sqlite:///{path}'
+
+    app = make_app(database_url)
+    with app.app_context():
+        db.create_all()
+        seed_database(db.engine, patients=max(args.patients, 1000), doctors=10, appointments=0)
+
+    # The cursor listeners are process-wide once installed, so the baseline runs first
+    blueprints = [(patient_bp, '/api/patients')]
+    before = run(make_app(database_url, blueprints, PRINCIPAL_CACHE_TTL=0), args.requests, args.patients)
+    instrumented = make_app(database_url, blueprints, PRINCIPAL_CACHE_TTL=0, METRICS_SERVER_TIMING=True)
+    init_metrics(instrumented)
+    after = run(instrumented, args.requests, args.patients)
+
+    print(f"GET /api/patients/profile, {args.requests} requests")
+    print(f"metrics off: {before * 1e6:8.1f} us/request")
+    print(f"metrics on:  {after * 1e6:8.1f} us/request  (+{(after - before) * 1e6:.1f} us, {after / before - 1:+.1%})")
+
+if __name__ == '__main__':
+    main()
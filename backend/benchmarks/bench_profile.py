@@ -0,0 +1,52 @@
+import argparse
+import os
+import tempfile
+import time as timer
+from app.models.models import db
+from app.routes.patient import patient_bp
+from app.utils import principal_cache
+from benchmarks.app_factory import make_app, auth_header
+from benchmarks.seed import seed_database
+
+def run(database_url, ttl, requests, patients):
+    principal_cache._local = None
+    app = make_app(database_url, [(patient_bp, '/api/patients')], PRINCIPAL_CACHE_TTL=ttl)
+    headers = [auth_header(app, user_id, 'patient') for user_id in range(1, patients + 1)]
+    client = app.test_client()
+    
+    # Warm up imports, the pool and (when enabled) the cache
+    for header in headers:
+        client.get('/api/patients/profile', headers=header)
+        
+    started = timer.perf_counter()
+    for i in range(requests):
+        response = client.get('/api/patients/profile', headers=headers[i % patients])
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return requests / (timer.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description='Requests/sec for /api/patients/profile with and without the principal cache')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--patients', type=int, default=100, help='Distinct users cycling through the endpoint')
+    parser.add_argument('--ttl', type=int, default=30)
+    args = parser.parse_args()
+    
+    path = os.path.join(tempfile.gettempdir(), 'bench_profile.sqlite')
+    if os.path.exists(path):
+        os.remove(path)
+    database_url = f'sqlite:///{path}'
+    
+    app = make_app(database_url)
+    with app.app_context():
+        db.create_all()
+        seed_database(db.engine, patients=max(args.patients, 1000), doctors=10, appointments=0)
+        
+    before = run(database_url, 0, args.requests, args.patients)
+    after = run(database_url, args.ttl, args.requests, args.patients)
+    
+    print(f"GET /api/patients/profile, {args.requests} requests over {args.patients} users")
+    print(f"principal cache off:  {before:10.1f} req/s")
+    print(f"principal cache on:   {after:10.1f} req/s  (x{after / before:.2f})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time as timer
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, insert
+from app.models.models import db, Appointment, ReminderLog
+from app.utils.reminders import ReminderScheduler, FakeSender
+from benchmarks.app_factory import make_app
+from benchmarks.seed import seed_database
+
+def seed_upcoming(count, doctors, patients, now, horizon):
+    # Appointments whose 1 hour reminder falls inside the next `horizon` seconds
+    rows = []
+    for i in range(count):
+        starts_at = now + timedelta(minutes=60, seconds=(i * horizon) // count)
+        rows.append({
+            'patient_id': i % patients + 1,
+            'doctor_id': i % doctors + 1,
+            'date': starts_at.date(),
+            'time': starts_at.time().replace(microsecond=0),
+            'mode': 'online',
+            'status': 'Scheduled',
+            'slot_active': True
+        })
+    db.session.execute(insert(Appointment), rows)
+    db.session.commit()
+
+def run(concurrency, latency, now, horizon):
+    db.session.execute(delete(ReminderLog))
+    db.session.commit()
+
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    scheduler = ReminderScheduler(FakeSender(latency=latency), offsets=(60,), horizon=horizon,
+                                  concurrency=concurrency, batch_size=1000)
+    started = timer.perf_counter()
+    asyncio.run(scheduler.tick(now + timedelta(seconds=horizon)))
+    elapsed = timer.perf_counter() - started
+    event.remove(db.engine, 'before_cursor_execute', listener)
+    return elapsed, len(statements), scheduler.metrics.snapshot()
+
+def main():
+    parser = argparse.ArgumentParser(description='Reminder dispatch throughput with a slow fake sender')
+    parser.add_argument('--database-url', help='Defaults to a fresh SQLite file')
+    parser.add_argument('--appointments', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds per simulated send')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--horizon', type=int, default=600)
+    args = parser.parse_args()
+
+    path = None
+    if args.database_url is None:
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+    app = make_app(args.database_url or f'sqlite:///{path}')
+
+    try:
+        with app.app_context():
+            db.create_all()
+            seed_database(db.engine, patients=1000, doctors=100, appointments=0)
+            now = datetime.now().replace(microsecond=0)
+            seed_upcoming(args.appointments, 100, 1000, now, args.horizon)
+
+            for concurrency in args.concurrency:
+                elapsed, queries, metrics = run(concurrency, args.latency, now, args.horizon)
+                print(f"concurrency {concurrency:4d}: {metrics['sent']} sent in {elapsed:7.2f} s "
+                      f"({metrics['sent'] / elapsed:8.1f}/s), {metrics['batches']} batches, {queries} statements")
+    finally:
+        if path:
+            os.remove(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time as timer
+from collections import Counter
+from sqlalchemy import event
+from app.models.models import db
+from benchmarks.app_factory import make_app, auth_header
+from benchmarks.load import BLUEPRINTS
+from benchmarks.seed import seed_database
+
+# The listing/report GETs marked @read_only
+READ_ENDPOINTS = [
+    ('patient', '/api/patients/profile'),
+    ('patient', '/api/patients/appointments'),
+    ('patient', '/api/patients/medical-reports'),
+    ('patient', '/api/patients/prescriptions'),
+    ('patient', '/api/patients/doctors'),
+    ('patient', '/api/patients/doctors/search?q=car'),
+    ('admin', '/api/admin/doctors'),
+    ('admin', '/api/admin/patients'),
+    ('admin', '/api/admin/appointments'),
+    ('admin', '/api/admin/statistics'),
+    ('admin', '/api/admin/feedback'),
+    ('admin', '/api/admin/reports?report_type=revenue'),
+    ('admin', '/api/admin/reports?report_type=appointments&format=csv')
+]
+
+def count_statements(app):
+    # Statements per bind: None is the primary, replica_<n> the copies
+    counts = Counter()
+    with app.app_context():
+        for key, engine in db.engines.items():
+            event.listen(engine, 'before_cursor_execute',
+                         lambda *args, key=key: counts.update([key or 'primary']))
+    return counts
+
+def doctor_status(client, headers, doctor_id):
+    response = client.get('/api/admin/doctors?limit=100', headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return next(doctor['status'] for doctor in response.get_json()['items'] if doctor['id'] == doctor_id)
+
+def main():
+    parser = argparse.ArgumentParser(description='Read replica routing with a primary and a replica SQLite file')
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--doctors', type=int, default=50)
+    parser.add_argument('--appointments', type=int, default=2000)
+    parser.add_argument('--replicas', type=int, default=1)
+    parser.add_argument('--rounds', type=int, default=20, help='Passes over the read endpoints')
+    parser.add_argument('--sticky-seconds', type=int, default=2)
+    args = parser.parse_args()
+
+    directory = tempfile.gettempdir()
+    primary = os.path.join(directory, 'bench_replicas_primary.sqlite')
+    replicas = [os.path.join(directory, f'bench_replicas_{i}.sqlite') for i in range(args.replicas)]
+    for path in [primary] + replicas:
+        if os.path.exists(path):
+            os.remove(path)
+
+    setup = make_app(f'sqlite:///{primary}')
+    with setup.app_context():
+        db.create_all()
+        seed_database(db.engine, patients=args.patients, doctors=args.doctors,
+                      appointments=args.appointments, admins=1)
+        db.engine.dispose()
+    # A replica is a copy taken now; it never sees later writes, which makes
+    # reads that were wrongly routed to it show up as stale
+    for path in replicas:
+        shutil.copyfile(primary, path)
+
+    app = make_app(f'sqlite:///{primary}', BLUEPRINTS,
+                   SQLALCHEMY_REPLICA_URLS=[f'sqlite:///{path}' for path in replicas],
+                   REPLICA_STICKY_SECONDS=args.sticky_seconds)
+    counts = count_statements(app)
+    client = app.test_client()
+    headers = {'patient': auth_header(app, 1, 'patient'), 'admin': auth_header(app, 1, 'admin')}
+
+    started = timer.perf_counter()
+    for _ in range(args.rounds):
+        for role, url in READ_ENDPOINTS:
+            response = client.get(url, headers=headers[role])
+            assert response.status_code == 200, (url, response.get_data(as_text=True))
+            response.get_data()
+    elapsed = timer.perf_counter() - started
+
+    total = sum(counts.values())
+    offloaded = total - counts['primary']
+    print(f"{args.rounds} x {len(READ_ENDPOINTS)} read requests in {elapsed:.2f}s, {total} statements")
+    for key, count in sorted(counts.items()):
+        print(f"  {key:10s} {count:7d} ({count / total:.0%})")
+
+    # Read-your-writes: the admin who suspends a doctor sees it on the next
+    # listing, while the (never updated) replica still has the old status
+    response = client.put('/api/admin/doctors/1', json={'status': 'suspended'}, headers=headers['admin'])
+    assert response.status_code == 200, response.get_data(as_text=True)
+    after_write = doctor_status(client, headers['admin'], 1)
+    timer.sleep(args.sticky_seconds + 0.5)
+    after_sticky = doctor_status(client, headers['admin'], 1)
+
+    later = 'replica copy' if replicas else 'primary'
+    print(f"\nPUT doctor status -> listing right after: {after_write!r} (primary), "
+          f"after {args.sticky_seconds}s: {after_sticky!r} ({later})")
+    problems = []
+    if replicas and not offloaded:
+        problems.append('no reads reached a replica')
+    if after_write != 'suspended':
+        problems.append('write was not visible to the client that made it')
+    if replicas and after_sticky == 'suspended':
+        problems.append('reads stayed on the primary after the sticky window')
+    if problems:
+        print('FAILED: ' + '; '.join(problems))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
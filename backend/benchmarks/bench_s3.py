@@ -0,0 +1,80 @@
+import argparse
+import contextlib
+import os
+import time as timer
+import boto3
+from app.models.models import db
+from app.utils import s3
+from app.utils.file_handler import get_file_url, delete_files
+from benchmarks.app_factory import make_app
+
+BUCKET = 'benchmark-uploads'
+
+def s3_backend():
+    # Against a real stand-in when AWS_S3_ENDPOINT_URL is set, otherwise moto in-process
+    if os.getenv('AWS_S3_ENDPOINT_URL'):
+        return contextlib.nullcontext()
+    try:
+        from moto import mock_aws
+    except ImportError:
+        raise SystemExit('Install moto or set AWS_S3_ENDPOINT_URL to run this benchmark')
+    return mock_aws()
+
+def per_call_urls(app, keys):
+    # What get_file_url did before: a new client and a fresh signature per object
+    for key in keys:
+        client = boto3.client('s3', aws_access_key_id=app.config['AWS_ACCESS_KEY_ID'],
+                              aws_secret_access_key=app.config['AWS_SECRET_ACCESS_KEY'],
+                              region_name=app.config['AWS_REGION'],
+                              endpoint_url=app.config['AWS_S3_ENDPOINT_URL'])
+        client.generate_presigned_url('get_object', Params={'Bucket': BUCKET, 'Key': f'document/{key}'}, ExpiresIn=3600)
+
+def timed(fn, *args):
+    started = timer.perf_counter()
+    result = fn(*args)
+    return (timer.perf_counter() - started) * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description='S3 client reuse, presigned URL caching and batched deletes')
+    parser.add_argument('--objects', type=int, default=100, help='Files in one report listing')
+    parser.add_argument('--deletes', type=int, default=2000)
+    args = parser.parse_args()
+
+    with s3_backend():
+        app = make_app('sqlite://', AWS_ACCESS_KEY_ID=os.getenv('AWS_ACCESS_KEY_ID', 'benchmark'),
+                       AWS_SECRET_ACCESS_KEY=os.getenv('AWS_SECRET_ACCESS_KEY', 'benchmark'),
+                       AWS_REGION='us-east-1', AWS_BUCKET_NAME=BUCKET,
+                       AWS_S3_ENDPOINT_URL=os.getenv('AWS_S3_ENDPOINT_URL'))
+        with app.app_context():
+            # delete_files checks the upload columns for other references first
+            db.create_all()
+            client = s3.get_s3_client()
+            client.create_bucket(Bucket=BUCKET)
+            keys = [f'{i:02x}/report-{i}.pdf' for i in range(args.objects)]
+
+            before, _ = timed(per_call_urls, app, keys)
+            cold, _ = timed(lambda: [get_file_url(key, 'document') for key in keys])
+            warm, _ = timed(lambda: [get_file_url(key, 'document') for key in keys])
+            print(f"presigned URLs for a listing of {args.objects} files")
+            print(f"  client per call:        {before:9.1f} ms")
+            print(f"  shared client, signing: {cold:9.1f} ms")
+            print(f"  cached URLs:            {warm:9.1f} ms")
+
+            names = [f'{i:02x}/old-{i}.pdf' for i in range(args.deletes)]
+            for name in names:
+                client.put_object(Bucket=BUCKET, Key=f'document/{name}', Body=b'x')
+            half = args.deletes // 2
+
+            def one_by_one(batch):
+                for name in batch:
+                    client.delete_object(Bucket=BUCKET, Key=f'document/{name}')
+                return len(batch)
+
+            single, count = timed(one_by_one, names[:half])
+            batched, deleted = timed(delete_files, [(name, 'document') for name in names[half:]])
+            print(f"deleting {half} objects")
+            print(f"  delete_object each:     {single:9.1f} ms")
+            print(f"  delete_objects batches: {batched:9.1f} ms  ({deleted} deleted)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time as timer
+from sqlalchemy import or_, and_, update, bindparam
+from app.models.models import db, Doctor
+from app.utils import doctor_search
+from app.utils.doctor_search import SEARCH_COLUMNS, TrigramIndex, tokenize, search_doctors
+from benchmarks.app_factory import make_app
+from benchmarks.seed import seed_database
+
+FIRST_NAMES = ['James', 'Maria', 'Robert', 'Priya', 'Chen', 'Fatima', 'Carlos', 'Anna', 'David', 'Aisha',
+               'Michael', 'Sofia', 'Rahul', 'Elena', 'Omar', 'Grace', 'Lukas', 'Mei', 'Daniel', 'Zara']
+LAST_NAMES = ['Smith', 'Garcia', 'Patel', 'Nguyen', 'Kim', 'Müller', 'Rossi', 'Okafor', 'Cohen', 'Haddad',
+              'Johnson', 'Silva', 'Ivanova', 'Tanaka', 'Brown', 'Khan', 'Martin', 'Lopez', 'Andersen', 'Sharma']
+CLINIC_WORDS = ['General', 'City', 'Sunrise', 'Riverside', 'St. Mary', 'Lakeside', 'Central', 'Hope', 'Green Valley']
+CLINIC_KINDS = ['Hospital', 'Clinic', 'Medical Center', 'Health Care']
+# What an autocomplete box sends while someone types
+QUERIES = ['s', 'sm', 'smi', 'smit', 'p', 'pa', 'pat', 'car', 'cardio', 'derm', 'river', 'st mar',
+           'maria gar', 'chen ng', 'neuro lake', 'mull', 'ped hope', 'zz']
+
+def rename_doctors(engine, doctors, seed=7):
+    rng = random.Random(seed)
+    rows = [{
+        'id': i,
+        'first': rng.choice(FIRST_NAMES),
+        'last': rng.choice(LAST_NAMES),
+        'clinic': f'{rng.choice(CLINIC_WORDS)} {rng.choice(CLINIC_KINDS)} {i % 300}'
+    } for i in range(1, doctors + 1)]
+    statement = update(Doctor.__table__).where(Doctor.__table__.c.doctor_id == bindparam('id')).values(
+        first_name=bindparam('first'), last_name=bindparam('last'), clinic_hospital_name=bindparam('clinic')
+    )
+    with engine.begin() as connection:
+        connection.execute(statement, rows)
+
+def like_scan(query, limit):
+    # What a plain LIKE '%term%' search would do: every term against every column
+    terms = tokenize(query)
+    columns = [getattr(Doctor, column) for column in SEARCH_COLUMNS]
+    conditions = [or_(*[column.ilike(f'%{term}%') for column in columns]) for term in terms]
+    return db.session.query(Doctor.doctor_id).filter(and_(*conditions)).limit(limit).all()
+
+def measure(fn, queries, repeat):
+    samples = []
+    for query in queries:
+        for _ in range(repeat):
+            started = timer.perf_counter()
+            fn(query)
+            samples.append((timer.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Doctor search: LIKE scan vs FTS5 vs the in-process trigram index')
+    parser.add_argument('--doctors', type=int, default=50000)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), 'bench_search.sqlite')
+    if os.path.exists(path):
+        os.remove(path)
+    app = make_app(f'sqlite:///{path}')
+
+    with app.app_context():
+        db.create_all()
+        seed_database(db.engine, patients=0, doctors=args.doctors, appointments=0)
+        rename_doctors(db.engine, args.doctors)
+
+        started = timer.perf_counter()
+        backend = doctor_search.search_backend()
+        fts_build = timer.perf_counter() - started
+
+        index = TrigramIndex()
+        started = timer.perf_counter()
+        index.rebuild()
+        trigram_build = timer.perf_counter() - started
+
+        results = {
+            'LIKE scan': measure(lambda q: like_scan(q, args.limit), QUERIES, args.repeat),
+            backend: measure(lambda q: search_doctors(q, args.limit), QUERIES, args.repeat),
+            'trigram': measure(lambda q: index.search(tokenize(q), args.limit), QUERIES, args.repeat)
+        }
+
+        # Incremental update cost: one doctor renamed through the ORM
+        doctor_ids = random.Random(3).sample(range(1, args.doctors + 1), 200)
+        started = timer.perf_counter()
+        for doctor_id in doctor_ids:
+            db.session.get(Doctor, doctor_id).last_name = 'Renamed'
+            db.session.commit()
+        write = (timer.perf_counter() - started) / len(doctor_ids) * 1000
+        found = len(search_doctors('renamed', args.doctors))
+
+    print(f"{args.doctors} doctors, {len(QUERIES)} autocomplete queries x {args.repeat}")
+    print(f"index build: {backend} {fts_build * 1000:.0f} ms, trigram {trigram_build * 1000:.0f} ms")
+    for label, (median, p95) in results.items():
+        print(f"  {label:10s} median {median:8.3f} ms   p95 {p95:8.3f} ms")
+    print(f"ORM rename + commit with index sync: {write:.2f} ms/doctor, {found}/{len(doctor_ids)} found afterwards")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import time as timer
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import joinedload
+from app.models.models import db, Appointment, Doctor, Patient
+from app.utils import serializers
+from app.utils.serializers import FastJSONProvider, ADMIN_APPOINTMENT, DOCTOR
+from benchmarks.app_factory import make_app
+from benchmarks.seed import seed_database
+
+def appointment_dict(apt):
+    # The hand-written serializer the routes used before the schemas
+    return {
+        'id': apt.appointment_id,
+        'patient_name': f"{apt.patient.first_name} {apt.patient.last_name}",
+        'doctor_name': f"{apt.doctor.first_name} {apt.doctor.last_name}",
+        'date': apt.date.isoformat(),
+        'time': apt.time.strftime('%H:%M'),
+        'status': apt.status,
+        'mode': apt.mode,
+        'payment_status': apt.payment_status
+    }
+
+def doctor_dict(doc):
+    return {
+        'id': doc.doctor_id,
+        'first_name': doc.first_name,
+        'last_name': doc.last_name,
+        'email': doc.email,
+        'specialization': doc.specialization,
+        'contact_number': doc.contact_number,
+        'consultation_fees': doc.consultation_fees,
+        'status': doc.availability_status
+    }
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = timer.perf_counter()
+        fn()
+        timings.append(timer.perf_counter() - started)
+    return min(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Serializing large lists: hand-built dicts + jsonify vs compiled schemas')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = make_app('sqlite://')
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        seed_database(db.engine, patients=1000, doctors=args.rows, appointments=args.rows,
+                      reports_per_appointment=0, prescriptions_per_appointment=0, feedback_per_appointment=0)
+        appointments = Appointment.query.options(
+            joinedload(Appointment.patient).load_only(Patient.first_name, Patient.last_name),
+            joinedload(Appointment.doctor).load_only(Doctor.first_name, Doctor.last_name)
+        ).all()
+        doctors = Doctor.query.all()
+
+        stdlib = DefaultJSONProvider(app)
+        fast = FastJSONProvider(app)
+        orjson = serializers.orjson
+
+        for label, rows, by_hand, schema in (('appointments', appointments, appointment_dict, ADMIN_APPOINTMENT),
+                                             ('doctors', doctors, doctor_dict, DOCTOR)):
+            before = best_of(args.repeat, lambda: stdlib.response([by_hand(row) for row in rows]))
+            build = best_of(args.repeat, lambda: schema.dump_many(rows))
+            after = best_of(args.repeat, lambda: fast.response(schema.dump_many(rows)))
+            serializers.orjson = None
+            fallback = best_of(args.repeat, lambda: fast.response(schema.dump_many(rows)))
+            serializers.orjson = orjson
+
+            print(f"{len(rows)} {label}")
+            print(f"  dicts + jsonify (stdlib):   {before:8.1f} ms")
+            print(f"  schema, dicts only:         {build:8.1f} ms")
+            print(f"  schema + stdlib fallback:   {fallback:8.1f} ms  (x{before / fallback:.2f})")
+            if orjson is not None:
+                print(f"  schema + orjson:            {after:8.1f} ms  (x{before / after:.2f})")
+            else:
+                print("  orjson not installed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time as timer
+from collections import defaultdict
+from app import create_app
+from app.models.models import db
+from benchmarks.app_factory import auth_header
+from benchmarks.seed import seed_database
+
+# Optional subsystems that must stay out of a web worker's boot path; they
+# are imported on first use (S3 upload, queued task, /apidocs, flask db, ...)
+LAZY_MODULES = ['boto3', 'botocore.config', 'celery.app.base', 'flasgger', 'jsonschema',
+                'flask_migrate', 'alembic', 'PIL.Image', 'magic', 'stripe']
+
+CHILD = '''
+import importlib, json, sys, time
+started = time.perf_counter()
+module, _, attr = sys.argv[1].partition(':')
+factory = getattr(importlib.import_module(module), attr)
+imported = time.perf_counter()
+app = factory(sys.argv[2])
+created = time.perf_counter()
+response = app.test_client().get('/api/patients/profile', headers=json.loads(sys.argv[3]))
+assert response.status_code == 200, response.get_data(as_text=True)
+finished = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (finished - created) * 1000,
+    'loaded': [name for name in json.loads(sys.argv[4]) if name in sys.modules]
+}))
+'''
+
+def startup_app(database_url):
+    # The real factory with production settings; the Redis-backed cache and
+    # rate limiter use in-process storage so the run needs no services
+    return create_app('production', SQLALCHEMY_DATABASE_URI=database_url, CACHE_TYPE='SimpleCache',
+                      RATELIMIT_STORAGE_URI='memory://', METRICS_TOKEN='startup-benchmark',
+                      AWS_ACCESS_KEY_ID=None)
+
+def prepare(database_url):
+    app = startup_app(database_url)
+    with app.app_context():
+        db.create_all()
+        seed_database(db.engine, patients=10, doctors=10, appointments=0)
+    return auth_header(app, 1, 'patient')
+
+def run_child(args, headers):
+    started = timer.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD, args.factory, args.database_url,
+         json.dumps(headers), json.dumps(LAZY_MODULES)],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    wall = (timer.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise SystemExit(result.stderr[-4000:])
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_ms'] = wall
+    timings['packages'] = import_times(result.stderr)
+    return timings
+
+def import_times(stderr):
+    # Self time per top-level package from -X importtime ("self | cumulative | name")
+    packages = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(self_us)
+    return {name: us / 1000 for name, us in packages.items()}
+
+def summarize(runs):
+    keys = ('process_ms', 'import_ms', 'create_app_ms', 'first_request_ms')
+    summary = {key: statistics.median(run[key] for run in runs) for key in keys}
+    packages = defaultdict(list)
+    for run in runs:
+        for name, ms in run['packages'].items():
+            packages[name].append(ms)
+    summary['packages'] = {name: statistics.median(values) for name, values in packages.items()}
+    summary['loaded'] = sorted({name for run in runs for name in run['loaded']})
+    return summary
+
+def compare(summary, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"\ncompared with {baseline_path} (+/-{threshold:.0%} tolerance)")
+    for key in ('process_ms', 'import_ms', 'create_app_ms', 'first_request_ms'):
+        old, new = baseline[key], summary[key]
+        change = new / old - 1 if old else 0.0
+        flag = '  REGRESSION' if change > threshold else ''
+        if flag:
+            regressions.append(key)
+        print(f"  {key:18s} {old:9.1f} -> {new:9.1f} ms ({change:+.1%}){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start: imports, app creation and time to first request')
+    parser.add_argument('--factory', default='benchmarks.bench_startup:startup_app',
+                        help='module:callable taking a database URL and returning the Flask app')
+    parser.add_argument('--runs', type=int, default=7, help='Fresh interpreter processes to time')
+    parser.add_argument('--top', type=int, default=15, help='Packages listed by import self time')
+    parser.add_argument('--output', help='Write the summary as JSON to this file')
+    parser.add_argument('--compare', help='Earlier JSON summary to compare against')
+    parser.add_argument('--regression-threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), 'bench_startup.sqlite')
+    if os.path.exists(path):
+        os.remove(path)
+    args.database_url = f'sqlite:///{path}'
+    headers = prepare(args.database_url)
+
+    # The first run warms the OS file cache and writes .pyc files
+    run_child(args, headers)
+    summary = summarize([run_child(args, headers) for _ in range(args.runs)])
+
+    print(f"{args.factory}, median of {args.runs} fresh processes")
+    print(f"  interpreter + imports + app + first request: {summary['process_ms']:8.1f} ms")
+    print(f"  imports:                                     {summary['import_ms']:8.1f} ms")
+    print(f"  create app:                                  {summary['create_app_ms']:8.1f} ms")
+    print(f"  first request:                               {summary['first_request_ms']:8.1f} ms")
+    print(f"\n  import self time by package (top {args.top}):")
+    for name, ms in sorted(summary['packages'].items(), key=lambda item: -item[1])[:args.top]:
+        print(f"    {name:24s} {ms:8.1f} ms")
+
+    problems = []
+    if summary['loaded']:
+        problems.append('lazy modules imported at startup: ' + ', '.join(summary['loaded']))
+    if args.compare:
+        problems += compare(summary, args.compare, args.regression_threshold)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    if problems:
+        print('\nFAILED: ' + '; '.join(problems))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,460 @@
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time as timer
+from collections import Counter
+from datetime import date, datetime, timedelta
+from app.models.models import db
+from app import api_blueprints
+from app.utils import passwords
+from benchmarks.app_factory import make_app, auth_header
+from benchmarks.seed import seed_database, SPECIALIZATIONS
+
+PASSWORD = 'correct horse battery staple'
+# Operations with fewer samples than this are listed but never flagged as regressions
+MIN_COMPARE_SAMPLES = 30
+
+# Every blueprint create_app registers
+BLUEPRINTS = list(api_blueprints())
+
+# Relative weights of the operations below in each traffic mix
+MIXES = {
+    'login': {
+        'login': 70, 'refresh': 10, 'patient_profile': 10, 'patient_appointments': 10
+    },
+    'dashboard': {
+        'patient_profile': 20, 'patient_appointments': 20, 'patient_reports': 10, 'patient_prescriptions': 10,
+        'patient_doctors': 10, 'doctor_search': 5, 'availability': 10, 'doctor_schedule': 5, 'book': 5, 'cancel': 3,
+        'feedback': 2, 'upload': 2, 'login': 3
+    },
+    'admin': {
+        'admin_statistics': 25, 'admin_report': 25, 'admin_report_csv': 5, 'admin_appointments': 20,
+        'admin_doctors': 10, 'admin_patients': 10, 'admin_feedback': 5
+    }
+}
+MIXES['all'] = {name: weight for mix in MIXES.values() for name, weight in mix.items()}
+
+class Context:
+    # What one simulated client knows: the seeded id ranges, its tokens and
+    # the appointments it booked (so cancel has something to cancel)
+    def __init__(self, args, tokens, rng):
+        self.args = args
+        self.tokens = tokens
+        self.rng = rng
+        self.booked = []
+
+    def patient(self):
+        patient_id = self.rng.randint(1, self.args.patients)
+        return patient_id, self.tokens[('patient', patient_id)]
+
+    def doctor(self):
+        doctor_id = self.rng.randint(1, self.args.doctors)
+        return doctor_id, self.tokens[('doctor', doctor_id)]
+
+    def admin(self):
+        return self.tokens[('admin', 1)]
+
+    def day(self, days=365):
+        return (date.today() + timedelta(days=self.rng.randint(1, days))).isoformat()
+
+    def weekday(self, days=365):
+        # Bookings must fall in the seeded opening hours, which are Monday to Friday
+        day = date.today() + timedelta(days=self.rng.randint(1, days))
+        if day.weekday() >= 5:
+            day += timedelta(days=7 - day.weekday())
+        return day.isoformat()
+
+def _report_range(ctx):
+    start = date(2022, 1, 1) + timedelta(days=ctx.rng.randint(0, 900))
+    return start.isoformat(), (start + timedelta(days=90)).isoformat()
+
+def op_login(ctx):
+    role = 'doctor' if ctx.rng.random() < 0.2 else 'patient'
+    user_id = ctx.rng.randint(1, ctx.args.doctors if role == 'doctor' else ctx.args.patients)
+    return 'POST', '/api/auth/login', {'email': f'{role}{user_id}@example.com', 'password': PASSWORD}, None
+
+def op_refresh(ctx):
+    patient_id = ctx.rng.randint(1, ctx.args.patients)
+    return 'POST', '/api/auth/refresh', None, ctx.tokens[('refresh', patient_id)]
+
+def op_book(ctx):
+    patient_id, headers = ctx.patient()
+    slot = ctx.rng.randint(0, 15)
+    return 'POST', '/api/appointments', {
+        'doctor_id': ctx.rng.randint(1, ctx.args.doctors),
+        'date': ctx.weekday(60),
+        'time': f'{8 + slot // 2:02d}:{30 * (slot % 2):02d}',
+        'mode': 'online'
+    }, headers
+
+def op_cancel(ctx):
+    if not ctx.booked:
+        return op_book(ctx)
+    appointment_id, headers = ctx.booked.pop()
+    return 'POST', f'/api/appointments/{appointment_id}/cancel', {}, headers
+
+def op_feedback(ctx):
+    _, headers = ctx.patient()
+    return 'POST', '/api/patients/feedback', {
+        'doctor_id': ctx.rng.randint(1, ctx.args.doctors), 'rating': ctx.rng.randint(1, 5), 'comment': 'Load test'
+    }, headers
+
+def op_upload(ctx):
+    _, headers = ctx.patient()
+    body = os.urandom(ctx.rng.choice((4096, 65536)))
+    return 'POST', '/api/uploads/stream?file_type=document&filename=scan.pdf', body, headers
+
+def op_admin_report(ctx):
+    start, end = _report_range(ctx)
+    report_type = ctx.rng.choice(('revenue', 'appointments', 'doctors', 'patients'))
+    return 'GET', f'/api/admin/reports?report_type={report_type}&start_date={start}&end_date={end}', None, ctx.admin()
+
+def op_admin_report_csv(ctx):
+    start, end = _report_range(ctx)
+    return 'GET', f'/api/admin/reports?report_type=appointments&format=csv&start_date={start}&end_date={end}', \
+        None, ctx.admin()
+
+OPERATIONS = {
+    'login': op_login,
+    'refresh': op_refresh,
+    'patient_profile': lambda ctx: ('GET', '/api/patients/profile', None, ctx.patient()[1]),
+    'patient_appointments': lambda ctx: ('GET', '/api/patients/appointments', None, ctx.patient()[1]),
+    'patient_reports': lambda ctx: ('GET', '/api/patients/medical-reports', None, ctx.patient()[1]),
+    'patient_prescriptions': lambda ctx: ('GET', '/api/patients/prescriptions', None, ctx.patient()[1]),
+    'patient_doctors': lambda ctx: (
+        'GET', f'/api/patients/doctors?specialization={ctx.rng.choice(SPECIALIZATIONS)}', None, ctx.patient()[1]
+    ),
+    'doctor_search': lambda ctx: (
+        'GET', f'/api/patients/doctors/search?q={ctx.rng.choice(SPECIALIZATIONS)[:ctx.rng.randint(2, 5)]}',
+        None, ctx.patient()[1]
+    ),
+    'availability': lambda ctx: (
+        'GET', f'/api/doctors/availability?specialization={ctx.rng.choice(SPECIALIZATIONS)}&start_date={ctx.day(30)}',
+        None, ctx.patient()[1]
+    ),
+    'doctor_schedule': lambda ctx: ('GET', '/api/doctors/schedule', None, ctx.doctor()[1]),
+    'book': op_book,
+    'cancel': op_cancel,
+    'feedback': op_feedback,
+    'upload': op_upload,
+    'admin_statistics': lambda ctx: ('GET', '/api/admin/statistics', None, ctx.admin()),
+    'admin_report': op_admin_report,
+    'admin_report_csv': op_admin_report_csv,
+    'admin_appointments': lambda ctx: (
+        'GET', f'/api/admin/appointments?date={_report_range(ctx)[0]}', None, ctx.admin()
+    ),
+    'admin_doctors': lambda ctx: ('GET', '/api/admin/doctors', None, ctx.admin()),
+    'admin_patients': lambda ctx: ('GET', '/api/admin/patients', None, ctx.admin()),
+    'admin_feedback': lambda ctx: ('GET', '/api/admin/feedback', None, ctx.admin())
+}
+
+def app_settings(args):
+    return {
+        'PASSWORD_PBKDF2_ITERATIONS': args.password_iterations,
+        'PASSWORD_HASH_WORKERS': 0,
+        'UPLOAD_FOLDER': args.upload_folder,
+        'AWS_ACCESS_KEY_ID': None
+    }
+
+def wsgi_app():
+    # Entry point for the gunicorn target: gunicorn 'benchmarks.load:wsgi_app()'
+    args = argparse.Namespace(**json.loads(os.environ['LOAD_TEST_SETTINGS']))
+    return make_app(args.database_url, BLUEPRINTS, **app_settings(args))
+
+def seed(args):
+    app = make_app(args.database_url, **app_settings(args))
+    with app.app_context():
+        db.create_all()
+        started = timer.perf_counter()
+        # One shared hash keeps seeding fast; every login still pays a full verify
+        seed_database(db.engine, patients=args.patients, doctors=args.doctors, appointments=args.appointments,
+                      password_hash=passwords.hash_password(PASSWORD), admins=1, schedule_days=5, seed=args.seed)
+        return timer.perf_counter() - started
+
+def make_tokens(app, args):
+    tokens = {('admin', 1): auth_header(app, 1, 'admin')}
+    for patient_id in range(1, args.patients + 1):
+        tokens[('patient', patient_id)] = auth_header(app, patient_id, 'patient')
+    for doctor_id in range(1, args.doctors + 1):
+        tokens[('doctor', doctor_id)] = auth_header(app, doctor_id, 'doctor')
+
+    from flask_jwt_extended import create_refresh_token
+    with app.app_context():
+        for patient_id in range(1, args.patients + 1):
+            tokens[('refresh', patient_id)] = {
+                'Authorization': f'Bearer {create_refresh_token(identity=str(patient_id))}'
+            }
+    return tokens
+
+class TestClientTarget:
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        client = self.app.test_client()
+
+        def send(method, path, body, headers):
+            if isinstance(body, bytes):
+                response = client.open(path, method=method, data=body, headers=headers,
+                                       content_type='application/octet-stream')
+            else:
+                response = client.open(path, method=method, json=body, headers=headers)
+            payload = response.get_data()
+            return response.status_code, payload, response.is_json and response.get_json()
+        return send
+
+    def close(self):
+        pass
+
+class GunicornTarget:
+    def __init__(self, args):
+        import requests
+        self.requests = requests
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        self.base_url = f'http://127.0.0.1:{port}'
+        env = dict(os.environ, LOAD_TEST_SETTINGS=json.dumps({
+            'database_url': args.database_url,
+            'password_iterations': args.password_iterations,
+            'upload_folder': args.upload_folder
+        }))
+        self.process = subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(args.gunicorn_workers), '--threads', str(args.gunicorn_threads),
+            '--log-level', 'warning', 'benchmarks.load:wsgi_app()'
+        ], env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+        deadline = timer.monotonic() + 60
+        while True:
+            try:
+                requests.get(f'{self.base_url}/', timeout=5)
+                break
+            except requests.RequestException:
+                if self.process.poll() is not None or timer.monotonic() > deadline:
+                    self.close()
+                    raise SystemExit('gunicorn did not start')
+                timer.sleep(0.2)
+
+    def session(self):
+        http = self.requests.Session()
+
+        def send(method, path, body, headers):
+            if isinstance(body, bytes):
+                headers = {**headers, 'Content-Type': 'application/octet-stream'}
+                response = http.request(method, self.base_url + path, data=body, headers=headers)
+            else:
+                response = http.request(method, self.base_url + path, json=body, headers=headers)
+            is_json = response.headers.get('Content-Type', '').startswith('application/json')
+            return response.status_code, response.content, is_json and response.json()
+        return send
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait(timeout=30)
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(latencies, statuses, elapsed=None):
+    ordered = sorted(latencies)
+    summary = {
+        'requests': len(ordered),
+        'errors': sum(count for status, count in statuses.items() if status >= 500),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'mean_ms': sum(ordered) / len(ordered) * 1000 if ordered else None,
+        'p50_ms': percentile(ordered, 0.50) * 1000 if ordered else None,
+        'p95_ms': percentile(ordered, 0.95) * 1000 if ordered else None,
+        'p99_ms': percentile(ordered, 0.99) * 1000 if ordered else None,
+        'max_ms': ordered[-1] * 1000 if ordered else None
+    }
+    if elapsed:
+        summary['throughput_rps'] = len(ordered) / elapsed
+    return summary
+
+def drive(target, tokens, args, mix, duration=None, requests=None):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {name: ([], Counter()) for name in names}
+    failures = []
+    lock = threading.Lock()
+
+    def worker(seed):
+        try:
+            run_client(seed)
+        except Exception as e:
+            failures.append(e)
+
+    def run_client(seed):
+        ctx = Context(args, tokens, random.Random(seed))
+        send = target.session()
+        local = {name: ([], Counter()) for name in names}
+        deadline = timer.perf_counter() + duration if duration else None
+        count = 0
+        while (deadline is None or timer.perf_counter() < deadline) and (requests is None or count < requests):
+            name = ctx.rng.choices(names, weights)[0]
+            method, path, body, headers = OPERATIONS[name](ctx)
+            started = timer.perf_counter()
+            status, _, payload = send(method, path, body, headers)
+            local[name][0].append(timer.perf_counter() - started)
+            local[name][1][status] += 1
+            if name in ('book', 'cancel') and status == 201 and isinstance(payload, dict):
+                ctx.booked.append((payload['id'], headers))
+            count += 1
+        with lock:
+            for name, (latencies, statuses) in local.items():
+                results[name][0].extend(latencies)
+                results[name][1].update(statuses)
+
+    threads = [threading.Thread(target=worker, args=(args.seed * 1000 + n,)) for n in range(args.threads)]
+    started = timer.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if failures:
+        raise failures[0]
+    return results, timer.perf_counter() - started
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_mix(target, tokens, args, mix_name):
+    mix = MIXES[mix_name]
+    per_thread = args.requests // args.threads if args.requests else None
+    if args.warmup:
+        drive(target, tokens, args, mix, requests=args.warmup)
+    results, elapsed = drive(target, tokens, args, mix, duration=args.duration if not per_thread else None,
+                             requests=per_thread)
+
+    latencies = [value for values, _ in results.values() for value in values]
+    statuses = sum((statuses for _, statuses in results.values()), Counter())
+    return {
+        'elapsed_s': elapsed,
+        'overall': summarize(latencies, statuses, elapsed),
+        'endpoints': {name: summarize(values, counts) for name, (values, counts) in sorted(results.items()) if values}
+    }
+
+def print_mix(name, result):
+    overall = result['overall']
+    print(f"\n{name}: {overall['requests']} requests in {result['elapsed_s']:.1f} s, "
+          f"{overall['throughput_rps']:.1f} req/s, {overall['errors']} errors")
+    print(f"  {'operation':24s} {'count':>7s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}  statuses")
+    for operation, stats in [('(all)', overall)] + list(result['endpoints'].items()):
+        print(f"  {operation:24s} {stats['requests']:7d} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} "
+              f"{stats['p99_ms']:9.2f}  {' '.join(f'{k}:{v}' for k, v in stats['statuses'].items())}")
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"\ncompared with {baseline['meta'].get('commit') or baseline_path} (p95, +/-{threshold:.0%} tolerance)")
+    for key in ('target', 'database', 'threads', 'dataset', 'password_iterations'):
+        if baseline['meta'].get(key) != results['meta'].get(key):
+            print(f"  warning: {key} differs ({baseline['meta'].get(key)} vs {results['meta'].get(key)})")
+    for mix_name, result in results['mixes'].items():
+        old_mix = baseline['mixes'].get(mix_name)
+        if old_mix is None:
+            continue
+        rows = [('(all)', result['overall'], old_mix['overall'])] + [
+            (name, stats, old_mix['endpoints'][name])
+            for name, stats in result['endpoints'].items() if name in old_mix['endpoints']
+        ]
+        for name, new, old in rows:
+            change = new['p95_ms'] / old['p95_ms'] - 1 if old['p95_ms'] else 0.0
+            flag = ''
+            if change > threshold and min(new['requests'], old['requests']) >= MIN_COMPARE_SAMPLES:
+                flag = '  REGRESSION'
+                regressions.append(f'{mix_name}/{name}')
+            print(f"  {mix_name + '/' + name:36s} {old['p95_ms']:9.2f} -> {new['p95_ms']:9.2f} ms ({change:+.1%}){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed a synthetic dataset and drive the API with weighted traffic mixes')
+    parser.add_argument('--database-url', help='Defaults to a fresh SQLite file (seeded on every run)')
+    parser.add_argument('--no-seed', action='store_true', help='Reuse an already seeded --database-url')
+    parser.add_argument('--patients', type=int, default=5000)
+    parser.add_argument('--doctors', type=int, default=200)
+    parser.add_argument('--appointments', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--password-iterations', type=int, default=1000,
+                        help='PBKDF2 cost of the seeded passwords; production uses 600000')
+    parser.add_argument('--mix', choices=sorted(MIXES), nargs='+', default=['login', 'dashboard', 'admin'])
+    parser.add_argument('--threads', type=int, default=4, help='Concurrent simulated clients')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per mix (0 to run for --duration)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds per mix when --requests is 0')
+    parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per thread before each mix')
+    parser.add_argument('--target', choices=['testclient', 'gunicorn'], default='testclient')
+    parser.add_argument('--gunicorn-workers', type=int, default=2)
+    parser.add_argument('--gunicorn-threads', type=int, default=4)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Earlier JSON results to compare p95 latencies against')
+    parser.add_argument('--regression-threshold', type=float, default=0.15)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='load-test-')
+    args.upload_folder = os.path.join(workdir, 'uploads')
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{os.path.join(workdir, 'load.sqlite')}"
+        args.no_seed = False
+    if args.target == 'gunicorn' and args.database_url.startswith('sqlite://') and ':memory:' in args.database_url:
+        raise SystemExit('gunicorn workers need a file or server database')
+
+    seed_seconds = None if args.no_seed else seed(args)
+    if seed_seconds is not None:
+        print(f"seeded {args.patients} patients, {args.doctors} doctors, {args.appointments} appointments "
+              f"in {seed_seconds:.1f} s")
+
+    app = make_app(args.database_url, BLUEPRINTS, **app_settings(args))
+    tokens = make_tokens(app, args)
+    target = GunicornTarget(args) if args.target == 'gunicorn' else TestClientTarget(app)
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': args.database_url.split('://')[0],
+            'target': args.target,
+            'threads': args.threads,
+            'dataset': {'patients': args.patients, 'doctors': args.doctors, 'appointments': args.appointments},
+            'password_iterations': args.password_iterations
+        },
+        'mixes': {}
+    }
+    if args.target == 'gunicorn':
+        results['meta']['gunicorn'] = {'workers': args.gunicorn_workers, 'threads': args.gunicorn_threads}
+
+    try:
+        for mix_name in args.mix:
+            results['mixes'][mix_name] = run_mix(target, tokens, args, mix_name)
+            print_mix(mix_name, results['mixes'][mix_name])
+    finally:
+        target.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nresults written to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.regression_threshold):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
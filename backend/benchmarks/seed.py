@@ -0,0 +1,150 @@
+import random
+from datetime import date, time, timedelta
+from decimal import Decimal
+from sqlalchemy import insert, select, literal
+from app.models.models import (
+    Patient, Doctor, Admin, Appointment, MedicalReport, Prescription, Feedback, DoctorSchedule, Credential
+)
+from app.utils.daily_stats import rebuild_daily_stats
+
+SPECIALIZATIONS = [
+    'Cardiology', 'Dermatology', 'Neurology', 'Orthopedics', 'Pediatrics',
+    'Psychiatry', 'Oncology', 'Radiology', 'General Medicine', 'ENT'
+]
+STATUSES = ['Scheduled', 'completed', 'cancelled']
+PAYMENT_STATUSES = ['Pending', 'paid']
+PLACEHOLDER_HASH = '!'
+
+def _insert_batches(connection, model, rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            connection.execute(insert(model), batch)
+            batch = []
+    if batch:
+        connection.execute(insert(model), batch)
+
+def seed_database(engine, patients=10000, doctors=500, appointments=100000,
+                  reports_per_appointment=0.3, prescriptions_per_appointment=0.5,
+                  feedback_per_appointment=0.2, start_date=date(2022, 1, 1), days=3 * 365,
+                  password_hash=PLACEHOLDER_HASH, batch_size=20000, seed=42, admins=0, schedule_days=0):
+    rng = random.Random(seed)
+
+    def doctor_rows():
+        for i in range(1, doctors + 1):
+            yield {
+                'doctor_id': i,
+                'first_name': f'Doc{i}',
+                'last_name': f'Smith{i % 97}',
+                'specialization': SPECIALIZATIONS[i % len(SPECIALIZATIONS)],
+                'experience_years': i % 40,
+                'contact_number': f'555{i:07d}',
+                'email': f'doctor{i}@example.com',
+                'consultation_fees': Decimal(50 + (i % 20) * 10),
+                'clinic_hospital_name': f'Clinic {i % 50}',
+                'username': f'doctor{i}@example.com',
+                'password_hash': password_hash
+            }
+
+    def patient_rows():
+        for i in range(1, patients + 1):
+            yield {
+                'patient_id': i,
+                'first_name': f'Pat{i}',
+                'last_name': f'Jones{i % 89}',
+                'date_of_birth': date(1950, 1, 1) + timedelta(days=i % 20000),
+                'gender': 'F' if i % 2 else 'M',
+                'contact_number': f'444{i:07d}',
+                'email': f'patient{i}@example.com',
+                'username': f'patient{i}@example.com',
+                'password_hash': password_hash
+            }
+
+    # (doctor_id, date, time) is kept unique so the data also satisfies slot constraints
+    slots_per_day = 16
+    doctor_of = lambda i: (i - 1) % doctors + 1
+    patient_of = lambda i: (i * 7919) % patients + 1
+    day_of = lambda i: start_date + timedelta(days=(((i - 1) // doctors) // slots_per_day) % days)
+
+    def appointment_rows():
+        for i in range(1, appointments + 1):
+            slot_of_day = ((i - 1) // doctors) % slots_per_day
+            status = rng.choice(STATUSES)
+            yield {
+                'appointment_id': i,
+                'patient_id': patient_of(i),
+                'doctor_id': doctor_of(i),
+                'date': day_of(i),
+                'time': time(8 + slot_of_day // 2, 30 * (slot_of_day % 2)),
+                'status': status,
+                'slot_active': None if status == 'cancelled' else True,
+                'mode': rng.choice(('online', 'in-person')),
+                'payment_status': rng.choice(PAYMENT_STATUSES)
+            }
+
+    def linked_rows(fraction):
+        for i in range(1, appointments + 1):
+            if rng.random() < fraction:
+                yield i
+
+    with engine.begin() as connection:
+        _insert_batches(connection, Doctor, doctor_rows(), batch_size)
+        _insert_batches(connection, Patient, patient_rows(), batch_size)
+        _insert_batches(connection, Appointment, appointment_rows(), batch_size)
+
+        _insert_batches(connection, MedicalReport, ({
+            'appointment_id': i,
+            'doctor_id': doctor_of(i),
+            'patient_id': patient_of(i),
+            'diagnosis': 'Routine check',
+            'symptoms': 'None reported',
+            'date': day_of(i)
+        } for i in linked_rows(reports_per_appointment)), batch_size)
+
+        _insert_batches(connection, Prescription, ({
+            'appointment_id': i,
+            'doctor_id': doctor_of(i),
+            'patient_id': patient_of(i),
+            'medicine_name': 'Paracetamol',
+            'dosage': '500mg',
+            'frequency': 'Twice daily',
+            'date_issued': day_of(i)
+        } for i in linked_rows(prescriptions_per_appointment)), batch_size)
+
+        _insert_batches(connection, Feedback, ({
+            'doctor_id': doctor_of(i),
+            'patient_id': patient_of(i),
+            'rating': rng.randint(1, 5),
+            'comments': 'Good visit',
+            'date': day_of(i)
+        } for i in linked_rows(feedback_per_appointment)), batch_size)
+
+        _insert_batches(connection, Admin, ({
+            'admin_id': i,
+            'name': f'Admin{i}',
+            'contact': f'333{i:07d}',
+            'email': f'admin{i}@example.com',
+            'username': f'admin{i}@example.com',
+            'password_hash': password_hash
+        } for i in range(1, admins + 1)), batch_size)
+
+        # Weekly opening hours (08:00-16:00, 30 minute slots) on the first schedule_days weekdays
+        _insert_batches(connection, DoctorSchedule, ({
+            'doctor_id': doctor_id,
+            'weekday': weekday,
+            'start_time': time(8, 0),
+            'end_time': time(16, 0),
+            'slot_minutes': 30
+        } for doctor_id in range(1, doctors + 1) for weekday in range(schedule_days)), batch_size)
+
+        # Core inserts bypass the session listeners that keep the credential table in step
+        for model, role, id_column in ((Patient, 'patient', Patient.patient_id),
+                                       (Doctor, 'doctor', Doctor.doctor_id),
+                                       (Admin, 'admin', Admin.admin_id)):
+            connection.execute(insert(Credential).from_select(
+                ['email', 'role', 'user_id'],
+                select(model.email, literal(role), id_column)
+            ))
+
+        rebuild_daily_stats(connection)
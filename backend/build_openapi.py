@@ -0,0 +1,39 @@
+import argparse
+import sys
+from app import create_app
+from app.utils.openapi import build_spec, write_spec
+
+def create_spec_app():
+    # The production app with flasgger on; nothing here connects to the
+    # database, Redis or Celery, and /metrics is not part of the spec
+    return create_app('production', SWAGGER_ENABLED=True, METRICS_ENABLED=False)
+
+def build_openapi(output=None, check=False):
+    app = create_spec_app()
+    path = output or app.config['OPENAPI_SPEC_PATH']
+    
+    if check:
+        # For CI: fail when the routes' specs changed but the file was not rebuilt
+        try:
+            with open(path, 'rb') as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if current != build_spec(app):
+            print(f"{path} is out of date; run build_openapi.py")
+            return False
+        print(f"{path} is up to date")
+        return True
+        
+    body = write_spec(app, path)
+    print(f"Wrote OpenAPI spec to {path} ({len(body)} bytes)")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compile the OpenAPI spec served at /api/openapi.json')
+    parser.add_argument('--output', help='Defaults to OPENAPI_SPEC_PATH')
+    parser.add_argument('--check', action='store_true', help='Only verify that the file matches the routes')
+    args = parser.parse_args()
+    
+    if not build_openapi(args.output, args.check):
+        sys.exit(1)
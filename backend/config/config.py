@@ -13,6 +13,19 @@ class Config:
     # Database settings
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'mysql+pymysql://root:@localhost/healthcare_db')
+    # Connection pool per worker process, shared by the primary and each replica
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    }
+    # Comma-separated read replica URLs. Views marked @read_only send their
+    # SELECTs to a random replica; a client that commits a write reads from the
+    # primary for REPLICA_STICKY_SECONDS so it sees its own changes
+    SQLALCHEMY_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
 
     # JWT settings
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-here')
@@ -27,12 +40,71 @@ class Config:
         'document': {'pdf', 'doc', 'docx'},
         'video': {'mp4', 'avi', 'mov'}
     }
+    # Uploads are streamed in chunks and stored by SHA-256; files above
+    # MAX_CONTENT_LENGTH go through the resumable /api/uploads sessions
+    UPLOAD_CHUNK_SIZE = 1024 * 1024
+    UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024
+    UPLOAD_SESSION_TTL = 86400
+    # Celery beat (uploads.reap) removes staged parts of sessions abandoned past their TTL
+    UPLOAD_REAP_INTERVAL = 3600
+    # Every resumable upload part but the last must be at least this big (the S3 minimum)
+    UPLOAD_MIN_PART_SIZE = 5 * 1024 * 1024
+    # Downloads: USE_X_SENDFILE hands files to Apache/lighttpd; set an nginx
+    # internal location (aliased to UPLOAD_FOLDER) to use X-Accel-Redirect instead
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+    X_ACCEL_REDIRECT_PREFIX = os.getenv('X_ACCEL_REDIRECT_PREFIX')
+
+    # Per-row error reports written by the bulk import endpoint
+    IMPORT_REPORT_FOLDER = os.path.join(UPLOAD_FOLDER, 'import_reports')
+
+    # Files produced by async report exports and how long their job status is
+    # kept; format=parquet needs pyarrow (requirements-parquet.txt)
+    REPORT_EXPORT_FOLDER = os.path.join(UPLOAD_FOLDER, 'report_exports')
+    REPORT_EXPORT_TTL = 86400
 
     # Cache settings
     CACHE_TYPE = "redis"
     CACHE_REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     CACHE_DEFAULT_TIMEOUT = 300
 
+    # Password hashing: 'pbkdf2' or 'bcrypt'; stored hashes are upgraded on login
+    # when these change. Workers > 0 moves hashing into a process pool.
+    PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+    PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 600000))
+    PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_SIZE = 64
+
+    # Login lookups: per-worker Bloom filter of known emails plus a short-lived
+    # shared cache of emails that were not found
+    LOGIN_BLOOM_FILTER = True
+    LOGIN_BLOOM_TTL = 600
+    LOGIN_NEGATIVE_CACHE_TTL = 60
+
+    # Authenticated principal cache: per-worker LRU, optionally backed by the shared cache
+    PRINCIPAL_CACHE_TTL = int(os.getenv('PRINCIPAL_CACHE_TTL', 30))
+    PRINCIPAL_CACHE_SIZE = 10000
+    PRINCIPAL_CACHE_SHARED = os.getenv('PRINCIPAL_CACHE_SHARED', 'false').lower() == 'true'
+
+    # Seconds before a worker's in-memory free-slot index is rebuilt from the database
+    SLOT_INDEX_TTL = 300
+
+    # Doctor search: 'auto' uses SQLite FTS5 or a MySQL FULLTEXT index when
+    # available and otherwise a per-worker trigram index, rebuilt after
+    # DOCTOR_SEARCH_INDEX_TTL seconds; 'trigram' forces the in-process index
+    DOCTOR_SEARCH_BACKEND = os.getenv('DOCTOR_SEARCH_BACKEND', 'auto')
+    DOCTOR_SEARCH_INDEX_TTL = 3600
+
+    # Per-request timings exposed on /metrics (Prometheus text format, one set
+    # per worker process) and as Server-Timing headers; statements slower than
+    # METRICS_SLOW_QUERY_SECONDS go to the app.slow_queries logger. With
+    # METRICS_TOKEN set, /metrics wants it as a Bearer token
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'true').lower() == 'true'
+    METRICS_SLOW_QUERY_SECONDS = float(os.getenv('METRICS_SLOW_QUERY_SECONDS', 0.5))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    METRICS_REQUIRE_TOKEN = False
+
     # Rate limiting
     RATELIMIT_DEFAULT = "100/hour"
     RATELIMIT_STORAGE_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/1')
@@ -40,17 +112,48 @@ class Config:
     # Celery settings
     CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/2')
     CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/2')
+    CELERY_TASK_ALWAYS_EAGER = False
+
+    # Appointment reminders, sent this many minutes before the start. The
+    # scheduler runs as Celery beat (reminders.dispatch) or reminder_worker.py
+    REMINDER_OFFSETS_MINUTES = [1440, 60]
+    REMINDER_SENDER = os.getenv('REMINDER_SENDER', 'app.utils.reminders:LogSender')
+    REMINDER_POLL_INTERVAL = 30
+    REMINDER_HORIZON_SECONDS = 600
+    REMINDER_CONCURRENCY = 50
+    REMINDER_BATCH_SIZE = 500
+    REMINDER_MAX_ATTEMPTS = 3
+    REMINDER_RETRY_DELAY = 60
+
+    # Thumbnails/previews of uploads; video posters and previews need ffmpeg
+    MEDIA_FFMPEG_BINARY = os.getenv('MEDIA_FFMPEG_BINARY', 'ffmpeg')
+    MEDIA_FFMPEG_TIMEOUT = 600
 
     # AWS S3 settings (optional)
     AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
     AWS_BUCKET_NAME = os.getenv('AWS_BUCKET_NAME')
     AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
+    # For S3-compatible stand-ins such as MinIO or a moto server
+    AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL')
+    # One shared client per worker process; presigned URLs are reused until
+    # S3_PRESIGNED_URL_REFRESH_MARGIN seconds before they expire
+    S3_MAX_POOL_CONNECTIONS = 50
+    S3_PRESIGNED_URL_EXPIRES = 3600
+    S3_PRESIGNED_URL_REFRESH_MARGIN = 300
+    S3_PRESIGNED_URL_CACHE_SIZE = 10000
 
     # Payment settings (optional)
     STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
     STRIPE_PUBLISHABLE_KEY = os.getenv('STRIPE_PUBLISHABLE_KEY')
 
+    # /apidocs and /apispec_1.json, assembled by flasgger at runtime; flasgger
+    # is not imported when disabled. build_openapi.py compiles the same spec to
+    # OPENAPI_SPEC_PATH, which /api/openapi.json serves with an ETag either way
+    SWAGGER_ENABLED = os.getenv('SWAGGER_ENABLED', 'true').lower() == 'true'
+    OPENAPI_SPEC_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app', 'openapi.json')
+    OPENAPI_SPEC_MAX_AGE = 3600
+
     # CORS settings
     CORS_HEADERS = 'Content-Type'
 
@@ -61,10 +164,26 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # In-memory SQLite uses a single static connection, which takes no pool settings
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLALCHEMY_REPLICA_URLS = []
+    QUERY_BUDGET_ENFORCED = True
+    CACHE_TYPE = 'SimpleCache'
+    PASSWORD_HASH_WORKERS = 0
+    PASSWORD_PBKDF2_ITERATIONS = 1000
+    CELERY_TASK_ALWAYS_EAGER = True
+    SWAGGER_ENABLED = False
+    RATELIMIT_ENABLED = False
+    # Files stay on local disk even when .env carries AWS credentials
+    AWS_ACCESS_KEY_ID = None
 
 class ProductionConfig(Config):
     # Production specific settings
-    pass
+    SWAGGER_ENABLED = os.getenv('SWAGGER_ENABLED', 'false').lower() == 'true'
+    # Timings and query counts are for operators, not every client; the app
+    # refuses to start with metrics on and no METRICS_TOKEN
+    METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'false').lower() == 'true'
+    METRICS_REQUIRE_TOKEN = True
 
 config = {
     'development': DevelopmentConfig,
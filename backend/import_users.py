@@ -0,0 +1,42 @@
+import argparse
+import os
+import sys
+import time
+from app import create_app
+from app.utils.bulk_import import BulkImporter, iter_records, IMPORT_MODELS, IMPORT_FORMATS, DEFAULT_CHUNK_SIZE
+from app.utils.passwords import get_hash_pool
+
+def import_users(role, path, fmt, report_path, chunk_size, workers=None, **settings):
+    if workers is not None:
+        settings['PASSWORD_HASH_WORKERS'] = workers
+    app = create_app(os.getenv('FLASK_ENV', 'development'), **settings)
+
+    with app.app_context():
+        started = time.perf_counter()
+        with open(path, 'rb') as source, open(report_path, 'w', newline='') as report:
+            result = BulkImporter(role, report, chunk_size).run(iter_records(source, fmt))
+        elapsed = time.perf_counter() - started
+
+        pool = get_hash_pool()
+        if pool is not None:
+            pool.shutdown()
+
+    rate = result['imported'] / elapsed if elapsed else 0
+    print(f"Imported {result['imported']} {role}s in {elapsed:.2f}s ({rate:.0f}/s), {result['failed']} rejected")
+    if result['failed']:
+        print(f"Rejected rows written to {report_path}")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Bulk import patients or doctors from CSV or NDJSON')
+    parser.add_argument('role', choices=list(IMPORT_MODELS))
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help='Defaults to the file extension')
+    parser.add_argument('--report', help='Where to write rejected rows (default: <path>.errors.csv)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, help='Password hashing processes (default: PASSWORD_HASH_WORKERS)')
+    args = parser.parse_args()
+
+    fmt = args.format or ('ndjson' if args.path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    result = import_users(args.role, args.path, fmt, args.report or f'{args.path}.errors.csv', args.chunk_size, args.workers)
+    sys.exit(1 if result['failed'] else 0)
@@ -1,12 +1,15 @@
+import os
+from flask_migrate import Migrate, upgrade
 from app import create_app, db
-from app.models.models import Patient, Doctor, Admin, Appointment, MedicalReport, Prescription, Payment, Feedback
 
 def init_db():
     app = create_app('development')
+    Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
     with app.app_context():
-        # Create all tables
-        db.create_all()
+        # Create all tables through the migrations, so `flask db upgrade`
+        # later only applies the revisions added since
+        upgrade()
         print("Database tables created successfully!")
 
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    init_db()
@@ -0,0 +1,165 @@
+"""initial schema
+
+Revision ID: 1a0c4f5e7b21
+Revises: 
+Create Date: 2026-10-18 10:05:31.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a0c4f5e7b21'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# The tables as init_db.py created them before migrations were added. Databases
+# created that way already have them: run `flask db stamp 1a0c4f5e7b21` once,
+# then `flask db upgrade`.
+
+
+def upgrade():
+    op.create_table('patient',
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('first_name', sa.String(length=50), nullable=False),
+    sa.Column('last_name', sa.String(length=50), nullable=False),
+    sa.Column('date_of_birth', sa.Date(), nullable=False),
+    sa.Column('gender', sa.String(length=10), nullable=True),
+    sa.Column('blood_type', sa.String(length=5), nullable=True),
+    sa.Column('contact_number', sa.String(length=15), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('address', sa.String(length=255), nullable=True),
+    sa.Column('emergency_contact', sa.String(length=100), nullable=True),
+    sa.Column('insurance_details', sa.String(length=255), nullable=True),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('patient_id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('doctor',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('first_name', sa.String(length=50), nullable=False),
+    sa.Column('last_name', sa.String(length=50), nullable=False),
+    sa.Column('specialization', sa.String(length=100), nullable=False),
+    sa.Column('experience_years', sa.Integer(), nullable=True),
+    sa.Column('contact_number', sa.String(length=15), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('consultation_fees', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('availability_status', sa.String(length=20), nullable=True),
+    sa.Column('clinic_hospital_name', sa.String(length=255), nullable=True),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('doctor_id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('admin',
+    sa.Column('admin_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('contact', sa.String(length=15), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('admin_id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('appointment',
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('time', sa.Time(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('mode', sa.String(length=20), nullable=False),
+    sa.Column('payment_status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.doctor_id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patient.patient_id'], ),
+    sa.PrimaryKeyConstraint('appointment_id')
+    )
+    op.create_table('feedback',
+    sa.Column('feedback_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('rating', sa.Integer(), nullable=False),
+    sa.Column('comments', sa.Text(), nullable=True),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('video_file', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.CheckConstraint('rating >= 1 AND rating <= 5', name='check_rating_range'),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.doctor_id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patient.patient_id'], ),
+    sa.PrimaryKeyConstraint('feedback_id')
+    )
+    op.create_table('medical_report',
+    sa.Column('report_id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('diagnosis', sa.String(length=255), nullable=False),
+    sa.Column('symptoms', sa.Text(), nullable=True),
+    sa.Column('test_recommended', sa.Text(), nullable=True),
+    sa.Column('test_results', sa.Text(), nullable=True),
+    sa.Column('uploaded_report_file', sa.String(length=255), nullable=True),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.appointment_id'], ),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.doctor_id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patient.patient_id'], ),
+    sa.PrimaryKeyConstraint('report_id')
+    )
+    op.create_table('payment',
+    sa.Column('payment_id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('payment_mode', sa.String(length=50), nullable=False),
+    sa.Column('transaction_id', sa.String(length=100), nullable=True),
+    sa.Column('payment_status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.appointment_id'], ),
+    sa.PrimaryKeyConstraint('payment_id'),
+    sa.UniqueConstraint('transaction_id')
+    )
+    op.create_table('prescription',
+    sa.Column('prescription_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('medicine_name', sa.String(length=100), nullable=False),
+    sa.Column('dosage', sa.String(length=50), nullable=False),
+    sa.Column('frequency', sa.String(length=50), nullable=False),
+    sa.Column('instructions', sa.Text(), nullable=True),
+    sa.Column('refill', sa.Boolean(), nullable=True),
+    sa.Column('date_issued', sa.Date(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.appointment_id'], ),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.doctor_id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patient.patient_id'], ),
+    sa.PrimaryKeyConstraint('prescription_id')
+    )
+
+
+def downgrade():
+    op.drop_table('prescription')
+    op.drop_table('payment')
+    op.drop_table('medical_report')
+    op.drop_table('feedback')
+    op.drop_table('appointment')
+    op.drop_table('admin')
+    op.drop_table('doctor')
+    op.drop_table('patient')
@@ -0,0 +1,53 @@
+"""add indexes for hot query patterns
+
+Revision ID: 3c1f8e2a9d47
+Revises: 1a0c4f5e7b21
+Create Date: 2026-10-18 10:12:04.381920
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f8e2a9d47'
+down_revision = '1a0c4f5e7b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_patient_status', ['patient_id', 'status'], unique=False)
+        batch_op.create_index('ix_appointment_doctor_slot', ['doctor_id', 'date', 'time'], unique=False)
+        batch_op.create_index('ix_appointment_date_status_payment', ['date', 'status', 'payment_status'], unique=False)
+
+    with op.batch_alter_table('medical_report', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_medical_report_patient_id'), ['patient_id'], unique=False)
+
+    with op.batch_alter_table('prescription', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_prescription_patient_id'), ['patient_id'], unique=False)
+
+    with op.batch_alter_table('feedback', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_feedback_doctor_id'), ['doctor_id'], unique=False)
+
+    with op.batch_alter_table('doctor', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_doctor_specialization'), ['specialization'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('doctor', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_doctor_specialization'))
+
+    with op.batch_alter_table('feedback', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_feedback_doctor_id'))
+
+    with op.batch_alter_table('prescription', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_prescription_patient_id'))
+
+    with op.batch_alter_table('medical_report', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_medical_report_patient_id'))
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_date_status_payment')
+        batch_op.drop_index('ix_appointment_doctor_slot')
+        batch_op.drop_index('ix_appointment_patient_status')
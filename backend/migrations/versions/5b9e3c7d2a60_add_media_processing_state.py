@@ -0,0 +1,44 @@
+"""add media processing state to medical_report and feedback
+
+Revision ID: 5b9e3c7d2a60
+Revises: e2b6a9d4f813
+Create Date: 2026-10-18 18:20:41.903112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9e3c7d2a60'
+down_revision = 'e2b6a9d4f813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('medical_report', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('file_status', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('file_mime_type', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('file_thumbnail', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('file_preview', sa.String(length=255), nullable=True))
+
+    with op.batch_alter_table('feedback', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('video_status', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('video_mime_type', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('video_thumbnail', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('video_preview', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('feedback', schema=None) as batch_op:
+        batch_op.drop_column('video_preview')
+        batch_op.drop_column('video_thumbnail')
+        batch_op.drop_column('video_mime_type')
+        batch_op.drop_column('video_status')
+
+    with op.batch_alter_table('medical_report', schema=None) as batch_op:
+        batch_op.drop_column('file_preview')
+        batch_op.drop_column('file_thumbnail')
+        batch_op.drop_column('file_mime_type')
+        batch_op.drop_column('file_status')
@@ -0,0 +1,39 @@
+"""unique doctor slots and optimistic locking for appointments
+
+Revision ID: 8a4d2f61c0b9
+Revises: 3c1f8e2a9d47
+Create Date: 2026-10-18 14:37:51.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4d2f61c0b9'
+down_revision = '3c1f8e2a9d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('slot_active', sa.Boolean(), nullable=True))
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+    # Cancelled appointments release their slot; everything else keeps it.
+    # Duplicate active bookings must be resolved by hand before this runs.
+    op.execute("UPDATE appointment SET slot_active = NULL WHERE LOWER(status) = 'cancelled'")
+    op.execute("UPDATE appointment SET slot_active = 1 WHERE slot_active IS NULL AND LOWER(status) <> 'cancelled'")
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_doctor_slot')
+        batch_op.create_unique_constraint('uq_appointment_doctor_slot', ['doctor_id', 'date', 'time', 'slot_active'])
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_appointment_doctor_slot', type_='unique')
+        batch_op.create_index('ix_appointment_doctor_slot', ['doctor_id', 'date', 'time'], unique=False)
+        batch_op.drop_column('version')
+        batch_op.drop_column('slot_active')
@@ -0,0 +1,32 @@
+"""add reminder_log table
+
+Revision ID: 9d41f7a0b3c5
+Revises: 5b9e3c7d2a60
+Create Date: 2026-10-18 19:02:13.558201
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d41f7a0b3c5'
+down_revision = '5b9e3c7d2a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reminder_log',
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('offset_minutes', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.appointment_id'], ),
+    sa.PrimaryKeyConstraint('appointment_id', 'offset_minutes')
+    )
+
+
+def downgrade():
+    op.drop_table('reminder_log')
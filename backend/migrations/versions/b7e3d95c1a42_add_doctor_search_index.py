@@ -0,0 +1,42 @@
+"""add doctor full-text search index
+
+Revision ID: b7e3d95c1a42
+Revises: 9d41f7a0b3c5
+Create Date: 2026-10-18 21:14:37.902114
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3d95c1a42'
+down_revision = '9d41f7a0b3c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Other databases fall back to the in-process trigram index
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE doctor_search USING fts5("
+            "first_name, last_name, specialization, clinic_hospital_name, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        op.execute(
+            "INSERT INTO doctor_search (rowid, first_name, last_name, specialization, clinic_hospital_name) "
+            "SELECT doctor_id, first_name, last_name, specialization, coalesce(clinic_hospital_name, '') FROM doctor"
+        )
+    elif dialect in ('mysql', 'mariadb'):
+        op.create_index('ix_doctor_fulltext', 'doctor',
+                        ['first_name', 'last_name', 'specialization', 'clinic_hospital_name'],
+                        unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE doctor_search")
+    elif dialect in ('mysql', 'mariadb'):
+        op.drop_index('ix_doctor_fulltext', table_name='doctor')
@@ -0,0 +1,42 @@
+"""add doctor_schedule table
+
+Revision ID: c57e0b93a1d2
+Revises: 8a4d2f61c0b9
+Create Date: 2026-10-18 16:05:22.417350
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c57e0b93a1d2'
+down_revision = '8a4d2f61c0b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('doctor_schedule',
+    sa.Column('schedule_id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('weekday', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.Time(), nullable=False),
+    sa.Column('end_time', sa.Time(), nullable=False),
+    sa.Column('slot_minutes', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.CheckConstraint('slot_minutes > 0', name='check_slot_minutes_positive'),
+    sa.CheckConstraint('weekday >= 0 AND weekday <= 6', name='check_weekday_range'),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.doctor_id'], ),
+    sa.PrimaryKeyConstraint('schedule_id')
+    )
+    with op.batch_alter_table('doctor_schedule', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_doctor_schedule_doctor_id'), ['doctor_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('doctor_schedule', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_doctor_schedule_doctor_id'))
+
+    op.drop_table('doctor_schedule')
@@ -0,0 +1,45 @@
+"""add credential lookup table
+
+Revision ID: e2b6a9d4f813
+Revises: c57e0b93a1d2
+Create Date: 2026-10-18 18:21:40.113562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6a9d4f813'
+down_revision = 'c57e0b93a1d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('credential',
+    sa.Column('credential_id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('role', sa.String(length=10), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('credential_id'),
+    sa.UniqueConstraint('email', 'role', name='uq_credential_email_role')
+    )
+    with op.batch_alter_table('credential', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_credential_email'), ['email'], unique=False)
+
+    # Backfill from the existing user tables; emails are stored normalized for lookups
+    op.execute("INSERT INTO credential (email, role, user_id, created_at) "
+               "SELECT LOWER(TRIM(email)), 'patient', patient_id, created_at FROM patient")
+    op.execute("INSERT INTO credential (email, role, user_id, created_at) "
+               "SELECT LOWER(TRIM(email)), 'doctor', doctor_id, created_at FROM doctor")
+    op.execute("INSERT INTO credential (email, role, user_id, created_at) "
+               "SELECT LOWER(TRIM(email)), 'admin', admin_id, created_at FROM admin")
+
+
+def downgrade():
+    with op.batch_alter_table('credential', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_credential_email'))
+
+    op.drop_table('credential')
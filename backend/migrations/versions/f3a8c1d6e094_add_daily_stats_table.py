@@ -0,0 +1,43 @@
+"""add daily_stats rollup table
+
+Revision ID: f3a8c1d6e094
+Revises: b7e3d95c1a42
+Create Date: 2026-10-18 22:41:09.317645
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c1d6e094'
+down_revision = 'b7e3d95c1a42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_stats',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('specialization', sa.String(length=100), nullable=False),
+    sa.Column('appointment_count', sa.Integer(), nullable=False),
+    sa.Column('paid_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('date', 'status', 'specialization')
+    )
+    # Same rollup as rebuild_stats.py
+    op.execute(
+        "INSERT INTO daily_stats (date, status, specialization, appointment_count, paid_count, revenue, updated_at) "
+        "SELECT a.date, COALESCE(a.status, ''), d.specialization, COUNT(a.appointment_id), "
+        "SUM(CASE WHEN a.payment_status = 'paid' THEN 1 ELSE 0 END), "
+        "COALESCE(SUM(CASE WHEN a.payment_status = 'paid' THEN d.consultation_fees ELSE 0 END), 0), "
+        "CURRENT_TIMESTAMP "
+        "FROM appointment a JOIN doctor d ON d.doctor_id = a.doctor_id "
+        "GROUP BY a.date, COALESCE(a.status, ''), d.specialization"
+    )
+
+
+def downgrade():
+    op.drop_table('daily_stats')
@@ -0,0 +1,31 @@
+import argparse
+import os
+from datetime import datetime, timedelta
+from app import create_app
+from app.models.models import db, DailyStats
+from app.utils.daily_stats import rebuild_daily_stats
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def rebuild_stats(start_date=None, end_date=None, **settings):
+    app = create_app(os.getenv('FLASK_ENV', 'development'), **settings)
+    with app.app_context():
+        DailyStats.__table__.create(db.engine, checkfirst=True)
+        
+        with db.engine.begin() as connection:
+            rows = rebuild_daily_stats(connection, start_date, end_date)
+        print(f"Rebuilt daily statistics: {rows} rows")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rebuild or backfill the daily_stats rollup table')
+    parser.add_argument('--start-date', type=parse_date, help='First day to rebuild (YYYY-MM-DD)')
+    parser.add_argument('--end-date', type=parse_date, help='Last day to rebuild (YYYY-MM-DD)')
+    parser.add_argument('--days', type=int, help='Rebuild only the last N days, for periodic jobs')
+    args = parser.parse_args()
+    
+    start_date = args.start_date
+    if args.days:
+        start_date = datetime.now().date() - timedelta(days=args.days)
+    
+    rebuild_stats(start_date, args.end_date)
@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+import os
+import signal
+from app import create_app
+from app.utils.reminders import ReminderScheduler
+
+async def report_metrics(scheduler, interval, stop):
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        print(f"reminders: queue={len(scheduler)} {scheduler.metrics.snapshot()}", flush=True)
+
+async def run(scheduler, metrics_interval):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    await asyncio.gather(scheduler.run_forever(stop), report_metrics(scheduler, metrics_interval, stop))
+
+def run_worker(metrics_interval, **settings):
+    app = create_app(os.getenv('FLASK_ENV', 'development'), **settings)
+    with app.app_context():
+        scheduler = ReminderScheduler.from_config()
+        asyncio.run(run(scheduler, metrics_interval))
+    return scheduler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Standalone asyncio appointment reminder scheduler')
+    parser.add_argument('--metrics-interval', type=int, default=60, help='Seconds between metric log lines')
+    args = parser.parse_args()
+
+    run_worker(args.metrics_interval)
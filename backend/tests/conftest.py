@@ -0,0 +1,39 @@
+import pytest
+from app import create_app
+from app.models.models import db
+from benchmarks.app_factory import auth_header
+from benchmarks.seed import seed_database
+
+@pytest.fixture
+def make_test_app():
+    # Each app gets its own in-memory database; query budgets are enforced,
+    # files are stored locally and the per-process principal cache is off so
+    # tests cannot see each other's users
+    def factory(**overrides):
+        settings = dict(SQLALCHEMY_DATABASE_URI='sqlite://', PRINCIPAL_CACHE_TTL=0,
+                        JWT_SECRET_KEY='test-jwt-secret-key-with-enough-bytes')
+        settings.update(overrides)
+        app = create_app('testing', **settings)
+        with app.app_context():
+            # Replica binds share the primary's schema and are created by the tests using them
+            db.create_all(bind_key=None)
+        return app
+    return factory
+
+@pytest.fixture
+def app(make_test_app):
+    return make_test_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def seeded(app):
+    with app.app_context():
+        seed_database(db.engine, patients=5, doctors=3, appointments=30, admins=1, schedule_days=7)
+    return app
+
+@pytest.fixture
+def auth(app):
+    return lambda user_id, role: auth_header(app, user_id, role)
@@ -0,0 +1,33 @@
+import pytest
+from app import create_app, BLUEPRINTS
+
+@pytest.fixture
+def app_factory(tmp_path):
+    def factory(**overrides):
+        return create_app('testing', SQLALCHEMY_DATABASE_URI='sqlite://', UPLOAD_FOLDER=str(tmp_path), **overrides)
+    return factory
+
+def test_create_app_registers_every_blueprint(app_factory):
+    app = app_factory()
+    assert {name for name, _, _ in BLUEPRINTS} <= {blueprint.import_name.rsplit('.', 1)[-1]
+                                                   for blueprint in app.blueprints.values()}
+    rules = {rule.rule for rule in app.url_map.iter_rules()}
+    assert {'/health', '/metrics', '/api/openapi.json', '/api/auth/login', '/api/uploads'} <= rules
+
+def test_metrics_and_openapi_are_not_rate_limited(app_factory):
+    app = app_factory(RATELIMIT_ENABLED=True, RATELIMIT_DEFAULT='2/hour', SWAGGER_ENABLED=True)
+    client = app.test_client()
+    assert [client.get('/health').status_code for _ in range(3)] == [200, 200, 429]
+    assert {client.get('/metrics').status_code for _ in range(5)} == {200}
+    assert {client.get('/api/openapi.json').status_code for _ in range(5)} == {200}
+
+def test_swagger_toggle(app_factory):
+    disabled = app_factory(SWAGGER_ENABLED=False, OPENAPI_SPEC_PATH=None)
+    assert getattr(disabled, 'swag', None) is None
+    assert disabled.test_client().get('/apidocs/').status_code == 404
+    assert disabled.test_client().get('/api/openapi.json').status_code == 404
+
+    enabled = app_factory(SWAGGER_ENABLED=True, OPENAPI_SPEC_PATH=None)
+    assert enabled.test_client().get('/apispec_1.json').status_code == 200
+    spec = enabled.test_client().get('/api/openapi.json')
+    assert spec.status_code == 200 and '/api/auth/login' in spec.get_json()['paths']
@@ -0,0 +1,93 @@
+import sqlite3
+from datetime import date, timedelta
+import pytest
+from app.models.models import db, Appointment
+from benchmarks.app_factory import make_app, auth_header
+from benchmarks.load import BLUEPRINTS
+from benchmarks.seed import seed_database
+
+# A Monday well after the seeded appointments; seeded doctors work 08:00-16:00
+# in 30 minute slots every day
+MONDAY = '2031-03-03'
+
+def slot(doctor_id=1, day=MONDAY, time='09:00'):
+    return {'doctor_id': doctor_id, 'date': day, 'time': time, 'mode': 'online'}
+
+def test_second_booking_of_a_slot_conflicts(seeded, auth):
+    client = seeded.test_client()
+    assert client.post('/api/appointments', json=slot(), headers=auth(1, 'patient')).status_code == 201
+    response = client.post('/api/appointments', json=slot(), headers=auth(2, 'patient'))
+    assert response.status_code == 409
+    assert response.get_json()['conflicts'] == [{'doctor_id': 1, 'date': MONDAY, 'time': '09:00'}]
+
+def test_bulk_booking_is_all_or_nothing(seeded, auth):
+    client = seeded.test_client()
+    assert client.post('/api/appointments', json=slot(time='10:00'), headers=auth(1, 'patient')).status_code == 201
+    response = client.post('/api/appointments/bulk', json={'slots': [slot(time='09:30'), slot(time='10:00')]},
+                           headers=auth(2, 'patient'))
+    assert response.status_code == 409
+    with seeded.app_context():
+        assert Appointment.query.filter_by(patient_id=2, date=date(2031, 3, 3)).count() == 0
+
+@pytest.mark.parametrize('requested', [
+    slot(time='07:30'),
+    slot(time='16:00'),
+    slot(time='09:10'),
+    slot(doctor_id=3, day='2031-03-09')
+])
+def test_booking_outside_the_schedule_is_rejected(seeded, auth, requested):
+    with seeded.app_context():
+        # Doctor 3 has no Sunday hours
+        db.session.execute(db.text('DELETE FROM doctor_schedule WHERE doctor_id = 3 AND weekday = 6'))
+        db.session.commit()
+    response = seeded.test_client().post('/api/appointments', json=requested, headers=auth(1, 'patient'))
+    assert response.status_code == 400
+    assert 'has no slot' in response.get_json()['message']
+
+def test_reschedule_checks_the_schedule(seeded, auth):
+    client = seeded.test_client()
+    headers = auth(1, 'patient')
+    appointment_id = client.post('/api/appointments', json=slot(), headers=headers).get_json()['id']
+    url = f'/api/appointments/{appointment_id}'
+    assert client.put(url, json={'date': MONDAY, 'time': '17:00'}, headers=headers).status_code == 400
+    assert client.put(url, json={'date': MONDAY, 'time': '15:30'}, headers=headers).status_code == 200
+
+def test_slots_in_the_past_are_rejected(seeded, auth):
+    client = seeded.test_client()
+    headers = auth(1, 'patient')
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    response = client.post('/api/appointments/bulk', json={'slots': [slot(), slot(day=yesterday)]}, headers=headers)
+    assert response.status_code == 400
+    assert 'in the past' in response.get_json()['message']
+    with seeded.app_context():
+        assert Appointment.query.filter_by(patient_id=1, date=date(2031, 3, 3)).count() == 0
+
+    appointment_id = client.post('/api/appointments', json=slot(), headers=headers).get_json()['id']
+    response = client.put(f'/api/appointments/{appointment_id}', json={'date': yesterday, 'time': '09:00'},
+                          headers=headers)
+    assert response.status_code == 400
+    assert 'in the past' in response.get_json()['message']
+
+def test_locked_database_is_a_retryable_error(tmp_path):
+    path = tmp_path / 'locked.sqlite'
+    app = make_app(f'sqlite:///{path}', BLUEPRINTS, AWS_ACCESS_KEY_ID=None,
+                   SQLALCHEMY_ENGINE_OPTIONS={'connect_args': {'timeout': 0.05}})
+    with app.app_context():
+        db.create_all()
+        seed_database(db.engine, patients=2, doctors=1, appointments=0, admins=0, schedule_days=7)
+        db.engine.dispose()
+
+    # Another writer holds the write lock past the busy timeout
+    writer = sqlite3.connect(path)
+    writer.execute('BEGIN IMMEDIATE')
+    try:
+        response = app.test_client().post('/api/appointments', json=slot(),
+                                          headers=auth_header(app, 1, 'patient'))
+    finally:
+        writer.rollback()
+        writer.close()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+    retried = app.test_client().post('/api/appointments', json=slot(), headers=auth_header(app, 1, 'patient'))
+    assert retried.status_code == 201
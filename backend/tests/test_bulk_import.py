@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+import pytest
+
+def doctor(email, **fields):
+    return {'first_name': 'Grace', 'last_name': 'Hopper', 'email': email, 'specialization': 'Navalmedicine',
+            'contact_number': '555', 'consultation_fees': '120.00', **fields}
+
+@pytest.fixture
+def importer(seeded, auth, tmp_path):
+    seeded.config['IMPORT_REPORT_FOLDER'] = str(tmp_path)
+    client = seeded.test_client()
+    headers = auth(1, 'admin')
+
+    def run(lines, chunk_size=2):
+        body = '\n'.join(line if isinstance(line, str) else json.dumps(line) for line in lines)
+        response = client.post(f'/api/admin/import/doctor?format=ndjson&chunk_size={chunk_size}',
+                               data=body, content_type='application/x-ndjson', headers=headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        result = response.get_json()
+        rows = []
+        if result['report']:
+            report = client.get(f"/api/admin/import/reports/{result['report']}", headers=headers)
+            rows = list(csv.reader(io.StringIO(report.get_data(as_text=True))))[1:]
+        return result, rows
+    return run, client
+
+def test_import_reports_each_rejected_row(importer):
+    run, _ = importer
+    result, rows = run([
+        doctor('grace@example.com'),
+        doctor('missing@example.com', specialization=''),
+        doctor('GRACE@example.com'),
+        '{not json',
+        doctor('doctor1@example.com'),
+        doctor('ada@example.com', consultation_fees='-5')
+    ])
+    assert (result['imported'], result['failed']) == (1, 5)
+    messages = {int(line): message for line, _, message in rows}
+    assert messages.pop(4).startswith('invalid JSON')
+    assert messages == {
+        2: 'specialization is required',
+        3: 'duplicate email in import',
+        5: 'email already registered',
+        6: 'consultation_fees: must be a positive amount'
+    }
+
+def test_imported_doctors_are_searchable(importer, auth):
+    run, client = importer
+    result, _ = run([doctor(f'import{i}@example.com') for i in range(5)])
+    assert result == {'imported': 5, 'failed': 0, 'report': None}
+
+    found = client.get('/api/patients/doctors/search?q=navalmed', headers=auth(1, 'patient')).get_json()
+    assert len(found) == 5
+
+def test_import_users_command(tmp_path, monkeypatch):
+    from app import create_app
+    from app.models.models import db, Doctor
+    from import_users import import_users
+
+    monkeypatch.setenv('FLASK_ENV', 'testing')
+    url = f"sqlite:///{tmp_path / 'import.sqlite'}"
+    app = create_app('testing', SQLALCHEMY_DATABASE_URI=url)
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+    source = tmp_path / 'doctors.ndjson'
+    source.write_text('\n'.join(json.dumps(doctor(email)) for email in
+                                ('one@example.com', 'two@example.com', 'one@example.com')))
+    report = tmp_path / 'errors.csv'
+    result = import_users('doctor', str(source), 'ndjson', str(report), 2, workers=0, SQLALCHEMY_DATABASE_URI=url)
+
+    assert (result['imported'], result['failed']) == (2, 1)
+    assert list(csv.reader(report.open()))[1:] == [['3', 'one@example.com', 'duplicate email in import']]
+    with app.app_context():
+        assert sorted(d.email for d in Doctor.query) == ['one@example.com', 'two@example.com']
@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+from config.config import ProductionConfig
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def worker_config(**env):
+    # What `celery -A app.tasks worker` sees: a fresh process that imports the
+    # tasks module without calling create_app
+    script = ('import json, app.tasks; from app import celery; '
+              'print(json.dumps({"broker_url": celery.conf.broker_url, "result_backend": celery.conf.result_backend, '
+              '"beat_schedule": celery.conf.beat_schedule, "tasks": sorted(celery.tasks)}))')
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, cwd=BACKEND,
+                            env={**os.environ, **env}, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_worker_uses_the_configured_broker():
+    config = worker_config(FLASK_ENV='production')
+    assert config['broker_url'] == ProductionConfig.CELERY_BROKER_URL
+    assert config['result_backend'] == ProductionConfig.CELERY_RESULT_BACKEND
+    assert {'reports.export', 'media.process'} <= set(config['tasks'])
+
+def test_beat_schedules_reminder_dispatch():
+    config = worker_config(FLASK_ENV='production')
+    schedule = config['beat_schedule']['dispatch-reminders']
+    assert schedule['task'] == 'reminders.dispatch'
+    assert schedule['schedule'] == ProductionConfig.REMINDER_POLL_INTERVAL
+    assert 'reminders.dispatch' in config['tasks']
+
+def test_beat_reaps_abandoned_uploads():
+    config = worker_config(FLASK_ENV='production')
+    schedule = config['beat_schedule']['reap-uploads']
+    assert (schedule['task'], schedule['schedule']) == ('uploads.reap', ProductionConfig.UPLOAD_REAP_INTERVAL)
+    assert 'uploads.reap' in config['tasks']
+
+def test_tasks_build_their_own_app_outside_a_request(monkeypatch):
+    from flask import current_app, has_app_context
+    from app import tasks
+
+    monkeypatch.setenv('FLASK_ENV', 'testing')
+    monkeypatch.setattr(tasks, '_app', None)
+    assert not has_app_context()
+
+    def describe(suffix):
+        return current_app._get_current_object(), current_app.config['TESTING'], f"{current_app.name}{suffix}"
+
+    app, testing, name = tasks._with_app_context(describe, ':worker')
+    assert (testing, name) == (True, 'app:worker')
+    assert {'auth', 'patient', 'doctor', 'admin', 'appointment', 'upload'} <= set(app.blueprints)
+    assert tasks._with_app_context(describe, '')[0] is app
+    assert not has_app_context()
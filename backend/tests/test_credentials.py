@@ -0,0 +1,49 @@
+from datetime import date
+import pytest
+from app.models.models import db, Patient, Credential
+from app.utils.credentials import find_credential
+
+PASSWORD = 'correct horse battery staple'
+
+@pytest.fixture
+def victim(app):
+    with app.app_context():
+        patient = Patient(first_name='Vic', last_name='Tim', date_of_birth=date(1990, 1, 1), contact_number='555',
+                          email='Victim@Example.com', username='victim')
+        patient.set_password(PASSWORD)
+        db.session.add(patient)
+        db.session.commit()
+        return patient.patient_id
+
+def login(client, email, password=PASSWORD):
+    return client.post('/api/auth/login', json={'email': email, 'password': password})
+
+def test_credential_email_is_stored_normalized(app, victim):
+    with app.app_context():
+        assert db.session.query(Credential.email).filter_by(user_id=victim).scalar() == 'victim@example.com'
+        assert find_credential(' VICTIM@example.COM ') == ('patient', victim)
+
+@pytest.mark.parametrize('variant', ['victim@EXAMPLE.com', ' victim@example.com', 'Victim@Example.com '])
+def test_email_variants_do_not_lock_out_the_user(client, victim, variant):
+    # A failed login with a case or whitespace variant must not cache the
+    # normalized email as unknown
+    assert login(client, variant, 'wrong password').status_code == 401
+    assert login(client, 'victim@example.com').status_code == 200
+    assert login(client, variant).status_code == 200
+
+def test_unknown_email_is_rejected(client, victim):
+    assert login(client, 'nobody@example.com').status_code == 401
+    assert login(client, 'victim@example.com').status_code == 200
+
+def test_bulk_imported_users_can_log_in_with_any_case(seeded, auth, tmp_path):
+    seeded.config['IMPORT_REPORT_FOLDER'] = str(tmp_path)
+    client = seeded.test_client()
+    body = ('first_name,last_name,email,date_of_birth,contact_number,password\n'
+            f'Ada,Lovelace, Ada@Example.com ,1990-01-01,555,{PASSWORD}\n')
+    response = client.post('/api/admin/import/patient', data=body, content_type='text/csv', headers=auth(1, 'admin'))
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['imported'] == 1
+
+    with seeded.app_context():
+        assert db.session.query(Credential.role).filter_by(email='ada@example.com').scalar() == 'patient'
+    assert login(client, 'ADA@example.com').status_code == 200
@@ -0,0 +1,74 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import select
+from app.models.models import db, Appointment, Doctor, DailyStats
+from app import create_app
+from benchmarks.seed import seed_database
+from rebuild_stats import rebuild_stats
+
+def live_aggregates():
+    # Straight from the appointment rows, the way the reports used to count them
+    totals = defaultdict(lambda: [0, 0, Decimal(0)])
+    for appointment, doctor in db.session.query(Appointment, Doctor).join(
+        Doctor, Doctor.doctor_id == Appointment.doctor_id
+    ):
+        row = totals[(appointment.date, appointment.status or '', doctor.specialization)]
+        row[0] += 1
+        if appointment.payment_status == 'paid':
+            row[1] += 1
+            row[2] += doctor.consultation_fees
+    return {key: tuple(values) for key, values in totals.items()}
+
+def rollup():
+    table = DailyStats.__table__
+    return {
+        (row.date, row.status, row.specialization): (row.appointment_count, row.paid_count, row.revenue)
+        for row in db.session.execute(select(table))
+    }
+
+def test_rollup_follows_orm_writes(seeded):
+    with seeded.app_context():
+        assert rollup() == live_aggregates()
+
+        appointment = db.session.get(Appointment, 1)
+        appointment.status = 'completed'
+        appointment.payment_status = 'paid'
+        db.session.get(Appointment, 2).date = date(2031, 3, 3)
+        db.session.get(Doctor, 1).consultation_fees = Decimal('999.00')
+        db.session.add(Appointment(patient_id=1, doctor_id=2, date=date(2031, 3, 4), time=appointment.time,
+                                   mode='online', status='Scheduled', payment_status='paid', slot_active=True))
+        db.session.commit()
+        assert rollup() == live_aggregates()
+
+        db.session.delete(db.session.execute(
+            select(Appointment).where(Appointment.date == date(2031, 3, 4))
+        ).scalar_one())
+        db.session.commit()
+        assert rollup() == live_aggregates()
+
+def test_rebuild_script_matches_live_aggregates(tmp_path, monkeypatch):
+    monkeypatch.setenv('FLASK_ENV', 'testing')
+    url = f"sqlite:///{tmp_path / 'stats.sqlite'}"
+    seeded = create_app('testing', SQLALCHEMY_DATABASE_URI=url)
+    with seeded.app_context():
+        db.create_all()
+        seed_database(db.engine, patients=5, doctors=3, appointments=60, admins=0)
+        db.session.execute(DailyStats.__table__.delete())
+        db.session.commit()
+        assert rollup() == {}
+        db.engine.dispose()
+
+    rebuild_stats(SQLALCHEMY_DATABASE_URI=url)
+    with seeded.app_context():
+        live = live_aggregates()
+        assert rollup() == live
+
+        cutoff = sorted(key[0] for key in live)[len(live) // 2]
+        db.session.execute(DailyStats.__table__.delete())
+        db.session.commit()
+        db.engine.dispose()
+
+    rebuild_stats(cutoff, SQLALCHEMY_DATABASE_URI=url)
+    with seeded.app_context():
+        assert rollup() == {key: values for key, values in live.items() if key[0] >= cutoff}
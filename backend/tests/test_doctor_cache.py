@@ -0,0 +1,66 @@
+from decimal import Decimal
+import pytest
+from sqlalchemy import update
+from app import cache
+from app.models.models import db, Doctor
+from app.utils.doctor_cache import directory_key
+
+@pytest.fixture
+def directory(seeded, auth):
+    # Doctors 1-3 are in Dermatology, Neurology and Orthopedics
+    client = seeded.test_client()
+    headers = auth(1, 'patient')
+
+    def get(specialization=None):
+        query = f'?specialization={specialization}' if specialization else ''
+        response = client.get(f'/api/patients/doctors{query}', headers=headers)
+        assert response.status_code == 200
+        return {doctor['id']: doctor for doctor in response.get_json()}
+
+    with seeded.app_context():
+        yield get
+
+def cached(*specializations):
+    return [cache.get(directory_key(specialization)) is not None for specialization in specializations]
+
+def test_directory_is_served_from_the_cache(directory):
+    assert list(directory('Dermatology')) == [1]
+    assert cached('Dermatology', None) == [True, False]
+
+    # Core writes bypass the listeners, so a hit still shows the old name
+    db.session.execute(update(Doctor).where(Doctor.doctor_id == 1).values(first_name='Core'))
+    db.session.commit()
+    assert directory('Dermatology')[1]['first_name'] == 'Doc1'
+
+def test_listed_columns_invalidate_the_cache(directory):
+    directory()
+    directory('Dermatology')
+    db.session.get(Doctor, 1).consultation_fees = Decimal('75.00')
+    db.session.commit()
+    assert cached(None, 'Dermatology') == [False, False]
+    assert directory('Dermatology')[1]['consultation_fees'] == '75.00'
+
+def test_other_columns_leave_the_cache_alone(directory):
+    directory()
+    directory('Dermatology')
+    doctor = db.session.get(Doctor, 1)
+    doctor.password_hash = 'rehashed'
+    doctor.contact_number = '5550000000'
+    db.session.commit()
+    assert cached(None, 'Dermatology') == [True, True]
+
+def test_moves_invalidate_both_specializations_only(directory):
+    for specialization in (None, 'Dermatology', 'Neurology', 'Orthopedics'):
+        directory(specialization)
+    db.session.get(Doctor, 1).specialization = 'Neurology'
+    db.session.commit()
+    assert cached(None, 'Dermatology', 'Neurology', 'Orthopedics') == [False, False, False, True]
+    assert sorted(directory('Neurology')) == [1, 2]
+    assert directory('Dermatology') == {}
+
+def test_rolled_back_changes_keep_the_cache(directory):
+    directory('Dermatology')
+    db.session.get(Doctor, 1).first_name = 'Rolled'
+    db.session.flush()
+    db.session.rollback()
+    assert cached('Dermatology') == [True]
@@ -0,0 +1,39 @@
+import pytest
+from app import cache
+from app.models.models import db, Doctor
+from app.utils.doctor_search import TrigramIndex, GENERATION_KEY, _CHANGED_KEY
+from benchmarks.seed import seed_database
+
+@pytest.fixture
+def trigram_app(make_test_app):
+    app = make_test_app(DOCTOR_SEARCH_BACKEND='trigram')
+    with app.app_context():
+        seed_database(db.engine, patients=1, doctors=5, appointments=0)
+    return app
+
+def rename(app, doctor_id, specialization):
+    with app.app_context():
+        db.session.get(Doctor, doctor_id).specialization = specialization
+        db.session.commit()
+
+def test_other_workers_see_committed_changes(trigram_app):
+    # Another worker's index; it shares only the cache with this process
+    other = TrigramIndex(ttl=3600)
+    with trigram_app.app_context():
+        other.ensure_fresh()
+        assert other.search(['xenobiology'], 10) == []
+
+    rename(trigram_app, 2, 'Xenobiology')
+    with trigram_app.app_context():
+        other.ensure_fresh()
+        assert other.search(['xenobiology'], 10) == [2]
+
+def test_expired_changes_rebuild_the_index(trigram_app):
+    other = TrigramIndex(ttl=3600)
+    with trigram_app.app_context():
+        other.ensure_fresh()
+    rename(trigram_app, 3, 'Xenobiology')
+    with trigram_app.app_context():
+        cache.delete(_CHANGED_KEY.format(cache.get(GENERATION_KEY)))
+        other.ensure_fresh()
+        assert other.search(['xenobiology'], 10) == [3]
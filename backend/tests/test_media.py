@@ -0,0 +1,93 @@
+import io
+import pytest
+from app.models.models import db, MedicalReport, Feedback
+from app.utils.file_handler import store_stream
+from app.utils.media import READY
+
+@pytest.fixture
+def media_app(seeded, tmp_path):
+    seeded.config['UPLOAD_FOLDER'] = str(tmp_path)
+    with seeded.test_request_context():
+        stored = {
+            name: store_stream(io.BytesIO(body), file_type, name)['filename']
+            for name, body, file_type in [
+                ('scan.pdf', b'%PDF full size', 'document'),
+                ('thumb.jpg', b'thumbnail bytes', 'image'),
+                ('visit.mp4', b'full video', 'video'),
+                ('preview.mp4', b'preview video', 'video')
+            ]
+        }
+        report = MedicalReport.query.first()
+        report.uploaded_report_file = stored['scan.pdf']
+        report.file_status = READY
+        report.file_mime_type = 'application/pdf'
+        report.file_thumbnail = stored['thumb.jpg']
+
+        feedback = Feedback.query.first()
+        feedback.video_file = stored['visit.mp4']
+        feedback.video_status = READY
+        feedback.video_thumbnail = stored['thumb.jpg']
+        feedback.video_preview = stored['preview.mp4']
+        db.session.commit()
+    return seeded
+
+@pytest.fixture
+def report_owner(media_app):
+    with media_app.app_context():
+        return db.session.query(MedicalReport.report_id, MedicalReport.patient_id).filter(
+            MedicalReport.file_thumbnail.isnot(None)
+        ).one()
+
+def test_report_listing_links_renditions(media_app, report_owner, auth):
+    client = media_app.test_client()
+    headers = auth(report_owner.patient_id, 'patient')
+    reports = client.get('/api/patients/medical-reports', headers=headers).get_json()
+    links = next(report['file'] for report in reports if report['file'])
+    assert links['status'] == READY
+    assert links['preview_url'] is None
+
+    assert client.get(links['thumbnail_url'], headers=headers).get_data() == b'thumbnail bytes'
+    assert client.get(links['url'], headers=headers).get_data() == b'%PDF full size'
+
+def test_feedback_listing_links_video_renditions(media_app, auth):
+    client = media_app.test_client()
+    headers = auth(1, 'admin')
+    rows = client.get('/api/admin/feedback', headers=headers).get_json()['items']
+    links = next(row['video'] for row in rows if row['video'])
+    assert client.get(links['preview_url'], headers=headers).get_data() == b'preview video'
+    assert client.get(links['thumbnail_url'], headers=headers).get_data() == b'thumbnail bytes'
+
+def test_renditions_check_access(media_app, report_owner, auth):
+    client = media_app.test_client()
+    other_patient = 2 if report_owner.patient_id != 2 else 3
+    url = f'/api/uploads/medical-reports/{report_owner.report_id}/file/thumbnail'
+    assert client.get(url, headers=auth(other_patient, 'patient')).status_code == 403
+    assert client.get(url.replace('thumbnail', 'original'), headers=auth(1, 'admin')).status_code == 404
+
+def test_attaching_a_file_processes_it_inline(media_app, report_owner, auth):
+    # TestingConfig runs Celery tasks eagerly, so no broker is needed
+    client = media_app.test_client()
+    with media_app.test_request_context():
+        filename = store_stream(io.BytesIO(b'not really a pdf'), 'document', 'new.pdf')['filename']
+        doctor_id = db.session.get(MedicalReport, report_owner.report_id).doctor_id
+    response = client.put(f'/api/uploads/medical-reports/{report_owner.report_id}/file',
+                          json={'filename': filename}, headers=auth(doctor_id, 'doctor'))
+    assert response.status_code == 202, response.get_data(as_text=True)
+    with media_app.app_context():
+        report = db.session.get(MedicalReport, report_owner.report_id)
+        assert report.uploaded_report_file == filename
+        assert report.file_status in ('ready', 'failed')
+
+def test_x_accel_redirect_is_not_sent_with_not_modified(media_app, report_owner, auth):
+    media_app.config['X_ACCEL_REDIRECT_PREFIX'] = '/protected'
+    client = media_app.test_client()
+    headers = auth(report_owner.patient_id, 'patient')
+    url = f'/api/uploads/medical-reports/{report_owner.report_id}/file'
+
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.headers['X-Accel-Redirect'].startswith('/protected/document/')
+
+    revalidated = client.get(url, headers={**headers, 'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert 'X-Accel-Redirect' not in revalidated.headers
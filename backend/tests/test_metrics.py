@@ -0,0 +1,21 @@
+import pytest
+from benchmarks.app_factory import auth_header
+from config.config import ProductionConfig
+
+def test_production_keeps_timings_to_metrics():
+    assert ProductionConfig.METRICS_SERVER_TIMING is False
+    assert ProductionConfig.METRICS_REQUIRE_TOKEN is True
+
+def test_metrics_without_a_token_refuse_to_start(make_test_app):
+    with pytest.raises(RuntimeError, match='METRICS_TOKEN'):
+        make_test_app(METRICS_REQUIRE_TOKEN=True, METRICS_TOKEN=None)
+    make_test_app(METRICS_REQUIRE_TOKEN=True, METRICS_TOKEN=None, METRICS_ENABLED=False)
+
+def test_metrics_need_the_token(make_test_app):
+    app = make_test_app(METRICS_REQUIRE_TOKEN=True, METRICS_TOKEN='scrape-secret', METRICS_SERVER_TIMING=False)
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+    assert response.status_code == 200
+    assert 'http_request_duration_seconds' in response.get_data(as_text=True)
+    assert 'Server-Timing' not in client.get('/api/patients/profile', headers=auth_header(app, 1, 'patient')).headers
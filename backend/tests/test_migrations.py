@@ -0,0 +1,52 @@
+import os
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import Migrate, downgrade, upgrade
+from sqlalchemy import select
+from app.models.models import db, DailyStats
+from app.utils.daily_stats import rebuild_daily_stats
+from benchmarks.app_factory import make_app
+from benchmarks.seed import seed_database
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+@pytest.fixture
+def migrated_app(tmp_path):
+    app = make_app(f"sqlite:///{tmp_path / 'migrated.sqlite'}")
+    Migrate(app, db, directory=MIGRATIONS)
+    with app.app_context():
+        upgrade()
+        yield app
+        db.engine.dispose()
+
+def stats_rows(connection):
+    table = DailyStats.__table__
+    columns = [column for column in table.c if column.name != 'updated_at']
+    return connection.execute(select(*columns).order_by(*table.primary_key)).all()
+
+def schema_diff():
+    # The FTS5 table and its shadow tables are created by the migrations only
+    def include(obj, name, kind, reflected, compare_to):
+        return not (kind == 'table' and reflected and name not in db.metadata.tables)
+    with db.engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={'include_object': include})
+        return compare_metadata(context, db.metadata)
+
+def test_fresh_database_matches_the_models(migrated_app):
+    assert schema_diff() == []
+
+def test_daily_stats_migration_backfills_the_rollup(migrated_app):
+    seed_database(db.engine, patients=5, doctors=3, appointments=40, admins=1)
+    downgrade(revision='b7e3d95c1a42')
+    upgrade()
+    with db.engine.begin() as connection:
+        migrated = stats_rows(connection)
+        rebuild_daily_stats(connection)
+        assert migrated and migrated == stats_rows(connection)
+
+def test_migrations_downgrade_and_upgrade_again(migrated_app):
+    downgrade(revision='base')
+    assert db.inspect(db.engine).get_table_names() == ['alembic_version']
+    upgrade()
+    assert 'appointment' in db.inspect(db.engine).get_table_names()
@@ -0,0 +1,11 @@
+import json
+from build_openapi import build_openapi, create_spec_app
+from app.utils.openapi import build_spec
+
+def test_committed_spec_matches_the_routes():
+    # Same check CI runs with build_openapi.py --check
+    assert build_openapi(check=True)
+
+def test_spec_documents_the_registered_blueprints():
+    paths = set(json.loads(build_spec(create_spec_app()))['paths'])
+    assert {'/api/auth/login', '/api/patients/appointments', '/api/uploads/{upload_id}/complete'} <= paths
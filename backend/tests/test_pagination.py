@@ -0,0 +1,80 @@
+import json
+import pytest
+from sqlalchemy import select
+from app.models.models import db, Appointment, Doctor, Feedback, Patient
+from app.utils.pagination import encode_cursor, decode_cursor
+from benchmarks.seed import seed_database
+
+LISTINGS = [
+    ('/api/admin/doctors', Doctor.doctor_id),
+    ('/api/admin/patients', Patient.patient_id),
+    ('/api/admin/appointments', Appointment.appointment_id),
+    ('/api/admin/appointments?status=Scheduled', Appointment.appointment_id),
+    ('/api/admin/feedback', Feedback.feedback_id)
+]
+
+@pytest.fixture
+def admin(app, auth):
+    with app.app_context():
+        seed_database(db.engine, patients=23, doctors=11, appointments=97, admins=1)
+    client = app.test_client()
+    headers = auth(1, 'admin')
+    return lambda url: client.get(url, headers=headers)
+
+def expected_ids(app, column, url):
+    with app.app_context():
+        query = select(column)
+        if 'status=Scheduled' in url:
+            query = query.where(Appointment.status == 'Scheduled')
+        return sorted(db.session.execute(query).scalars())
+
+def walk(get, url, limit):
+    separator = '&' if '?' in url else '?'
+    items, cursor, pages = [], None, 0
+    while True:
+        response = get(f"{url}{separator}limit={limit}" + (f"&cursor={cursor}" if cursor else ''))
+        assert response.status_code == 200, response.get_data(as_text=True)
+        page = response.get_json()
+        assert len(page['items']) <= limit
+        items.extend(page['items'])
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            return items, pages
+
+def test_cursor_round_trip():
+    for value in (0, 41, 10 ** 12, 'abc'):
+        token = encode_cursor(value)
+        assert '=' not in token
+        assert decode_cursor(token) == value
+    assert decode_cursor(None) is None and decode_cursor('') is None
+
+@pytest.mark.parametrize('token', ['not-base64!', encode_cursor(1)[:-3], 'eyJhIjoxfQ'])
+def test_bad_cursor_is_rejected(admin, token):
+    response = admin(f'/api/admin/doctors?cursor={token}')
+    assert (response.status_code, response.get_json()) == (400, {'message': 'Invalid cursor'})
+
+def test_bad_limit_is_rejected(admin):
+    assert admin('/api/admin/doctors?limit=ten').status_code == 400
+    assert len(admin('/api/admin/doctors?limit=0').get_json()['items']) == 1
+
+@pytest.mark.parametrize('url, column', LISTINGS)
+@pytest.mark.parametrize('limit', [1, 7, 1000])
+def test_walking_every_page_sees_each_row_once(app, admin, url, column, limit):
+    items, pages = walk(admin, url, limit)
+    ids = [item['id'] for item in items]
+    expected = expected_ids(app, column, url)
+    # Ids are unique keys, so rows sharing a date or status still page in id order
+    assert ids == expected
+    assert pages == max(1, -(-len(expected) // limit))
+
+@pytest.mark.parametrize('url, column', LISTINGS)
+def test_ndjson_streams_the_same_rows_as_the_pages(admin, url, column):
+    separator = '&' if '?' in url else '?'
+    response = admin(f'{url}{separator}format=ndjson')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    body = response.get_data(as_text=True)
+    assert body.endswith('\n')
+    streamed = [json.loads(line) for line in body.splitlines()]
+    assert streamed == walk(admin, url, 7)[0]
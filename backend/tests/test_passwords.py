@@ -0,0 +1,99 @@
+import pytest
+from app.models.models import db, Patient
+from app.utils import passwords
+from app.utils.passwords import (
+    UNUSABLE_PASSWORD, hash_password, hash_many, verify_password, needs_rehash, identify, get_hash_pool
+)
+from benchmarks.seed import seed_database
+
+@pytest.fixture
+def pooled(make_test_app, monkeypatch):
+    # One spawned worker; the module-level pool is dropped again afterwards
+    monkeypatch.setattr(passwords, '_pool', None)
+    app = make_test_app(PASSWORD_HASH_WORKERS=1)
+    with app.app_context():
+        yield app
+        pool = passwords._pool
+        if pool is not None:
+            pool.shutdown()
+
+def test_hash_and_verify_through_the_pool(pooled):
+    pool = get_hash_pool()
+    assert pool is not None and pool.workers == 1
+
+    password_hash = hash_password('correct horse')
+    assert identify(password_hash) == ('pbkdf2', 1000)
+    assert verify_password(password_hash, 'correct horse')
+    assert not verify_password(password_hash, 'wrong horse')
+
+    hashes = hash_many(['a', 'b', 'c'])
+    assert [verify_password(h, p) for h, p in zip(hashes, 'abc')] == [True] * 3
+    assert get_hash_pool() is pool
+
+def test_no_pool_without_workers(app):
+    with app.app_context():
+        assert get_hash_pool() is None
+        assert verify_password(hash_password('inline'), 'inline')
+
+@pytest.mark.parametrize('password', [UNUSABLE_PASSWORD, '', None, 'anything'])
+def test_unusable_password_never_verifies(app, password):
+    with app.app_context():
+        assert not verify_password(UNUSABLE_PASSWORD, password)
+        assert not verify_password(None, password)
+        assert not verify_password('', password)
+
+def test_needs_rehash_follows_the_configured_hasher(app):
+    with app.app_context():
+        pbkdf2 = hash_password('secret')
+        assert not needs_rehash(pbkdf2)
+
+        app.config['PASSWORD_PBKDF2_ITERATIONS'] = 2000
+        assert needs_rehash(pbkdf2)
+
+        app.config.update(PASSWORD_HASHER='bcrypt', PASSWORD_BCRYPT_ROUNDS=4)
+        bcrypt_hash = hash_password('secret')
+        assert identify(bcrypt_hash) == ('bcrypt', 4)
+        assert needs_rehash(pbkdf2) and not needs_rehash(bcrypt_hash)
+        # Hashes from the previous hasher keep verifying until they are upgraded
+        assert verify_password(pbkdf2, 'secret') and verify_password(bcrypt_hash, 'secret')
+
+        app.config['PASSWORD_BCRYPT_ROUNDS'] = 5
+        assert needs_rehash(bcrypt_hash)
+
+@pytest.fixture
+def login(app):
+    with app.app_context():
+        seed_database(db.engine, patients=2, doctors=1, appointments=0, admins=0)
+        patient = db.session.get(Patient, 1)
+        patient.set_password('secret')
+        db.session.commit()
+    client = app.test_client()
+
+    def post(email, password):
+        return client.post('/api/auth/login', json={'email': email, 'password': password, 'role': 'patient'})
+    return post
+
+def stored_hash(app, patient_id):
+    with app.app_context():
+        return db.session.get(Patient, patient_id).password_hash
+
+def test_login_upgrades_the_stored_hash(app, login):
+    old = stored_hash(app, 1)
+    assert identify(old) == ('pbkdf2', 1000)
+    assert login('patient1@example.com', 'secret').status_code == 200
+    assert stored_hash(app, 1) == old
+
+    app.config.update(PASSWORD_HASHER='bcrypt', PASSWORD_BCRYPT_ROUNDS=4)
+    assert login('patient1@example.com', 'wrong').status_code == 401
+    assert stored_hash(app, 1) == old
+    assert login('patient1@example.com', 'secret').status_code == 200
+    upgraded = stored_hash(app, 1)
+    assert identify(upgraded) == ('bcrypt', 4)
+
+    assert login('patient1@example.com', 'secret').status_code == 200
+    assert stored_hash(app, 1) == upgraded
+
+@pytest.mark.parametrize('password', [UNUSABLE_PASSWORD, '', 'secret'])
+def test_accounts_without_a_password_cannot_log_in(app, login, password):
+    assert stored_hash(app, 2) == UNUSABLE_PASSWORD
+    assert login('patient2@example.com', password).status_code == 401
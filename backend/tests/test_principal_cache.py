@@ -0,0 +1,35 @@
+import pytest
+from app import cache
+from app.models.models import db
+from app.utils import principal_cache
+from benchmarks.seed import seed_database
+
+@pytest.fixture
+def cached_app(make_test_app, monkeypatch):
+    # The per-process LRU is module state; start each test with an empty one
+    monkeypatch.setattr(principal_cache, '_local', None)
+    app = make_test_app(PRINCIPAL_CACHE_TTL=30, PRINCIPAL_CACHE_SHARED=True)
+    with app.app_context():
+        seed_database(db.engine, patients=2, doctors=1, appointments=0)
+    return app
+
+def test_cached_principal_has_no_password_hash(cached_app, auth):
+    client = cached_app.test_client()
+    assert client.get('/api/patients/profile', headers=auth(1, 'patient')).status_code == 200
+
+    local = principal_cache._local.get(('patient', '1'))
+    with cached_app.app_context():
+        shared = cache.get('principal:patient:1')
+    for snapshot in (local, shared):
+        assert snapshot['email'] == 'patient1@example.com'
+        assert 'password_hash' not in snapshot
+
+def test_profile_is_served_and_updated_from_the_cached_principal(cached_app, auth):
+    client = cached_app.test_client()
+    headers = auth(1, 'patient')
+    first = client.get('/api/patients/profile', headers=headers).get_json()
+    assert client.get('/api/patients/profile', headers=headers).get_json() == first
+
+    response = client.put('/api/patients/profile', json={'first_name': 'Renamed'}, headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert client.get('/api/patients/profile', headers=headers).get_json()['first_name'] == 'Renamed'
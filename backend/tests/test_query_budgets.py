@@ -0,0 +1,55 @@
+import pytest
+from app.models.models import db, Appointment
+from app.utils.query_counter import QueryCounter, QueryBudgetExceeded, assert_max_queries
+from benchmarks.app_factory import auth_header
+from benchmarks.seed import seed_database
+
+LISTINGS = [
+    ('patient', '/api/patients/appointments'),
+    ('patient', '/api/patients/medical-reports'),
+    ('patient', '/api/patients/prescriptions'),
+    ('patient', '/api/patients/doctors'),
+    ('admin', '/api/admin/doctors'),
+    ('admin', '/api/admin/patients'),
+    ('admin', '/api/admin/appointments'),
+    ('admin', '/api/admin/feedback'),
+    ('admin', '/api/admin/statistics'),
+    ('admin', '/api/admin/reports?report_type=appointments'),
+    ('doctor', '/api/doctors/schedule')
+]
+
+def listing_queries(app, role, url):
+    with app.app_context():
+        engine = db.engine
+    client = app.test_client()
+    with QueryCounter(engine) as counter:
+        response = client.get(url, headers=auth_header(app, 1, role))
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return counter.count
+
+@pytest.mark.parametrize('role,url', LISTINGS)
+def test_listing_query_count_does_not_grow_with_rows(make_test_app, role, url):
+    # An N+1 shows up as a query count that follows the number of rows returned
+    counts = []
+    for appointments in (6, 60):
+        app = make_test_app()
+        with app.app_context():
+            seed_database(db.engine, patients=3, doctors=3, appointments=appointments,
+                          reports_per_appointment=1, prescriptions_per_appointment=1,
+                          feedback_per_appointment=1, admins=1, schedule_days=7)
+        counts.append(listing_queries(app, role, url))
+    assert counts[0] == counts[1], f'{url}: {counts[0]} queries for 6 appointments, {counts[1]} for 60'
+
+def test_query_budget_is_enforced_on_views(seeded, auth):
+    client = seeded.test_client()
+    for url in ('/api/patients/appointments', '/api/patients/medical-reports', '/api/patients/prescriptions'):
+        assert client.get(url, headers=auth(1, 'patient')).status_code == 200
+    assert client.get('/api/admin/appointments', headers=auth(1, 'admin')).status_code == 200
+
+def test_lazy_loads_in_a_loop_exceed_the_budget(seeded):
+    with seeded.app_context():
+        appointments = Appointment.query.limit(5).all()
+        with pytest.raises(QueryBudgetExceeded):
+            with assert_max_queries(1):
+                for appointment in appointments:
+                    appointment.doctor.first_name
@@ -0,0 +1,103 @@
+import asyncio
+import signal
+from datetime import datetime, timedelta
+import pytest
+from app.models.models import db, Appointment, ReminderLog
+from app.utils.booking import reschedule_appointment
+from app.utils.reminders import ReminderScheduler, FakeSender, SENT
+from benchmarks.seed import seed_database
+
+STARTS_AT = datetime(2030, 1, 7, 10, 30)
+
+@pytest.fixture
+def appointment_id(app):
+    with app.app_context():
+        seed_database(db.engine, patients=2, doctors=2, appointments=0, schedule_days=7)
+        appointment = Appointment(patient_id=1, doctor_id=1, date=STARTS_AT.date(), time=STARTS_AT.time(),
+                                  mode='online', status='Scheduled', slot_active=True)
+        db.session.add(appointment)
+        db.session.commit()
+        return appointment.appointment_id
+
+def scheduler(sender):
+    return ReminderScheduler(sender, offsets=(60,), horizon=600, refill_interval=3600)
+
+def tick(app, scheduler, now):
+    with app.app_context():
+        asyncio.run(scheduler.tick(now))
+        db.session.remove()
+
+def test_rescheduled_appointment_is_reminded_again(app, appointment_id):
+    sender = FakeSender()
+    tick(app, scheduler(sender), STARTS_AT - timedelta(minutes=55))
+    assert [reminder['starts_at'] for reminder in sender.sent] == [STARTS_AT]
+
+    moved = STARTS_AT + timedelta(days=2)
+    with app.app_context():
+        reschedule_appointment(db.session.get(Appointment, appointment_id), moved.date(), moved.time())
+
+    # A fresh scheduler, as after a restart, must not treat the old reminder as covering the new time
+    tick(app, scheduler(sender), moved - timedelta(minutes=55))
+    assert [reminder['starts_at'] for reminder in sender.sent] == [STARTS_AT, moved]
+    with app.app_context():
+        assert db.session.query(ReminderLog.status).filter_by(appointment_id=appointment_id).all() == [(SENT,)]
+
+def test_concurrent_schedulers_send_each_reminder_once(app, appointment_id):
+    # Two processes (prefork workers, or a worker plus reminder_worker.py)
+    # each queue the same reminder in their own heap
+    now = STARTS_AT - timedelta(minutes=55)
+    first, second = FakeSender(), FakeSender()
+    schedulers = [scheduler(first), scheduler(second)]
+    with app.app_context():
+        for each in schedulers:
+            each.refill(now)
+        assert all(len(each) == 1 for each in schedulers)
+        for each in schedulers:
+            asyncio.run(each.dispatch(now))
+
+        assert len(first.sent) + len(second.sent) == 1
+        assert schedulers[1].metrics.dropped == 1
+        log = db.session.query(ReminderLog.status, ReminderLog.attempts).filter_by(appointment_id=appointment_id).all()
+        assert log == [(SENT, 1)]
+
+def test_failed_delivery_is_retried_by_the_claiming_scheduler(app, appointment_id):
+    now = STARTS_AT - timedelta(minutes=55)
+    sender = FakeSender(failing_ids={appointment_id})
+    reminders = ReminderScheduler(sender, offsets=(60,), horizon=600, refill_interval=3600, retry_delay=60)
+    with app.app_context():
+        asyncio.run(reminders.tick(now))
+        sender.failing_ids.clear()
+        asyncio.run(reminders.tick(now + timedelta(seconds=61)))
+        assert len(sender.sent) == 1
+        assert db.session.query(ReminderLog.status, ReminderLog.attempts).all() == [(SENT, 2)]
+
+class StopAfterSend(FakeSender):
+    # Delivers one batch, then asks the worker to shut down as SIGTERM would
+    sent = []
+
+    async def send(self, reminder):
+        StopAfterSend.sent.append(reminder['appointment_id'])
+        signal.raise_signal(signal.SIGTERM)
+
+def test_reminder_worker_sends_and_stops_on_signal(tmp_path, monkeypatch):
+    from app import create_app
+    from reminder_worker import run_worker
+
+    monkeypatch.setenv('FLASK_ENV', 'testing')
+    settings = dict(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'reminders.sqlite'}",
+                    REMINDER_SENDER=f'{__name__}:StopAfterSend', REMINDER_OFFSETS_MINUTES=[60])
+    app = create_app('testing', **settings)
+    starts_at = datetime.now().replace(second=0, microsecond=0) + timedelta(minutes=30)
+    with app.app_context():
+        db.create_all()
+        seed_database(db.engine, patients=1, doctors=1, appointments=0, admins=0)
+        db.session.add(Appointment(patient_id=1, doctor_id=1, date=starts_at.date(), time=starts_at.time(),
+                                   mode='online', status='Scheduled', slot_active=True))
+        db.session.commit()
+        db.engine.dispose()
+
+    scheduler = run_worker(3600, **settings)
+    assert StopAfterSend.sent == [1]
+    assert scheduler.metrics.sent == 1
+    with app.app_context():
+        assert [(row.appointment_id, row.status) for row in ReminderLog.query] == [(1, SENT)]
@@ -0,0 +1,81 @@
+from datetime import date, time
+import pytest
+from flask import g
+from sqlalchemy import insert, select, update
+from app import cache, create_app
+from app.models.models import db, Appointment, Doctor
+from app.utils.replicas import _STICKY_KEY
+from benchmarks.app_factory import auth_header
+from benchmarks.seed import seed_database
+
+@pytest.fixture
+def replicated(tmp_path):
+    # Two SQLite files with the same seed; the primary then takes writes the
+    # replica has not replayed yet
+    app = create_app('testing', SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.sqlite'}",
+                     SQLALCHEMY_REPLICA_URLS=[f"sqlite:///{tmp_path / 'replica.sqlite'}"],
+                     PRINCIPAL_CACHE_TTL=0, JWT_SECRET_KEY='test-jwt-secret-key-with-enough-bytes')
+    with app.app_context():
+        replica = db.engines['replica_0']
+        for engine in (db.engine, replica):
+            db.metadata.create_all(engine)
+            seed_database(engine, patients=2, doctors=2, appointments=0, admins=0, schedule_days=7)
+        with db.engine.begin() as primary:
+            primary.execute(insert(Appointment).values(patient_id=1, doctor_id=1, date=date(2031, 1, 6),
+                                                      time=time(9, 0), mode='online', status='Scheduled',
+                                                      slot_active=True))
+            primary.execute(update(Doctor).where(Doctor.doctor_id == 2).values(specialization='Dermatology'))
+    return app
+
+def test_get_bind_sends_only_read_only_selects_to_replicas(replicated):
+    with replicated.test_request_context():
+        replica = db.engines['replica_0']
+        query = select(Doctor)
+        assert db.session.get_bind(clause=query) is db.engine
+
+        g.read_only = True
+        assert db.session.get_bind(clause=query) is replica
+        assert db.session.get_bind(clause=update(Doctor).values(first_name='x')) is db.engine
+        assert db.session.get_bind(clause=query) is replica
+
+        # Once the session has written, the rest of the request reads from the primary
+        db.session.get(Doctor, 1).first_name = 'Changed'
+        db.session.commit()
+        assert db.session.get_bind(clause=query) is db.engine
+
+def test_reads_stick_to_the_primary_after_a_write(replicated):
+    client = replicated.test_client()
+    headers = auth_header(replicated, 1, 'patient')
+
+    def appointments():
+        response = client.get('/api/patients/appointments', headers=headers)
+        assert response.status_code == 200
+        return len(response.get_json())
+
+    assert appointments() == 0
+    assert client.put('/api/patients/profile', json={'first_name': 'Ada'}, headers=headers).status_code == 200
+    assert appointments() == 1
+    # Another client is not affected by the first one's write
+    with replicated.app_context():
+        assert cache.get(_STICKY_KEY.format('patient:1')) == 1
+        assert cache.get(_STICKY_KEY.format('patient:2')) is None
+        cache.delete(_STICKY_KEY.format('patient:1'))
+    assert appointments() == 0
+
+def test_doctor_directory_is_cached_from_the_primary(replicated):
+    client = replicated.test_client()
+    headers = auth_header(replicated, 1, 'patient')
+
+    def directory(specialization):
+        response = client.get(f'/api/patients/doctors?specialization={specialization}', headers=headers)
+        assert response.status_code == 200
+        return [doctor['id'] for doctor in response.get_json()]
+
+    assert directory('Dermatology') == [1, 2]
+    # The replica still lists doctor 2 under its old specialization, and the
+    # cached body must not pick that up
+    with replicated.app_context():
+        replica = db.engines['replica_0']
+        with replica.connect() as connection:
+            assert connection.execute(select(Doctor.specialization).where(Doctor.doctor_id == 2)).scalar() != 'Dermatology'
+    assert directory('Dermatology') == [1, 2]
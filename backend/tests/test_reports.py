@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+import sys
+from collections import defaultdict
+from datetime import date
+import pytest
+from app.utils.reports import REPORT_COLUMNS, create_export_job
+from app.models.models import db, Appointment, Doctor, Feedback, Patient
+from benchmarks.seed import seed_database
+
+# The seeded appointments fall on 2022-01-01 to 2022-01-04
+RANGES = [(None, None), (date(2022, 1, 2), date(2022, 1, 3)), (date(2022, 1, 3), None)]
+
+@pytest.fixture
+def reports(app, auth, tmp_path):
+    app.config['REPORT_EXPORT_FOLDER'] = str(tmp_path)
+    with app.app_context():
+        seed_database(db.engine, patients=40, doctors=12, appointments=600, admins=1,
+                      start_date=date(2022, 1, 1), days=365)
+    client = app.test_client()
+    headers = auth(1, 'admin')
+
+    def get(report_type=None, start_date=None, end_date=None, url='/api/admin/reports', **params):
+        query = dict(params, report_type=report_type) if report_type else params
+        if start_date:
+            query['start_date'] = start_date.isoformat()
+        if end_date:
+            query['end_date'] = end_date.isoformat()
+        return client.get(url, query_string=query, headers=headers)
+
+    with app.app_context():
+        yield get
+
+def within(day, start_date, end_date):
+    return (start_date is None or day >= start_date) and (end_date is None or day <= end_date)
+
+# What the reports computed before the rollup and the aggregate queries:
+# one pass over every row, in Python
+
+def old_revenue(start_date, end_date):
+    fees = {doctor.doctor_id: doctor.consultation_fees for doctor in Doctor.query}
+    revenue = defaultdict(int)
+    for appointment in Appointment.query:
+        if appointment.status == 'completed' and appointment.payment_status == 'paid' \
+                and within(appointment.date, start_date, end_date):
+            revenue[appointment.date] += fees[appointment.doctor_id]
+    return [{'date': day.isoformat(), 'revenue': float(total)} for day, total in sorted(revenue.items())]
+
+def old_appointments(start_date, end_date):
+    counts = defaultdict(int)
+    for appointment in Appointment.query:
+        if within(appointment.date, start_date, end_date):
+            counts[appointment.date] += 1
+    return [{'date': day.isoformat(), 'count': count} for day, count in sorted(counts.items())]
+
+def old_doctors(start_date, end_date):
+    rows = []
+    for doctor in Doctor.query.order_by(Doctor.doctor_id):
+        appointments = [a for a in Appointment.query.filter_by(doctor_id=doctor.doctor_id)
+                        if within(a.date, start_date, end_date)]
+        ratings = [f.rating for f in Feedback.query.filter_by(doctor_id=doctor.doctor_id)
+                   if within(f.date, start_date, end_date)]
+        rows.append({
+            'id': doctor.doctor_id,
+            'name': f'{doctor.first_name} {doctor.last_name}',
+            'specialization': doctor.specialization,
+            'appointment_count': len(appointments),
+            'average_rating': sum(ratings) / len(ratings) if ratings else 0
+        })
+    return rows
+
+def old_patients(start_date, end_date):
+    rows = []
+    for patient in Patient.query.order_by(Patient.patient_id):
+        visits = [a.date for a in Appointment.query.filter_by(patient_id=patient.patient_id)
+                  if within(a.date, start_date, end_date)]
+        rows.append({
+            'id': patient.patient_id,
+            'name': f'{patient.first_name} {patient.last_name}',
+            'appointment_count': len(visits),
+            'last_visit': max(visits).isoformat() if visits else None
+        })
+    return rows
+
+OLD_REPORTS = {'revenue': old_revenue, 'appointments': old_appointments,
+               'doctors': old_doctors, 'patients': old_patients}
+
+@pytest.mark.parametrize('start_date, end_date', RANGES)
+@pytest.mark.parametrize('report_type', sorted(OLD_REPORTS))
+def test_report_matches_the_per_row_computation(reports, report_type, start_date, end_date):
+    response = reports(report_type, start_date, end_date)
+    assert response.status_code == 200
+    expected = OLD_REPORTS[report_type](start_date, end_date)
+    assert expected
+    assert response.get_json() == expected
+
+def test_unknown_report_type_is_rejected(reports):
+    response = reports('weather')
+    assert (response.status_code, response.get_json()) == (400, {'message': 'Invalid report type'})
+
+def parse_csv(body, report_type):
+    # CSV carries text; convert back with the report's column types
+    convert = {'int': int, 'float': float, 'string': str, 'date': str}
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == [name for name, _ in REPORT_COLUMNS[report_type]]
+    return [{name: convert[kind](value) if value else None for (name, kind), value in zip(REPORT_COLUMNS[report_type], row)}
+            for row in rows[1:]]
+
+def parse_parquet(body):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    records = parquet.read_table(io.BytesIO(body)).to_pylist()
+    return [{name: value.isoformat() if isinstance(value, date) else value for name, value in record.items()}
+            for record in records]
+
+PARSERS = {
+    'csv': parse_csv,
+    'ndjson': lambda body, report_type: [json.loads(line) for line in body.decode().splitlines()],
+    'parquet': lambda body, report_type: parse_parquet(body)
+}
+
+@pytest.mark.parametrize('fmt, mimetype', [('csv', 'text/csv'), ('ndjson', 'application/x-ndjson'),
+                                           ('parquet', 'application/vnd.apache.parquet')])
+@pytest.mark.parametrize('report_type', sorted(OLD_REPORTS))
+def test_streamed_exports_match_the_json_report(reports, report_type, fmt, mimetype):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    start_date, end_date = RANGES[1]
+    expected = reports(report_type, start_date, end_date).get_json()
+
+    response = reports(report_type, start_date, end_date, format=fmt)
+    assert response.status_code == 200
+    assert response.mimetype == mimetype
+    assert response.headers['Content-Disposition'] == \
+        f'attachment; filename="{report_type}_2022-01-02_2022-01-03.{fmt}"'
+    body = response.get_data()
+    assert PARSERS[fmt](body.decode() if fmt == 'csv' else body, report_type) == expected
+
+def test_parquet_is_refused_without_pyarrow(reports, monkeypatch):
+    # A None entry makes the import fail as if pyarrow were not installed
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    for params in ({'format': 'parquet'}, {'format': 'parquet', 'mode': 'async'}):
+        response = reports('revenue', **params)
+        assert (response.status_code, response.get_json()) == \
+            (400, {'message': 'Parquet export requires pyarrow to be installed'})
+    assert reports('revenue', format='xlsx').status_code == 400
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson', 'parquet'])
+def test_async_export_runs_and_downloads(reports, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    response = reports('doctors', format=fmt, mode='async')
+    assert response.status_code == 202
+    job = response.get_json()
+
+    # Celery runs eagerly in tests, so the job has finished by now
+    status = reports(url=f"/api/admin/reports/exports/{job['job_id']}").get_json()
+    assert (status['status'], status['rows'], status['error']) == ('done', 12, None)
+
+    download = reports(url=f"/api/admin/reports/exports/{job['job_id']}/download")
+    assert download.status_code == 200
+    assert download.headers['Content-Disposition'] == f'attachment; filename=doctors_all.{fmt}'
+    assert download.get_data() == reports('doctors', format=fmt).get_data()
+
+def test_async_export_status_and_errors(reports):
+    assert reports('doctors', mode='async').status_code == 400
+    assert reports(url='/api/admin/reports/exports/missing').status_code == 404
+    assert reports(url='/api/admin/reports/exports/missing/download').status_code == 404
+
+    pending = create_export_job('doctors', 'csv')
+    assert reports(url=f"/api/admin/reports/exports/{pending['job_id']}").get_json()['status'] == 'pending'
+    response = reports(url=f"/api/admin/reports/exports/{pending['job_id']}/download")
+    assert (response.status_code, response.get_json()) == (409, {'message': 'Export is pending'})
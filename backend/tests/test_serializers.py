@@ -0,0 +1,165 @@
+import dataclasses
+import uuid
+from collections import namedtuple
+from datetime import date, datetime, time
+from decimal import Decimal
+import pytest
+from flask.json.provider import DefaultJSONProvider
+from app.models.models import db, Patient, Doctor, Appointment, MedicalReport, Prescription, DoctorSchedule, Feedback
+from app.utils.serializers import (
+    FastJSONProvider, Schema, PATIENT, DOCTOR, DOCTOR_DIRECTORY, DOCTOR_SEARCH, APPOINTMENT, PATIENT_APPOINTMENT,
+    ADMIN_APPOINTMENT, MEDICAL_REPORT, PRESCRIPTION, SCHEDULE, FEEDBACK_ROW
+)
+
+def doctor(**fields):
+    return Doctor(**{'doctor_id': 7, 'first_name': 'Ada', 'last_name': 'Lovelace', 'email': 'ada@example.com',
+                     'specialization': 'Cardiology', 'contact_number': '5550001',
+                     'consultation_fees': Decimal('120.50'), 'availability_status': 'Available',
+                     'clinic_hospital_name': None, **fields})
+
+def patient(**fields):
+    return Patient(**{'patient_id': 3, 'first_name': 'Alan', 'last_name': 'Turing', 'email': 'alan@example.com',
+                      'contact_number': '5550002', 'date_of_birth': date(1912, 6, 23), **fields})
+
+def appointment(**fields):
+    return Appointment(**{'appointment_id': 11, 'patient_id': 3, 'doctor_id': 7, 'date': date(2030, 1, 7),
+                          'time': time(9, 5), 'status': 'Scheduled', 'mode': 'online', 'payment_status': None,
+                          'version': 1, 'patient': patient(), 'doctor': doctor(), **fields})
+
+GOLDEN = [
+    (PATIENT, patient, {
+        'id': 3, 'first_name': 'Alan', 'last_name': 'Turing', 'email': 'alan@example.com',
+        'contact_number': '5550002', 'date_of_birth': '1912-06-23'
+    }),
+    (DOCTOR, doctor, {
+        'id': 7, 'first_name': 'Ada', 'last_name': 'Lovelace', 'email': 'ada@example.com',
+        'specialization': 'Cardiology', 'contact_number': '5550001', 'consultation_fees': '120.50',
+        'status': 'Available'
+    }),
+    (DOCTOR_DIRECTORY, doctor, {
+        'id': 7, 'first_name': 'Ada', 'last_name': 'Lovelace', 'specialization': 'Cardiology',
+        'consultation_fees': '120.50'
+    }),
+    (DOCTOR_SEARCH, doctor, {
+        'id': 7, 'first_name': 'Ada', 'last_name': 'Lovelace', 'specialization': 'Cardiology',
+        'clinic_hospital_name': None, 'consultation_fees': '120.50'
+    }),
+    (APPOINTMENT, appointment, {
+        'id': 11, 'patient_id': 3, 'doctor_id': 7, 'date': '2030-01-07', 'time': '09:05', 'status': 'Scheduled',
+        'mode': 'online', 'payment_status': None, 'version': 1
+    }),
+    (PATIENT_APPOINTMENT, appointment, {
+        'id': 11, 'doctor_name': 'Ada Lovelace', 'date': '2030-01-07', 'time': '09:05', 'status': 'Scheduled',
+        'mode': 'online', 'payment_status': None
+    }),
+    (ADMIN_APPOINTMENT, lambda: appointment(time=time(23, 55), payment_status='paid'), {
+        'id': 11, 'patient_name': 'Alan Turing', 'doctor_name': 'Ada Lovelace', 'date': '2030-01-07',
+        'time': '23:55', 'status': 'Scheduled', 'mode': 'online', 'payment_status': 'paid'
+    }),
+    (MEDICAL_REPORT, lambda: MedicalReport(report_id=5, doctor=doctor(), date=date(2030, 1, 8), diagnosis='Flu',
+                                           symptoms=None, appointment_id=11, uploaded_report_file=None), {
+        'id': 5, 'doctor_name': 'Ada Lovelace', 'date': '2030-01-08', 'diagnosis': 'Flu', 'symptoms': None,
+        'appointment_id': 11, 'file': None
+    }),
+    (PRESCRIPTION, lambda: Prescription(prescription_id=9, doctor=doctor(), date_issued=date(2030, 1, 8),
+                                        medicine_name='Rest', dosage='1', frequency='daily'), {
+        'id': 9, 'doctor_name': 'Ada Lovelace', 'date': '2030-01-08', 'medicine_name': 'Rest', 'dosage': '1',
+        'frequency': 'daily'
+    }),
+    (SCHEDULE, lambda: DoctorSchedule(weekday=0, start_time=time(8, 0), end_time=time(16, 30), slot_minutes=30), {
+        'weekday': 0, 'start_time': '08:00', 'end_time': '16:30', 'slot_minutes': 30
+    })
+]
+
+def old_payload(schema, obj):
+    # What the routes built by hand before the schemas: attribute access with
+    # isoformat/strftime and the Decimal left for jsonify to turn into a string
+    payload = {}
+    for name, field in schema.fields.items():
+        if callable(field):
+            payload[name] = field(obj)
+            continue
+        sources = getattr(field, 'sources', None) or [field.source]
+        values = []
+        for source in sources:
+            value = obj
+            for part in source.split('.'):
+                value = getattr(value, part)
+            values.append(value)
+        if len(values) > 1:
+            payload[name] = ' '.join(values)
+        elif isinstance(values[0], (date, datetime)):
+            payload[name] = values[0].isoformat()
+        elif isinstance(values[0], time):
+            payload[name] = values[0].strftime('%H:%M')
+        else:
+            payload[name] = values[0]
+    return payload
+
+@pytest.mark.parametrize('schema, build, expected', GOLDEN)
+def test_schema_golden_output(app, schema, build, expected):
+    with app.test_request_context():
+        obj = build()
+        assert schema.dump(obj) == expected
+        assert list(schema.dump(obj)) == list(expected)
+        assert schema.dump_many([obj, obj]) == [expected, expected]
+
+        # Byte for byte what jsonify sent for the hand-built dicts
+        old = DefaultJSONProvider(app).response(old_payload(schema, obj)).get_data()
+        assert app.json.response(schema.dump(obj)).get_data() == old
+
+def test_unloaded_attributes_fall_back_to_attribute_access(seeded):
+    with seeded.test_request_context():
+        loaded = db.session.get(Appointment, 1)
+        expected = ADMIN_APPOINTMENT.dump(loaded)
+        assert expected == old_payload(ADMIN_APPOINTMENT, loaded)
+        # Expired columns and unloaded relationships are loaded on access
+        db.session.expire(loaded)
+        assert ADMIN_APPOINTMENT.dump(loaded) == expected
+        db.session.expire(loaded, ['date', 'time', 'doctor'])
+        assert ADMIN_APPOINTMENT.dump(loaded) == expected
+
+def test_row_schema_reads_labels_and_media_links(seeded):
+    Row = namedtuple('Row', 'Feedback patient_first_name patient_last_name doctor_first_name doctor_last_name')
+    feedback = Feedback(feedback_id=4, rating=5, comments=None, date=date(2030, 2, 1), video_file='ab/cd.mp4',
+                        video_status='ready', video_mime_type='video/mp4', video_thumbnail='ef/gh.jpg')
+    with seeded.test_request_context():
+        assert FEEDBACK_ROW.dump(Row(feedback, 'Alan', 'Turing', 'Ada', 'Lovelace')) == {
+            'id': 4, 'patient_name': 'Alan Turing', 'doctor_name': 'Ada Lovelace', 'rating': 5, 'comment': None,
+            'date': '2030-02-01', 'video': {
+                'url': '/api/uploads/feedback/4/video', 'status': 'ready', 'mime_type': 'video/mp4',
+                'thumbnail_url': '/api/uploads/feedback/4/video/thumbnail', 'preview_url': None
+            }
+        }
+
+def test_invalid_field_sources_are_rejected():
+    with pytest.raises(ValueError):
+        Schema(None, {'x': 'a; import os'})
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+JSON_VALUES = [
+    {'b': 1, 'a': [1, 2.5, None, True], 'c': {'z': 'text', 'y': ''}},
+    {'when': datetime(2030, 1, 7, 9, 5, 30), 'day': date(2030, 1, 7), 'fee': Decimal('120.50')},
+    {'id': uuid.UUID('12345678-1234-5678-1234-567812345678'), 'point': Point(1, 2)},
+    {1: 'int key', 2: None},
+    {'big': 2 ** 70},
+    [],
+    'plain'
+]
+
+@pytest.mark.parametrize('value', JSON_VALUES)
+def test_fast_provider_matches_flask_default(app, value):
+    fast, default = FastJSONProvider(app), DefaultJSONProvider(app)
+    assert fast.dumps(value) == default.dumps(value, separators=(',', ':'))
+    assert fast.response(value).get_data() == default.response(value).get_data()
+    assert fast.loads(fast.dumps(value)) == default.loads(default.dumps(value))
+
+def test_fast_provider_indents_in_debug(app):
+    app.debug = True
+    value = {'b': [1], 'a': date(2030, 1, 7)}
+    assert app.json.response(value).get_data() == DefaultJSONProvider(app).response(value).get_data()
+    assert app.json.dumps(value, indent=2) == DefaultJSONProvider(app).dumps(value, indent=2)
@@ -0,0 +1,132 @@
+from datetime import date, datetime, time, timedelta
+import pytest
+from app import cache
+from app.models.models import db, Doctor, DoctorSchedule
+from app.utils import slot_index
+from app.utils.booking import book_slots, cancel_appointment, reschedule_appointment
+from app.utils.slot_index import SlotIndex, template_mask
+from benchmarks.seed import seed_database
+
+DAY = date.today() + timedelta(days=7)
+
+@pytest.fixture
+def slots_app(app):
+    # Doctor 1 is the only dermatologist: 08:00-16:00 in 30 minute slots every day
+    with app.app_context():
+        seed_database(db.engine, patients=2, doctors=3, appointments=0, admins=0, schedule_days=7)
+        yield app
+
+def first_free(index, limit=3):
+    found = index.next_free_slots('Dermatology', DAY, DAY, limit, now=datetime.combine(DAY, time()))
+    return [(slot['doctor_id'], slot['time']) for slot in found]
+
+def book(start):
+    return book_slots(1, [{'doctor_id': 1, 'date': DAY, 'time': start, 'mode': 'online'}])[0]
+
+def test_other_workers_see_committed_changes(slots_app):
+    # An index built by another worker process, which never sees our session
+    other = SlotIndex()
+    other.ensure_fresh()
+    assert first_free(other) == [(1, '08:00'), (1, '08:30'), (1, '09:00')]
+
+    appointment = book(time(8, 0))
+    moved = book(time(8, 30))
+    reschedule_appointment(moved, DAY, time(9, 30))
+    other.ensure_fresh()
+    assert first_free(other) == [(1, '08:30'), (1, '09:00'), (1, '10:00')]
+
+    cancel_appointment(appointment)
+    schedule = DoctorSchedule.query.filter_by(doctor_id=1, weekday=DAY.weekday()).one()
+    schedule.start_time = time(9, 0)
+    db.session.commit()
+    other.ensure_fresh()
+    assert first_free(other) == [(1, '09:00'), (1, '10:00'), (1, '10:30')]
+
+def test_status_only_updates_publish_nothing(slots_app):
+    appointment = book(time(8, 0))
+    generation = cache.get(slot_index.GENERATION_KEY)
+    appointment.payment_status = 'paid'
+    db.session.commit()
+    assert cache.get(slot_index.GENERATION_KEY) == generation
+
+def test_expired_change_sets_force_a_rebuild(slots_app, monkeypatch):
+    other = SlotIndex()
+    other.ensure_fresh()
+    rebuilds = []
+    rebuild = other.rebuild
+    monkeypatch.setattr(other, 'rebuild', lambda generation=None: rebuilds.append(generation) or rebuild(generation))
+
+    book(time(8, 0))
+    book(time(8, 30))
+    generation = int(cache.get(slot_index.GENERATION_KEY))
+    cache.delete(slot_index._CHANGED_KEY.format(generation - 1))
+    other.ensure_fresh()
+    assert rebuilds == [generation]
+    assert first_free(other, 1) == [(1, '09:00')]
+
+def test_template_mask_sets_one_bit_per_slot_start():
+    morning = DoctorSchedule(weekday=0, start_time=time(8, 0), end_time=time(9, 15), slot_minutes=30)
+    evening = DoctorSchedule(weekday=0, start_time=time(18, 0), end_time=time(18, 20), slot_minutes=20)
+    # 08:00 and 08:30 fit before 09:15, 09:00 would not; bit = minutes / 5
+    assert template_mask([morning]) == (1 << 96) | (1 << 102)
+    assert template_mask([morning, evening]) == (1 << 96) | (1 << 102) | (1 << 216)
+    assert template_mask([]) == 0
+
+def test_next_free_slots_merges_doctors_and_skips_started_slots(slots_app):
+    DoctorSchedule.query.filter_by(doctor_id=2).update({'weekday': DAY.weekday()}, synchronize_session=False)
+    db.session.get(Doctor, 2).specialization = 'Dermatology'
+    db.session.commit()
+    index = SlotIndex()
+    index.ensure_fresh()
+
+    found = index.next_free_slots('Dermatology', DAY, DAY + timedelta(days=1), 4, now=datetime.combine(DAY, time(8, 40)))
+    assert [(slot['doctor_id'], slot['date'], slot['time']) for slot in found] == [
+        (1, DAY.isoformat(), '09:00'), (2, DAY.isoformat(), '09:00'),
+        (1, DAY.isoformat(), '09:30'), (2, DAY.isoformat(), '09:30')
+    ]
+    assert found[0]['doctor_name'] == 'Doc1 Smith1'
+    assert index.next_free_slots('Dermatology', DAY, DAY, 5, now=datetime.combine(DAY, time(16, 0))) == []
+    assert index.next_free_slots('Astrology', DAY, DAY, 5) == []
+
+def test_booked_slot_disappears_from_availability(slots_app, auth):
+    client = slots_app.test_client()
+    query = f'/api/doctors/availability?specialization=Dermatology&start_date={DAY}&end_date={DAY}&limit=2'
+
+    def offered():
+        response = client.get(query, headers=auth(1, 'patient'))
+        assert response.status_code == 200
+        return [slot['time'] for slot in response.get_json()]
+
+    assert offered() == ['08:00', '08:30']
+    response = client.post('/api/appointments', json={'doctor_id': 1, 'date': DAY.isoformat(), 'time': '08:00',
+                                                      'mode': 'online'}, headers=auth(1, 'patient'))
+    assert response.status_code == 201
+    assert offered() == ['08:30', '09:00']
+
+@pytest.mark.parametrize('entry, message', [
+    ({'weekday': 7, 'start_time': '09:00', 'end_time': '12:00'}, 'weekday must be between 0 (Monday) and 6 (Sunday)'),
+    ({'weekday': -1, 'start_time': '09:00', 'end_time': '12:00'}, 'weekday must be between 0 (Monday) and 6 (Sunday)'),
+    ({'weekday': 0, 'start_time': '09:02', 'end_time': '12:00'}, 'start_time must be on a 5 minute boundary'),
+    ({'weekday': 0, 'start_time': '09:00', 'end_time': '11:58'}, 'end_time must be on a 5 minute boundary'),
+    ({'weekday': 0, 'start_time': '12:00', 'end_time': '12:00'}, 'end_time must be after start_time'),
+    ({'weekday': 0, 'start_time': '13:00', 'end_time': '09:00'}, 'end_time must be after start_time'),
+    ({'weekday': 0, 'start_time': '09:00', 'end_time': '12:00', 'slot_minutes': 7}, 'slot_minutes must be a positive multiple of 5'),
+    ({'weekday': 0, 'start_time': '09:00', 'end_time': '12:00', 'slot_minutes': 0}, 'slot_minutes must be a positive multiple of 5')
+])
+def test_schedule_update_rejects_invalid_hours(slots_app, auth, entry, message):
+    client = slots_app.test_client()
+    valid = {'weekday': 1, 'start_time': '08:00', 'end_time': '12:00'}
+    response = client.put('/api/doctors/schedule', json={'schedule': [valid, entry]}, headers=auth(1, 'doctor'))
+    assert (response.status_code, response.get_json()) == (400, {'message': message})
+    # Nothing is replaced when any entry is invalid
+    assert DoctorSchedule.query.filter_by(doctor_id=1).count() == 7
+
+def test_schedule_update_replaces_offered_slots(slots_app, auth):
+    client = slots_app.test_client()
+    response = client.put('/api/doctors/schedule', json={'schedule': [
+        {'weekday': DAY.weekday(), 'start_time': '13:05', 'end_time': '14:00', 'slot_minutes': 25}
+    ]}, headers=auth(1, 'doctor'))
+    assert response.status_code == 200
+    index = SlotIndex()
+    index.ensure_fresh()
+    assert first_free(index) == [(1, '13:05'), (1, '13:30')]
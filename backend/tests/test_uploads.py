@@ -0,0 +1,138 @@
+import contextlib
+import io
+import os
+from datetime import datetime, timedelta, timezone
+import pytest
+from app import cache
+from app.models.models import db, MedicalReport
+from app.utils import s3
+from app.utils.file_handler import (
+    store_stream, delete_file, delete_files, start_upload, upload_part, list_parts, complete_upload, reap_expired_uploads
+)
+from benchmarks.app_factory import auth_header
+from benchmarks.seed import seed_database
+
+BUCKET = 'test-uploads'
+
+@pytest.fixture
+def upload_app(make_test_app, tmp_path):
+    return make_test_app(UPLOAD_FOLDER=str(tmp_path), UPLOAD_MIN_PART_SIZE=4, UPLOAD_MAX_SIZE=20)
+
+@pytest.fixture
+def upload(upload_app):
+    client = upload_app.test_client()
+    headers = auth_header(upload_app, 1, 'patient')
+    response = client.post('/api/uploads', json={'file_type': 'document', 'filename': 'scan.pdf'}, headers=headers)
+    assert response.status_code == 201, response.get_data(as_text=True)
+    url = f"/api/uploads/{response.get_json()['upload_id']}"
+
+    def put(part_number, body):
+        return client.put(f'{url}/parts/{part_number}', data=body, headers=headers)
+
+    def parts():
+        return [(part['part_number'], part['size']) for part in client.get(url, headers=headers).get_json()['parts']]
+
+    def complete():
+        return client.post(f'{url}/complete', headers=headers)
+    return put, parts, complete
+
+def test_parts_assemble_with_a_short_last_part(upload):
+    put, parts, complete = upload
+    assert put(1, b'abcdef').status_code == 200
+    assert put(2, b'gh').status_code == 200
+    response = complete()
+    assert response.status_code == 201
+    assert response.get_json()['size'] == 8
+
+def test_only_the_last_part_may_be_short(upload):
+    put, parts, complete = upload
+    assert put(2, b'abcdef').status_code == 200
+    assert put(1, b'ab').status_code == 400
+    assert put(3, b'ab').status_code == 200
+    assert put(4, b'abcdef').status_code == 400
+    assert parts() == [(2, 6), (3, 2)]
+
+def test_session_size_is_limited_as_parts_arrive(upload):
+    put, parts, complete = upload
+    assert put(1, b'x' * 12).status_code == 200
+    assert put(2, b'x' * 12).status_code == 400
+    assert put(2, b'x' * 8).status_code == 200
+    assert put(3, b'x').status_code == 400
+    # Re-sending a part replaces it, so only the other parts count
+    assert put(1, b'y' * 12).status_code == 200
+    assert parts() == [(1, 12), (2, 8)]
+
+@pytest.fixture(params=['local', 's3'])
+def storage_app(request, make_test_app, tmp_path):
+    if request.param == 'local':
+        backend, settings = contextlib.nullcontext(), {}
+    else:
+        # moto stands in for S3 in-process
+        backend = pytest.importorskip('moto').mock_aws()
+        settings = dict(AWS_ACCESS_KEY_ID='testing', AWS_SECRET_ACCESS_KEY='testing',
+                        AWS_REGION='us-east-1', AWS_BUCKET_NAME=BUCKET, AWS_S3_ENDPOINT_URL=None)
+    with backend:
+        app = make_test_app(UPLOAD_FOLDER=str(tmp_path), **settings)
+        with app.app_context():
+            if settings:
+                s3.get_s3_client().create_bucket(Bucket=BUCKET)
+            seed_database(db.engine, patients=2, doctors=1, appointments=4, admins=0)
+            yield app
+
+def stored(app, name):
+    if app.config.get('AWS_ACCESS_KEY_ID'):
+        listing = s3.get_s3_client().list_objects_v2(Bucket=BUCKET, Prefix=f'document/{name}')
+        return listing['KeyCount'] == 1
+    return os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], 'document', name))
+
+def test_shared_blob_outlives_all_but_its_last_reference(storage_app):
+    first = store_stream(io.BytesIO(b'same scan'), 'document', 'a.pdf')
+    second = store_stream(io.BytesIO(b'same scan'), 'document', 'b.pdf')
+    assert second['deduplicated'] and second['filename'] == first['filename']
+    name = first['filename']
+
+    reports = MedicalReport.query.order_by(MedicalReport.report_id).limit(2).all()
+    reports[0].uploaded_report_file = name
+    reports[1].file_thumbnail = name
+    db.session.commit()
+
+    reports[0].uploaded_report_file = None
+    db.session.commit()
+    assert not delete_file(name, 'document')
+    assert stored(storage_app, name)
+
+    # Pending changes count: the session flushes before looking for references
+    db.session.delete(reports[1])
+    assert delete_file(name, 'document')
+    assert not stored(storage_app, name)
+
+def test_batch_delete_skips_referenced_blobs(storage_app):
+    kept, dropped = (store_stream(io.BytesIO(body), 'document', 'scan.pdf')['filename'] for body in (b'kept', b'dropped'))
+    MedicalReport.query.first().uploaded_report_file = kept
+    db.session.commit()
+
+    assert delete_files([(kept, 'document'), (dropped, 'document'), (None, 'document')]) == 1
+    assert stored(storage_app, kept) and not stored(storage_app, dropped)
+
+def test_abandoned_sessions_are_reaped(storage_app):
+    live, abandoned, done = (start_upload('document', f'{name}.pdf', 'application/pdf', 1) for name in ('live', 'abandoned', 'done'))
+    for session in (live, abandoned, done):
+        upload_part(session, 1, io.BytesIO(b'part'))
+    complete_upload(done)
+    # The cached session expires first; its staged part stays behind
+    cache.delete(f"upload:{abandoned['upload_id']}")
+
+    on_s3 = bool(storage_app.config.get('AWS_ACCESS_KEY_ID'))
+    if not on_s3:
+        # moto reports every multipart upload as initiated in 2010
+        assert reap_expired_uploads() == 0
+    later = datetime.now(timezone.utc) + timedelta(seconds=storage_app.config['UPLOAD_SESSION_TTL'] + 60)
+    assert reap_expired_uploads(later) == 1
+    assert [part['size'] for part in list_parts(live)] == [4]
+
+    if on_s3:
+        uploads = s3.get_s3_client().list_multipart_uploads(Bucket=BUCKET).get('Uploads', [])
+        assert [upload['UploadId'] for upload in uploads] == [live['s3_upload_id']]
+    else:
+        staging = os.path.join(storage_app.config['UPLOAD_FOLDER'], '.staging')
+        assert os.listdir(staging) == [live['upload_id']]